@@ -0,0 +1,293 @@
+"""Benchmarks for the stream scheduler.
+
+Run all benchmarks with ``python bench.py`` or
+single ones with ``python bench.py engine``."""
+import sys
+import time
+import statistics
+import subprocess
+import datetime
+import tempfile
+import logging
+import tracemalloc
+from pathlib import Path
+import pandas as pd
+import testlib
+import lib
+from engine import DockerEngine
+import validation
+import schedulecache
+import monitor
+from eventqueue import DEFAULT_CHANNEL
+
+# Switch off logging
+logging.getLogger("lib").disabled = True
+
+
+# helper functions
+
+
+def timeit(function, repeats):
+    """Returns mean runtime of function in microseconds"""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+def report(name, value, unit="us"):
+    print(f"{name:<50} {value:>12.1f} {unit}")
+
+
+# benchmarks
+
+
+def benchEngine(repeats=2000):
+    """Cost of one checkStream tick with a new client per tick
+    (old behaviour) and with the shared engine."""
+    print("checkStream tick cost")
+    frame = testlib.mockFrame()
+    lib.createStatusWidget(frame)
+    container = testlib.mockContainer(status="created", log=b"asdf")
+    frame.supervisor.attach(DEFAULT_CHANNEL, container)
+    containers = [container]
+
+    def newClient():
+        """Builds a client the way docker.from_env does
+        without talking to a daemon"""
+        try:
+            import docker
+
+            docker.DockerClient(
+                base_url="unix://var/run/docker.sock", version="1.41"
+            ).close()
+        except ImportError:
+            pass
+        return testlib.mockEngine(containers=containers)
+
+    before = timeit(lambda: lib.checkStream(frame, engine=newClient()), repeats)
+    shared = DockerEngine(factory=newClient)
+    after = timeit(lambda: lib.checkStream(frame, engine=shared), repeats)
+    report("client per tick (before)", before)
+    report("shared engine (after)", after)
+
+
+def makeSchedule(rows, directory, files=50):
+    """Builds a schedule like pd.read_excel returns it"""
+    names = []
+    for i in range(files):
+        path = Path(directory) / f"video{i}.mp4"
+        path.touch()
+        names.append(str(path))
+    start = datetime.datetime(2030, 1, 1)
+    return pd.DataFrame(
+        {
+            "File": [names[i % files] for i in range(rows)],
+            "Date": pd.to_datetime(
+                [start + datetime.timedelta(days=i // 24) for i in range(rows)]
+            ),
+            "Time": [datetime.time(i % 24) for i in range(rows)],
+        }
+    )
+
+
+def legacyValidation(df):
+    """Row-wise checks and combine as done before vectorization"""
+    dirs = [Path(row[1]["File"]).parent for row in df.iterrows()]
+    assert all([x == dirs[0] for x in dirs])
+    for row in df.iterrows():
+        assert isinstance(row[1]["Date"], datetime.datetime)
+        assert isinstance(row[1]["Time"], datetime.time)
+        assert isinstance(row[1]["File"], str)
+    for fileP in df["File"]:
+        assert Path(fileP).exists()
+    df = df.copy()
+    df.loc[:, "Date/Time"] = df.apply(
+        lambda x: pd.Timestamp.combine(x["Date"], x["Time"]), axis=1
+    )
+    return df.drop(columns=["Date", "Time"]).sort_values(by="Date/Time")
+
+
+def benchValidation(sizes=(1000, 10000, 100000)):
+    """Schedule validation and normalization at different sizes"""
+    print("schedule validation")
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in sizes:
+            df = makeSchedule(rows, directory)
+
+            def vectorized():
+                assert validation.validateSchedule(df).ok
+                validation.normalizeSchedule(df)
+
+            legacy = timeit(lambda: legacyValidation(df), 1)
+            report(f"row-wise, {rows} rows", legacy / 1e3, "ms")
+            report(f"vectorized, {rows} rows", timeit(vectorized, 3) / 1e3, "ms")
+
+
+def benchOverlaps(sizes=(1000, 10000, 100000)):
+    """Overlap sweep over schedules of different sizes"""
+    print("overlap detection")
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in sizes:
+            schedule = validation.normalizeSchedule(makeSchedule(rows, directory))
+            schedule["Channel"] = [f"channel{i % 4}" for i in range(rows)]
+            durations = {fileName: 1800.0 for fileName in schedule["File"].unique()}
+
+            def sweep():
+                validation.validateOverlaps(
+                    schedule, durations, datetime.timedelta(minutes=30)
+                )
+
+            report(f"interval sweep, {rows} rows", timeit(sweep, 3) / 1e3, "ms")
+
+
+def benchScheduleLoad(repeats=20):
+    """Reading a schedule workbook with a cold and a warm cache"""
+    print("schedule loading")
+    filename = "./test_files/test_schedule_1_mock_good.xlsx"
+    lib.showerror = lambda *args: None
+    with tempfile.TemporaryDirectory() as directory:
+        caches = []
+
+        def cold():
+            caches.append(schedulecache.ScheduleCache(f"{directory}/{len(caches)}"))
+            lib.read_config(filename, caches[-1])
+
+        warm = schedulecache.ScheduleCache(f"{directory}/warm")
+        lib.read_config(filename, warm)
+        report("excel parsing (cold cache)", timeit(cold, repeats) / 1e3, "ms")
+        report(
+            "cached (warm cache)",
+            timeit(lambda: lib.read_config(filename, warm), repeats) / 1e3,
+            "ms",
+        )
+
+
+CORPUS = Path(__file__).parent / "test_files" / "ffmpeg_stderr.log"
+
+
+def legacyBitrate(line):
+    """Status line parsing as parseContainerOutput did before"""
+    if len(line.strip().decode().split(" ")) < 10:
+        return None
+    import re
+
+    matched = re.findall(r"\d+\.\dkbits\/s", line.strip().decode())
+    if len(matched) > 0:
+        return re.findall(r"\d+\.\dkbits\/s", line.strip().decode())[-1]
+    return None
+
+
+def replay(parser, lines):
+    """Parses every line once. Returns lines per second and
+    the mean peak of temporary allocations per line in bytes."""
+    start = time.perf_counter()
+    for line in lines:
+        parser(line)
+    rate = len(lines) / (time.perf_counter() - start)
+    tracemalloc.start()
+    peaks = 0
+    for line in lines:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        parser(line)
+        peaks += tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return rate, peaks / len(lines)
+
+
+def benchParse(repeats=20):
+    """Bitrate parsing of a synthetic ffmpeg log, line by line like
+    the status poll reads it with logs(tail=1)"""
+    print("bitrate parsing")
+    lines = [line for line in monitor.SEPARATOR.split(CORPUS.read_bytes()) if line]
+    for line in lines:
+        assert monitor.lastBitrate(line) == legacyBitrate(line), line
+    for name, parser in (
+        ("regex on decoded lines (before)", legacyBitrate),
+        ("backward byte scan (after)", monitor.lastBitrate),
+    ):
+        runs = [replay(parser, lines) for _ in range(repeats)]
+        rate = statistics.median(rate for rate, _ in runs)
+        report(f"{name}", rate / 1e3, "klines/s")
+        report(f"{name} temporary", runs[0][1], "B/line")
+
+
+STARTUP = {
+    "eager imports (before)": "import tkinter.filedialog, pandas, docker",
+    "import core": "import core",
+    "import daemon": "import daemon",
+    "import lib": "import lib",
+    "first window": (
+        "import gui\n"
+        "root, app = gui.createApp()\n"
+        "root.update_idletasks()\n"
+        "root.destroy()"
+    ),
+}
+HEAVY_MODULES = ("tkinter", "pandas", "docker")
+
+
+def startupTime(code):
+    """Runs code in a fresh interpreter. Returns its runtime in
+    seconds and the heavy modules it imported."""
+    script = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        f"{code}\n"
+        "print(time.perf_counter() - start)\n"
+        f"print(*[name for name in {HEAVY_MODULES!r} if name in sys.modules])"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=Path(__file__).parent,
+    ).stdout.splitlines()
+    return float(output[0]), output[1] if len(output) > 1 else ""
+
+
+def benchStartup(repeats=5):
+    """Import and first window latency in fresh interpreters"""
+    print("startup")
+    for name, code in STARTUP.items():
+        try:
+            runs = [startupTime(code) for _ in range(repeats)]
+        except subprocess.CalledProcessError:
+            print(f"{name:<50} skipped (no display?)")
+            continue
+        median = statistics.median(runtime for runtime, _ in runs)
+        report(f"{name} [{runs[0][1] or '-'}]", median * 1e3, "ms")
+
+
+def benchSimulation(days=1, channels=2):
+    """A day of schedule on the virtual clock"""
+    import simulate
+
+    print(f"simulation, {days} days on {channels} channels")
+    queue, durations = simulate.makeSchedule(days, channels)
+    logging.disable(logging.ERROR)
+    try:
+        result = simulate.Simulation(queue, durations, channels).run()
+    finally:
+        logging.disable(logging.NOTSET)
+    for line in simulate.formatReport(result).splitlines():
+        print(f"  {line}")
+
+
+BENCHMARKS = {
+    "engine": benchEngine,
+    "validation": benchValidation,
+    "overlaps": benchOverlaps,
+    "load": benchScheduleLoad,
+    "parse": benchParse,
+    "startup": benchStartup,
+    "simulation": benchSimulation,
+}
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        BENCHMARKS[name]()
@@ -0,0 +1,1444 @@
+"""GUI independent scheduler core.
+
+All functions work on a state object holding the schedule, the event
+queue and the stream supervisor (a SchedulerState or the tkinter
+window) and report what happened as Notices instead of showing
+dialogs, so that any front end can present them.
+Importing the core is cheap, docker and pandas are only imported
+by the functions that use them."""
+from pathlib import Path
+import uuid
+import datetime
+import collections
+from functools import partial
+import shutil
+import logging
+from engine import getEngine
+from monitor import (
+    LogFollower,
+    FailureDetector,
+    Failure,
+    formatBitrate,
+    lastBitrate,
+)
+from eventqueue import EventQueue, ScheduleEvent, DEFAULT_CHANNEL
+from supervisor import StreamSupervisor
+from playout import PlayoutSession, PLAYLIST_MOUNT, chain, itemKey
+from schedulecache import getCache, readWorkbook
+import journal
+
+
+# define global variables
+
+IMAGE_NAME = "ffmpeg:1.0"
+
+# ffmpeg writes key=value progress blocks to stdout and messages to stderr
+RTMPSETTINGS_TEMPLATE = (
+    "'{} "
+    "flashver=FMLE/3.020(compatible;20FMSc/1.0)"
+    " live=true pubUser={} pubPasswd={} playpath={}'"
+)
+
+FFMPEG_TEMPLATE_TEST = """ffmpeg -nostats -progress pipe:1 -re\
+                        -f lavfi\
+                        -i testsrc\
+                        -c:v libx264\
+                        -b:v 1600k\
+                        -preset ultrafast\
+                        -b 900k\
+                        -c:a libfdk_aac\
+                        -b:a 128k\
+                        -s 960x720\
+                        -x264opts keyint=50\
+                        -g 25\
+                        -pix_fmt yuv420p\
+                        -f flv {}"""
+
+FFMPEG_TEMPLATE = """ffmpeg -nostats -progress pipe:1 -re\
+                        -i {}\
+                        -c:v libx264\
+                        -b:v 1600k\
+                        -preset ultrafast\
+                        -b 900k\
+                        -c:a libfdk_aac\
+                        -b:a 128k\
+                        -s 1280x720\
+                        -x264opts keyint=50\
+                        -g 25\
+                        -pix_fmt yuv420p\
+                        -f flv {}"""
+
+# renditions are already in the stream profile and only remuxed
+FFMPEG_TEMPLATE_COPY = """ffmpeg -nostats -progress pipe:1 -re\
+                        -i {}\
+                        -c copy\
+                        -f flv {}"""
+RENDITION_MOUNT = "/renditions"  # rendition cache inside the container
+INPUT_SEEK = "-ss {:.3f} -i "  # restarts seek the input before reading it
+
+# back to back streams of a channel are read from a chain of ffconcat files
+FFMPEG_TEMPLATE_PLAYLIST = """ffmpeg -nostats -progress pipe:1 -re\
+                        -f concat -safe 0\
+                        -i {}\
+                        -c:v libx264\
+                        -b:v 1600k\
+                        -preset ultrafast\
+                        -b 900k\
+                        -c:a libfdk_aac\
+                        -b:a 128k\
+                        -s 1280x720\
+                        -x264opts keyint=50\
+                        -g 25\
+                        -pix_fmt yuv420p\
+                        -f flv {}"""
+
+START_TOLERANCE = datetime.timedelta(seconds=20)  # latest start of a missed event
+MIN_GAP = datetime.timedelta(minutes=30)  # between streams of one channel
+PROBE_SIZE = 1 << 20  # bytes of the input read ahead when prewarming
+
+# labels of the containers of the scheduler, docker filters by them
+LABEL = "streamscheduler"  # role of the container, stream or test
+# roles of containers that only work for the scheduler, they are not streams
+WORKER_ROLES = ("transcode", "probe")
+INSTANCE_LABEL = "streamscheduler.instance"  # scheduler that started it
+CHANNEL_LABEL = "streamscheduler.channel"
+ITEM_LABEL = "streamscheduler.item"  # scheduled start of the stream
+FILE_LABEL = "streamscheduler.file"
+
+Notice = collections.namedtuple("Notice", ["kind", "channel", "message", "data"])
+# an event of the schedule as front ends show it, duration in seconds or None
+ScheduleRow = collections.namedtuple("ScheduleRow", ["event", "status", "duration"])
+
+logger = logging.getLogger("core")
+
+
+class SchedulerState:
+    """Everything the scheduler needs to know,
+    for running without a window."""
+
+    def __init__(self, supervisor=None, imageName=IMAGE_NAME):
+        self.schedule = None
+        self.queue = None
+        self.credentials = None
+        self.channelCredentials = {}
+        self.pathMap = None
+        self.supervisor = StreamSupervisor() if supervisor is None else supervisor
+        self.imageName = imageName
+        self.transcoder = None
+        self.mediaIndex = None
+        self.journal = None
+        self.containerEvents = None  # dockerevents.ContainerEvents
+        self.instance = uuid.uuid4().hex  # kept in the journal across restarts
+        self.nowDT = datetime.datetime.now()
+
+
+def notice(kind, message, channel=None, data=None):
+    return Notice(kind, channel, message, data)
+
+
+def scheduleNotice(state):
+    """Snapshot of the running and upcoming events for front ends"""
+    return notice("schedule", "", data=scheduleRows(state))
+
+
+def scheduleRows(state):
+    """Returns a ScheduleRow of every running, prepared and queued
+    event in start order"""
+    supervisor = state.supervisor
+    running = sorted(
+        (slot for _, slot in supervisor.items() if slot.event is not None),
+        key=lambda slot: slot.event.time,
+    )
+    status = {slot.event.seq: "prepared" for slot in supervisor.warm.values()}
+    for slot in running + list(supervisor.warm.values()):
+        if slot.session is not None:
+            for event in slot.session.events[1:]:
+                status.setdefault(event.seq, "session")
+    rows = [ScheduleRow(slot.event, "running", None) for slot in running]
+    if state.queue is not None:
+        rows += [
+            ScheduleRow(event, status.get(event.seq, "queued"), None)
+            for event in state.queue
+        ]
+    if state.mediaIndex is not None:
+        durations = state.mediaIndex.durations({row.event.file for row in rows})
+        rows = [row._replace(duration=durations[row.event.file]) for row in rows]
+    return rows
+
+
+# docker related functions
+
+
+def checkDocker(imageName, engine=None, adoptable=(), instance=None):
+    """Checks if docker is installed and
+    whether the right container is available. Containers with
+    an id in adoptable or started by the scheduler instance
+    are streams of an earlier run.
+    Returns a list of problems."""
+    if shutil.which("docker") is None:
+        return ["Docker is not installed!"]
+    import docker
+
+    # checker whether docker client is reachable
+    try:
+        client = getEngine() if engine is None else engine
+        client.version()
+    except BaseException:
+        return ["Docker is not running!"]
+    problems = []
+    # check whether image is installed
+    try:
+        client.images.get(imageName)
+    except docker.errors.ImageNotFound:
+        problems.append(f"{imageName} not found in docker.images!")
+    others = countImages(imageName, engine=client)
+    if others and (adoptable or instance is not None):
+        # streams of an earlier run are taken over
+        ours = set(adoptable)
+        if instance is not None:
+            ours |= listContainers(client, instanceFilters(instance)).keys()
+        running = imageContainers(client, imageName)
+        others = len({journal.containerId(cont) for cont in running} - ours)
+    if others != 0:
+        problems.append(
+            "Other containers with the same image are running!\n Please stop the containers."
+        )
+    return problems
+
+
+def checkFfmpeg(engine=None):
+    """Checks whether an engine without docker,
+    e.g. a processengine.ProcessEngine, finds ffmpeg.
+    Returns a list of problems."""
+    client = getEngine() if engine is None else engine
+    try:
+        client.version()
+    except OSError as error:
+        return [f"ffmpeg is not available: {error}"]
+    return []
+
+
+def workerContainer(container):
+    """Whether container transcodes or probes for the scheduler"""
+    return (getattr(container, "labels", None) or {}).get(LABEL) in WORKER_ROLES
+
+
+def imageContainers(client, imageName):
+    """Running containers of the image that stream,
+    transcodes and probes of the scheduler are left out"""
+    containers = client.containers.list(filters={"ancestor": imageName})
+    return [cont for cont in containers if not workerContainer(cont)]
+
+
+def countImages(imageName, engine=None):
+    """Number of running stream containers of the image"""
+    client = getEngine() if engine is None else engine
+    return len(imageContainers(client, imageName))
+
+
+def listContainers(client, filters):
+    """Returns {id: container} of the running containers that docker
+    selects by filters, so that the answer scales with our streams
+    and not with all containers of the host"""
+    containers = client.containers.list(filters=filters)
+    return {journal.containerId(cont): cont for cont in containers}
+
+
+def instanceFilters(instance):
+    """Filters of the stream containers of a scheduler instance"""
+    return {"label": [f"{LABEL}=stream", f"{INSTANCE_LABEL}={instance}"]}
+
+
+def streamLabels(state, event=None, role="stream"):
+    """Labels of a container the scheduler starts"""
+    labels = {LABEL: role, INSTANCE_LABEL: state.instance}
+    if event is not None:
+        labels[CHANNEL_LABEL] = str(event.channel)
+        labels[ITEM_LABEL] = event.time.isoformat()
+        labels[FILE_LABEL] = str(event.file)
+    return labels
+
+
+def labelEvent(labels):
+    """The schedule item of a container with streamLabels or None"""
+    try:
+        time = datetime.datetime.fromisoformat(labels[ITEM_LABEL])
+        return ScheduleEvent(time, -1, labels[FILE_LABEL], labels[CHANNEL_LABEL])
+    except (KeyError, ValueError):
+        return None
+
+
+def fillRTMP(credentials):
+    return RTMPSETTINGS_TEMPLATE.format(
+        credentials["rtmp-URL"],
+        credentials["User"],
+        credentials["Password"],
+        credentials["playpath"],
+    )
+
+
+def dispatch_test_stream(credentials, engine=None, labels=None):
+    """Starts streaming a test picture via ffmpeg.
+    Returns docker container object or None."""
+    # fill in ffmpeg
+    ffmpegCommand = FFMPEG_TEMPLATE_TEST.format(fillRTMP(credentials))
+    # use shared docker client
+    import docker
+
+    client = getEngine() if engine is None else engine
+    # start container
+    try:
+        contID = client.containers.run(
+            IMAGE_NAME, ffmpegCommand, detach=True, labels=labels
+        )
+    except docker.errors.DockerException:
+        logger.error("Docker is not ready/installed!")
+        return None
+    else:
+        return contID
+
+
+def streamCommand(videofile, credentials, seek=None):
+    """ffmpeg command of a stream, renditions are only remuxed.
+    With seek the input starts that many seconds in."""
+    if videofile.startswith(f"{PLAYLIST_MOUNT}/"):
+        template = FFMPEG_TEMPLATE_PLAYLIST
+    elif videofile.startswith(f"{RENDITION_MOUNT}/"):
+        template = FFMPEG_TEMPLATE_COPY
+    else:
+        template = FFMPEG_TEMPLATE
+    command = template.format(videofile, fillRTMP(credentials))
+    if seek:
+        command = command.replace("-i ", INPUT_SEEK.format(seek), 1)
+    return command
+
+
+def dispatch_stream(
+    videofile, credentials, pathmap, engine=None, labels=None, seek=None
+):
+    """Starts streaming via ffmpeg, seek seconds into the input.
+    Returns docker container object or None."""
+    # fill in ffmpeg
+    ffmpegCommand = streamCommand(videofile, credentials, seek)
+    # use shared docker client
+    import docker
+
+    client = getEngine() if engine is None else engine
+    try:
+        contID = client.containers.run(
+            IMAGE_NAME, ffmpegCommand, detach=True, volumes=pathmap, labels=labels
+        )
+    except docker.errors.DockerException:
+        logger.error("Docker is not ready/installed")
+        return None
+    else:
+        logger.debug(f"Stream dispatched with contID {contID}")
+        return contID
+
+
+def prepare_stream(videofile, credentials, pathmap, engine=None, labels=None):
+    """Creates the container of a stream without starting it.
+    Returns docker container object or None."""
+    ffmpegCommand = streamCommand(videofile, credentials)
+    import docker
+
+    client = getEngine() if engine is None else engine
+    try:
+        contID = client.containers.create(
+            IMAGE_NAME, ffmpegCommand, detach=True, volumes=pathmap, labels=labels
+        )
+    except docker.errors.DockerException as error:
+        logger.error(f"Could not prepare stream: {error}")
+        return None
+    else:
+        logger.debug(f"Stream prepared with contID {contID}")
+        return contID
+
+
+def probeInput(fileName, size=PROBE_SIZE):
+    """Reads the start of a video file so that ffmpeg
+    finds it in the page cache. Returns False if it is not readable."""
+    try:
+        with open(fileName, "rb") as fileObj:
+            fileObj.read(size)
+    except OSError as error:
+        logger.warning(f"Could not probe {fileName}: {error}")
+        return False
+    return True
+
+
+def removeContainer(container):
+    try:
+        container.remove(force=True)
+    except Exception as error:
+        logger.warning(f"Could not remove prepared container: {error}")
+
+
+def stopStreams(state):
+    """Stops the containers of all streams of the state"""
+    dropAllPrepared(state)
+    state.supervisor.recovery.cancel()
+    for slot in state.supervisor.releaseAll():
+        slot.container.stop()
+        if state.journal is not None:
+            state.journal.finished(slot.event, slot.container, journal.STOPPED)
+        logger.info(f"Stream on {slot.channel} stopped")
+    flushJournal(state)
+
+
+def flushJournal(state):
+    """Commits the journal entries of a step in one transaction"""
+    if state.journal is not None:
+        state.journal.flush()
+
+
+def adoptableContainers(state):
+    """Ids of the containers the journal recorded as running"""
+    if state.journal is None:
+        return set()
+    return {identifier for _, identifier in state.journal.running()}
+
+
+def adoptStreams(state, engine=None):
+    """Takes over the stream containers an earlier run left running,
+    so that they are monitored again instead of blocking docker.
+    Streams whose container is gone are recorded as lost."""
+    if state.journal is None:
+        return []
+    client = getEngine() if engine is None else engine
+    journaled = {identifier: event for event, identifier in state.journal.running()}
+    containers = listContainers(client, instanceFilters(state.instance))
+    if journaled.keys() - containers.keys():
+        containers.update(listContainers(client, {"id": list(journaled)}))
+    for identifier, event in journaled.items():
+        if identifier not in containers:
+            logger.warning(f"Stream on {event.channel} of {event.time} was lost")
+            state.journal.finished(event, identifier, journal.LOST)
+    notices = []
+    for identifier, container in containers.items():
+        event = journaled.get(identifier) or labelEvent(container.labels)
+        if event is None or event.channel in state.supervisor:
+            logger.warning(f"Container {identifier} is not taken over")
+            continue
+        if identifier not in journaled:
+            # started right before the last run ended
+            state.journal.dispatched(event, container)
+        slot = state.supervisor.attach(event.channel, container, event)
+        slot.adopted = True
+        slot.follower = LogFollower(container).start()
+        logger.info(f"Stream on {event.channel} of {event.time} taken over")
+        notices.append(
+            notice(
+                "adopted",
+                f"Stream on {event.channel} taken over: {Path(event.file).name}",
+                event.channel,
+                event,
+            )
+        )
+    flushJournal(state)
+    if notices:
+        notices.append(scheduleNotice(state))
+    return notices
+
+
+def dropAllPrepared(state):
+    for slot in list(state.supervisor.warm.values()):
+        dropPrepared(state, slot.event)
+
+
+# docker steps of the window, they run on the scheduler thread
+
+
+def verifyDocker(state, engine=None):
+    """Reports the problems of the docker setup as error notices"""
+    problems = checkDocker(
+        state.imageName, engine, adoptableContainers(state), state.instance
+    )
+    for problem in problems:
+        logger.error(problem)
+    return [notice("error", problem) for problem in problems]
+
+
+def startTestStream(state, engine=None):
+    """Streams the test picture on the default channel"""
+    if state.credentials is None:
+        logger.error("No credentials specified!")
+        return [notice("error", "No credentials specified!")]
+    if state.supervisor.isActive(DEFAULT_CHANNEL):
+        logger.error("A stream is already running!")
+        return [notice("error", "A stream is already running!")]
+    container = dispatch_test_stream(
+        state.credentials, engine=engine, labels=streamLabels(state, role="test")
+    )
+    if container is None:
+        return [notice("error", "Docker is not ready/installed!")]
+    state.supervisor.attach(DEFAULT_CHANNEL, container)
+    return [notice("testStarted", "Waiting", DEFAULT_CHANNEL)]
+
+
+def stopTestStream(state, engine=None):
+    """Stops the stream of the default channel"""
+    slot = state.supervisor.release(DEFAULT_CHANNEL)
+    if slot is None:
+        logger.error("No container is running!")
+        return [notice("error", "No container is running!")]
+    slot.container.stop()
+    if state.journal is not None:
+        state.journal.finished(slot.event, slot.container, journal.STOPPED)
+    active = countImages(state.imageName, engine=engine) != 0
+    return [notice("stopped", "", DEFAULT_CHANNEL, {"active": active})]
+
+
+def stopImageContainers(state, imageName=None, engine=None):
+    """Stops all running stream containers of the image,
+    also those that this scheduler did not start"""
+    imageName = state.imageName if imageName is None else imageName
+    dropAllPrepared(state)
+    state.supervisor.recovery.cancel()
+    for slot in state.supervisor.releaseAll():
+        if state.journal is not None:
+            state.journal.finished(slot.event, slot.container, journal.STOPPED)
+    client = getEngine() if engine is None else engine
+    containers = imageContainers(client, imageName)
+    if len(containers) == 0:
+        logger.info("No containers are running!")
+        return [notice("stopped", "", data={"active": False})]
+    for cont in containers:
+        cont.stop()
+    logger.info("All containers stopped!")
+    return [notice("stopped", "All containers stopped!", data={"active": False})]
+
+
+# parsing related functions
+
+
+def readSchedule(filename, cache=None):
+    """Reads, checks and normalizes a schedule workbook.
+    Unchanged workbooks are served from the cache.
+    Returns the schedule, the credentials sheet and the
+    validation report; the schedule is None if it is not valid."""
+    from validation import validateSchedule, validateFiles, normalizeSchedule
+
+    cache = getCache() if cache is None else cache
+    key = cache.key(filename)
+    cached = cache.load(key)
+    if cached is not None:
+        schedule, credentials = cached
+        # video files might have been moved since
+        report = validateFiles(schedule["File"])
+        if not report.ok:
+            return None, None, report
+        logger.info("Config read from cache")
+        return schedule, credentials, report
+    schedule, credentials = readWorkbook(filename)
+    # check format of config
+    report = validateSchedule(schedule)
+    if not report.ok:
+        return None, None, report
+    # combine date and time for display and sort by it
+    schedule = normalizeSchedule(schedule)
+    cache.store(key, schedule, credentials)
+    return schedule, credentials, report
+
+
+def checkTiming(df):
+    """Checks the time difference between streams of the same channel"""
+    if "Channel" in df.columns:
+        diffs = df.groupby("Channel")["Date/Time"].diff()
+    else:
+        diffs = df["Date/Time"].diff()
+    # LOGGING
+    logger.debug(f"Time differences: {diffs}")
+    return not (diffs < MIN_GAP).any()
+
+
+def checkOverlaps(mediaIndex, schedule):
+    """Checks streams against the real durations of their files,
+    streams of files that cannot be probed last MIN_GAP.
+    Returns a ValidationReport."""
+    from validation import validateOverlaps
+
+    durations = mediaIndex.durations(schedule["File"].unique())
+    return validateOverlaps(schedule, durations, MIN_GAP)
+
+
+def parseCredentials(credentials):
+    """Maps each channel to its row of the Credentials sheet.
+    Sheets without a Channel column hold the default channel."""
+    if "Channel" not in credentials.columns:
+        return {DEFAULT_CHANNEL: credentials.T[0].to_dict()}
+    credentials = credentials.set_index(credentials["Channel"].astype(str))
+    return credentials.drop(columns="Channel").to_dict(orient="index")
+
+
+def missingChannels(schedule, channelCredentials):
+    """Returns the channels without credentials"""
+    if "Channel" in schedule.columns:
+        channels = set(schedule["Channel"].astype(str))
+    else:
+        channels = {DEFAULT_CHANNEL}
+    return sorted(channels - set(channelCredentials))
+
+
+def checkSchedule(state, schedule):
+    """Returns error notices of streams that overlap"""
+    if state.mediaIndex is not None:
+        report = checkOverlaps(state.mediaIndex, schedule)
+        if not report.ok:
+            return [notice("error", str(report))]
+    elif not checkTiming(schedule):
+        return [notice("error", "Stream timepoints are closer together than 30 min!")]
+    return []
+
+
+def applyCredentials(state, schedule, credentials):
+    """Loads the credentials and the docker path map of a schedule.
+    Returns error notices of channels without credentials."""
+    state.channelCredentials = parseCredentials(credentials)
+    state.credentials = next(iter(state.channelCredentials.values()))
+    missing = missingChannels(schedule, state.channelCredentials)
+    if len(schedule) > 0:
+        # add pathmap for docker mapping
+        tempBase = Path(schedule["File"].values[0]).parent
+        state.pathMap = {tempBase: {"bind": "/vids"}}
+    if missing:
+        return [notice("error", f"No credentials for channels: {', '.join(missing)}!")]
+    return []
+
+
+def loadSchedule(state, schedule, credentials):
+    """Replaces the schedule of state by a checked schedule"""
+    notices = checkSchedule(state, schedule)
+    # prune out past events
+    schedule = schedule.loc[schedule["Date/Time"] > state.nowDT, :]
+    if len(schedule) == 0:
+        notices.append(notice("error", "Only past events provided!"))
+    elif credentials is None:
+        notices.append(notice("error", "No credentials specified!"))
+    else:
+        notices += applyCredentials(state, schedule, credentials)
+        state.schedule = schedule
+        # seqs start over in the new queue, containers prepared
+        # for the old one would never start and block their channel
+        dropAllPrepared(state)
+        state.supervisor.prepared.clear()
+        state.queue = EventQueue.fromSchedule(schedule)
+        if state.journal is not None:
+            state.journal.replaceQueue(state.queue)
+        if state.transcoder is not None:
+            state.transcoder.submitAll(schedule["File"].unique())
+        notices.append(scheduleNotice(state))
+        logger.info("Config loaded succesfully")
+    for item in notices:
+        if item.kind == "error":
+            logger.error(item.message)
+    return notices
+
+
+def restoreSchedule(state, schedule, credentials, report=None):
+    """Rebuilds the queue of an earlier run from the journal and merges
+    the changes the workbook got since. Loads the schedule if the
+    journal has no queued items."""
+    events = [] if state.journal is None else state.journal.pendingItems(state.nowDT)
+    if not events or schedule is None:
+        return reloadSchedule(state, schedule, credentials, report)
+    state.queue = EventQueue(events)
+    if state.transcoder is not None:
+        state.transcoder.submitAll({event.file for event in events})
+    logger.info(f"{len(events)} streams restored from the journal")
+    return reloadSchedule(state, schedule, credentials)
+
+
+def restoreWorkbook(state, path, cache=None):
+    """Restores the schedule of the workbook the journal names"""
+    schedule, credentials, report = readSchedule(path, cache)
+    return restoreSchedule(state, schedule, credentials, report)
+
+
+def diffQueue(queue, events):
+    """Compares the queued events with the events of a new schedule.
+    Returns the new events that are not queued and the queued events
+    that are not in the new schedule. Events are equal if they have
+    the same time, file and channel, duplicates count separately."""
+    queued = collections.Counter(itemKey(event) for event in queue)
+    wanted = collections.Counter(itemKey(event) for event in events)
+    removed = []
+    for event in queue:
+        key = itemKey(event)
+        if wanted[key] > 0:
+            wanted[key] -= 1
+        else:
+            removed.append(event)
+    added = []
+    for event in events:
+        key = itemKey(event)
+        if queued[key] > 0:
+            queued[key] -= 1
+        else:
+            added.append(event)
+    return added, removed
+
+
+def countMoved(added, removed):
+    """Number of removed events whose file plays on
+    the same channel at another time in added"""
+    before = collections.Counter((event.file, event.channel) for event in removed)
+    after = collections.Counter((event.file, event.channel) for event in added)
+    return sum((before & after).values())
+
+
+def reloadSchedule(state, schedule, credentials, report=None):
+    """Applies a changed schedule workbook to the queue. Only the
+    difference is applied: new events are queued, events that are gone
+    are dropped with their prepared containers, moved events are both.
+    Running streams are not touched. schedule is None if the workbook
+    is not valid, the report tells why."""
+    if schedule is None:
+        message = f"Schedule not reloaded: {report}"
+        logger.error(message)
+        return [notice("error", message)]
+    if state.queue is None:
+        return loadSchedule(state, schedule, credentials)
+    notices = checkSchedule(state, schedule)
+    schedule = schedule.loc[schedule["Date/Time"] > state.nowDT, :]
+    if credentials is not None:
+        notices += applyCredentials(state, schedule, credentials)
+    # streams that already play are not queued again
+    playing = {
+        itemKey(slot.event)
+        for _, slot in state.supervisor.items()
+        if slot.event is not None
+    }
+    events = [
+        event
+        for event in EventQueue.fromSchedule(schedule)
+        if itemKey(event) not in playing
+    ]
+    added, removed = diffQueue(state.queue, events)
+    state.queue.remove(removed)
+    if state.journal is not None:
+        state.journal.dropped(removed, journal.REMOVED)
+    for event in removed:
+        if sessionOf(state, event) is not None:
+            logger.warning(
+                f"Stream on {event.channel} at {event.time} is already"
+                " in a running playlist and still plays"
+            )
+        dropPrepared(state, event)
+    pushed = [
+        state.queue.push(event.time, event.file, event.channel) for event in added
+    ]
+    if state.journal is not None:
+        state.journal.queued(pushed)
+    state.schedule = schedule
+    if added and state.transcoder is not None:
+        state.transcoder.submitAll({event.file for event in added})
+    moved = countMoved(added, removed)
+    counts = {
+        "added": len(added) - moved,
+        "removed": len(removed) - moved,
+        "moved": moved,
+    }
+    message = ", ".join(f"{count} {change}" for change, count in counts.items())
+    logger.info(f"Schedule reloaded: {message}")
+    notices.append(notice("reloaded", f"Schedule reloaded: {message}", data=counts))
+    if added or removed:
+        notices.append(scheduleNotice(state))
+    for item in notices:
+        if item.kind == "error":
+            logger.error(item.message)
+    return notices
+
+
+def parseContainerOutput(contID):
+    """Parses container output, yields the newest
+    bitrate of the last status line or None"""
+    while True:
+        line = contID.logs(tail=1)
+        # logger, only formatted when it is shown
+        logger.debug("Container Output is: %r", line)
+        yield lastBitrate(line)
+
+
+def parseFailure(container, detector=None):
+    """Check if container has failed.
+    The detector of the log follower only reads the messages
+    written since it started, without one the whole log is read.
+    Returns a monitor.Failure or None."""
+    if detector is None:
+        detector = FailureDetector()
+    try:
+        detector.check(container)
+    except Exception as error:
+        # the docker host of the container went away
+        detector.failure = detector.failure or Failure("unreachable", str(error))
+    failure = detector.failure
+    if failure is not None:
+        # logger
+        logger.error(
+            f"Stream Failed! ({failure.kind}) With the following line {failure.line}"
+        )
+    return failure
+
+
+# scheduling steps
+
+
+def dispatchDue(state, now, dispatch=None):
+    """Starts all streams that are due at now"""
+    if state.queue is None:  # not schedule loaded
+        return []
+    dispatch = dispatch_stream if dispatch is None else dispatch
+    notices = []
+    # prune streams that were missed
+    missed = state.queue.prunePast(now - START_TOLERANCE)
+    for event in missed:
+        dropPrepared(state, event)
+    if missed and state.journal is not None:
+        state.journal.dropped(missed, journal.SKIPPED)
+    notices.extend(prunePast(state, now))
+    changed = len(missed) > 0
+    nextEvent = state.queue.peek()
+    while nextEvent is not None and nextEvent.time <= now:
+        if sessionOf(state, nextEvent) is not None:
+            state.supervisor.prepared.discard(nextEvent.seq)
+            if state.journal is not None:
+                slot = state.supervisor.get(nextEvent.channel)
+                state.journal.dispatched(nextEvent, slot and slot.container)
+            notices.append(continueSession(nextEvent))
+        elif state.supervisor.canStart(nextEvent.channel):
+            notices.append(startStream(state, nextEvent, now, dispatch))
+        else:
+            logger.error(f"Stream on {nextEvent.channel} skipped, no free slot!")
+            dropPrepared(state, nextEvent)
+            if state.journal is not None:
+                state.journal.dropped([nextEvent], journal.SKIPPED)
+        # pluck the event from the queue. Even if there was an error, otherwise streams in the future will not run
+        state.queue.pop()
+        changed = True
+        nextEvent = state.queue.peek()
+    if changed:
+        notices.append(scheduleNotice(state))
+    return notices
+
+
+def containerPath(videoFile):
+    """Path of a video file inside the container"""
+    return f"/vids/{Path(videoFile).name}"
+
+
+def localFiles():
+    """Whether streams can mount files that only the scheduler has, the
+    renditions and playlists. Containers on other docker hosts cannot."""
+    return getattr(getEngine(), "localFiles", True)
+
+
+def fileInput(state, videoFile):
+    """Returns the path of a video file inside the container and the
+    volumes it needs, the rendition of the file if there is one."""
+    if state.transcoder is not None and localFiles():
+        rendition = state.transcoder.rendition(videoFile)
+        if rendition is not None:
+            volumes = {str(rendition.parent): {"bind": RENDITION_MOUNT, "mode": "ro"}}
+            return f"{RENDITION_MOUNT}/{rendition.name}", volumes
+    return containerPath(videoFile), {}
+
+
+def hostPath(path, volumes):
+    """Path on the host of a path inside the container,
+    path itself if no volume holds it"""
+    for source, spec in (volumes or {}).items():
+        bind = spec["bind"].rstrip("/")
+        if path == bind or path.startswith(f"{bind}/"):
+            return f"{str(source).rstrip('/')}{path[len(bind):]}"
+    return path
+
+
+def itemInput(state, videoFile):
+    """fileInput of an item of a playlist. ffmpeg reads the playlist
+    itself, so engines without containers get the path on the host."""
+    videoInput, volumes = fileInput(state, videoFile)
+    if getattr(getEngine(), "localPaths", False):
+        return hostPath(videoInput, {**(state.pathMap or {}), **volumes}), {}
+    return videoInput, volumes
+
+
+def streamInput(state, event):
+    """Returns the input inside the container, the volumes and the
+    playout session of the stream of event. Streams followed back
+    to back by others on their channel are played as one session."""
+    videoInput, volumes = fileInput(state, event.file)
+    session, sessionVolumes = planSession(state, event)
+    if session is not None:
+        videoInput = session.input
+        volumes.update(sessionVolumes)
+    if not volumes:
+        return videoInput, state.pathMap, session
+    return videoInput, {**(state.pathMap or {}), **volumes}, session
+
+
+def duration(state, event):
+    """Seconds the video of event runs or None"""
+    return state.mediaIndex.durations([event.file])[event.file]
+
+
+def planSession(state, event):
+    """Returns a PlayoutSession of event and the streams following
+    it back to back and the volumes it needs, None if there are none."""
+    if state.mediaIndex is None or state.queue is None or not localFiles():
+        return None, {}
+    following = chain(state.queue.walk(), event, partial(duration, state))
+    if not following:
+        return None, {}
+    try:
+        session = PlayoutSession(event.channel)
+    except OSError as error:
+        logger.warning(f"Not joining streams on {event.channel}: {error}")
+        return None, {}
+    volumes = session.volumes()
+    for item in [event] + following:
+        videoInput, itemVolumes = itemInput(state, item.file)
+        session.add(item, videoInput, duration(state, item))
+        volumes.update(itemVolumes)
+    logger.info(f"Playing {len(session)} streams on {event.channel} back to back")
+    return session, volumes
+
+
+def sessionOf(state, event):
+    """Returns the running or prepared session that plays event or None"""
+    supervisor = state.supervisor
+    for slot in (supervisor.get(event.channel), supervisor.warm.get(event.channel)):
+        if slot is None or slot.session is None or slot.event == event:
+            continue
+        if event in slot.session:
+            return slot.session
+    return None
+
+
+def continueSession(event):
+    logger.info(f"Stream continues session: {event.file} on {event.channel}")
+    return notice(
+        "started",
+        f"Stream start: {Path(event.file).name} at {event.time} on {event.channel}",
+        event.channel,
+        event,
+    )
+
+
+def extendSession(state, slot):
+    """Appends streams that were scheduled back to back with the
+    last item of the session, while the last item did not start yet."""
+    session = slot.session
+    sample = None if slot.follower is None else slot.follower.latest()
+    if state.queue is None or not session.canExtend(position(slot, sample)):
+        return
+    last = session.events[-1]
+    for item in chain(state.queue.walk(), last, partial(duration, state)):
+        if item in session:
+            continue
+        videoInput, volumes = itemInput(state, item.file)
+        if not volumes.items() <= (slot.volumes or {}).items():
+            # the container cannot see the file
+            break
+        session.add(item, videoInput, duration(state, item))
+        logger.info(f"Session on {slot.channel} extended by {item.file}")
+
+
+def startStream(state, event, now, dispatch):
+    """Starts the stream of event on its channel.
+    A container prepared ahead of time is only started,
+    otherwise a new one is dispatched."""
+    videoFile = event.file
+    logger.debug(f"Next stream is: {videoFile} - {event.time} on {event.channel}")
+    slot = launchPrepared(state, event)
+    if slot is None:
+        credentials = state.channelCredentials.get(event.channel, state.credentials)
+        videoInput, pathMap, session = streamInput(state, event)
+        container = dispatch(
+            videoInput, credentials, pathMap, labels=streamLabels(state, event)
+        )
+        if container is None:
+            if session is not None:
+                session.cleanup()
+            logger.error("Error starting stream. Docker is not ready/installed.")
+            if state.journal is not None:
+                state.journal.dropped([event], journal.FAILED)
+            return notice(
+                "startFailed",
+                "Error starting stream. Docker is not ready/installed.",
+                event.channel,
+            )
+        slot = state.supervisor.attach(event.channel, container, event)
+        slot.session, slot.volumes = session, pathMap
+    if state.journal is not None:
+        state.journal.dispatched(event, slot.container)
+    # follow from the start to catch the first frame
+    slot.follower = LogFollower(slot.container).start()
+    logger.info(f"Stream started {now - event.time} after schedule!")
+    return notice(
+        "started",
+        f"Stream start: {Path(videoFile).name} at {event.time} on {event.channel}",
+        event.channel,
+        event,
+    )
+
+
+def launchPrepared(state, event):
+    """Starts the container prepared for event.
+    Returns its slot or None if there is none or it did not start."""
+    slot = state.supervisor.launch(event)
+    if slot is None:
+        return None
+    try:
+        slot.container.start()
+    except Exception as error:
+        logger.error(f"Prepared stream did not start, dispatching it again: {error}")
+        state.supervisor.release(event.channel)
+        removeContainer(slot.container)
+        return None
+    return slot
+
+
+def dropPrepared(state, event):
+    """Removes the container prepared for an event that will not run"""
+    slot = state.supervisor.discard(event)
+    if slot is not None:
+        removeContainer(slot.container)
+
+
+def prewarmDue(state, now, prepare=None):
+    """Creates the containers of streams that start within
+    the prewarm lead, so that they only need to be started."""
+    if state.queue is None:
+        return []
+    prepare = prepare_stream if prepare is None else prepare
+    supervisor = state.supervisor
+    notices = []
+    for event in state.queue.walk():
+        if event.time > now + supervisor.prewarmLead:
+            break
+        if event.time <= now or event.seq in supervisor.prepared:
+            continue
+        # try every event only once
+        supervisor.prepared.add(event.seq)
+        if sessionOf(state, event) is not None:
+            continue
+        if not supervisor.canPrepare(event.channel):
+            logger.debug(f"No slot to prepare stream on {event.channel}")
+            continue
+        probeInput(event.file)
+        credentials = state.channelCredentials.get(event.channel, state.credentials)
+        videoInput, pathMap, session = streamInput(state, event)
+        container = prepare(
+            videoInput, credentials, pathMap, labels=streamLabels(state, event)
+        )
+        if container is None:
+            if session is not None:
+                session.cleanup()
+            notices.append(
+                notice(
+                    "prepareFailed",
+                    f"Could not prepare stream on {event.channel}, starting it late",
+                    event.channel,
+                    event,
+                )
+            )
+            continue
+        slot = supervisor.prepare(event.channel, container, event)
+        slot.session, slot.volumes = session, pathMap
+        logger.info(f"Stream on {event.channel} prepared {event.time - now} ahead")
+    return notices
+
+
+def prunePast(state, now):
+    """Gets rid of streams that are in the past.
+    This can happen if two streams are scheduled
+    right after each after on one channel and the first
+    one takes longer than the difference."""
+    if state.queue is None or not state.supervisor.isActive():
+        return []
+    pruned = False
+    nextEvent = state.queue.peek()
+    while (
+        nextEvent is not None
+        and nextEvent.time <= now
+        and not state.supervisor.canStart(nextEvent.channel)
+        and sessionOf(state, nextEvent) is None
+    ):
+        logger.warning(f"Stream on {nextEvent.channel} skipped, channel is busy!")
+        dropPrepared(state, state.queue.pop())
+        if state.journal is not None:
+            state.journal.dropped([nextEvent], journal.SKIPPED)
+        pruned = True
+        nextEvent = state.queue.peek()
+    return [scheduleNotice(state)] if pruned else []
+
+
+def retryDue(state, now, dispatch=None):
+    """Restarts the failed streams whose backoff is over"""
+    dispatch = dispatch_stream if dispatch is None else dispatch
+    return [
+        restartStream(state, retry, dispatch)
+        for retry in state.supervisor.recovery.due(now.timestamp())
+    ]
+
+
+def restartStream(state, retry, dispatch):
+    """Dispatches the stream of retry again, seeking to the position
+    ffmpeg confirmed before it failed"""
+    recovery = state.supervisor.recovery
+    event, channel = retry.event, retry.channel
+    name = Path(event.file).name
+    if not state.supervisor.canStart(channel):
+        # the next stream of the channel started meanwhile
+        recovery.finish(retry, "superseded")
+        return notice(
+            "failed",
+            f"Stream on {channel} not restarted, the channel is busy",
+            channel,
+            {"active": state.supervisor.isActive(), "failure": None, "retry": retry},
+        )
+    length = None if state.mediaIndex is None else duration(state, event)
+    if length is not None and retry.position >= length:
+        recovery.finish(retry, "complete")
+        return notice(
+            "ended",
+            f"Stream on {channel} failed at the end of {name}",
+            channel,
+            {"active": state.supervisor.isActive(), "failure": None, "retry": retry},
+        )
+    credentials = state.channelCredentials.get(channel, state.credentials)
+    videoInput, pathMap, session = streamInput(state, event)
+    container = dispatch(
+        videoInput,
+        credentials,
+        pathMap,
+        labels=streamLabels(state, event),
+        seek=retry.position,
+    )
+    recovery.attempt(retry, journal.containerId(container))
+    if state.journal is not None:
+        message = f"attempt {len(retry.attempts)} at {retry.position:.3f} s"
+        state.journal.log("retry", event, container, message)
+    if container is None:
+        if session is not None:
+            session.cleanup()
+        if recovery.schedule(retry):
+            return notice(
+                "interrupted",
+                f"Could not restart the stream on {channel}, trying again",
+                channel,
+                {"active": state.supervisor.isActive(), "retry": retry},
+            )
+        logger.error(f"Gave up restarting the stream on {channel}")
+        return notice(
+            "failed",
+            f"Gave up restarting the stream on {channel}",
+            channel,
+            {"active": state.supervisor.isActive(), "failure": None, "retry": retry},
+        )
+    slot = state.supervisor.attach(channel, container, event)
+    slot.session, slot.volumes = session, pathMap
+    slot.offset, slot.retry = retry.position, retry
+    if state.journal is not None:
+        state.journal.dispatched(event, container, restart=True)
+    slot.follower = LogFollower(container).start()
+    return notice(
+        "resumed",
+        f"Stream on {channel} restarted at {formatSeconds(retry.position)}"
+        f" of {name} (attempt {len(retry.attempts)})",
+        channel,
+        retry,
+    )
+
+
+def nextDelay(state, now):
+    """Seconds until the next stream is due, has to be
+    prepared or restarted, None if there is none"""
+    delays = [
+        queueDelay(state, now),
+        state.supervisor.recovery.nextDelay(now.timestamp()),
+    ]
+    delays = [delay for delay in delays if delay is not None]
+    return min(delays) if delays else None
+
+
+def queueDelay(state, now):
+    """Seconds until the next stream is due or has to be prepared"""
+    if state.queue is None:
+        return None
+    delay = state.queue.delayUntilNext(now)
+    if delay is None:
+        return None
+    supervisor = state.supervisor
+    for event in state.queue.walk():
+        prewarmAt = (event.time - supervisor.prewarmLead - now).total_seconds()
+        if prewarmAt >= delay:
+            break
+        if event.seq not in supervisor.prepared:
+            return max(prewarmAt, 0)
+    return delay
+
+
+# monitoring steps
+
+
+def pollStreams(state, engine=None):
+    """checks whether Streams are running and
+    reports their bitrates and how they ended."""
+    notices = []
+    listed = None
+    rates = {}
+    unhealthy = {}
+    events = state.containerEvents
+    live = events is not None and events.live()
+    for channel, slot in state.supervisor.items():
+        status = slot.container.status
+        if live:
+            # docker told us about every exit, nothing has to be listed
+            if events.exited(journal.containerId(slot.container)):
+                notices.append(endStream(state, slot))
+                continue
+        elif status == "created" or slot.adopted:
+            # check whether stream is in client, list only once per check
+            if listed is None:
+                token = None if events is None else events.beginSync()
+                listed = runningStreams(state, engine)
+                if events is not None:
+                    events.endSync(token)
+            if journal.containerId(slot.container) not in listed:
+                notices.append(endStream(state, slot))
+                continue
+        if status in ("created", "running"):
+            if slot.session is not None:
+                extendSession(state, slot)
+            # get bitrate
+            rates[channel] = streamRate(slot)
+            checks = (
+                checkFirstFrame(state, slot),
+                checkRecovered(state, slot),
+                checkHealth(slot),
+            )
+            for check in checks:
+                if check is not None:
+                    notices.append(check)
+            if slot.health is not None:
+                unhealthy[channel] = slot.health
+    if rates:
+        notices.append(
+            notice(
+                "status",
+                formatRates(rates),
+                data={"rates": rates, "unhealthy": unhealthy},
+            )
+        )
+    return notices
+
+
+def runningStreams(state, engine=None):
+    """Ids of the containers of the supervisor that still run,
+    docker only looks them up by id"""
+    client = getEngine() if engine is None else engine
+    ids = [journal.containerId(slot.container) for _, slot in state.supervisor.items()]
+    return listContainers(client, {"id": ids}).keys() if ids else set()
+
+
+def exitStatus(state, container):
+    """Exit code and OOM flag of an exited container from the docker
+    events, (None, False) without them"""
+    events = state.containerEvents
+    if events is None:
+        return None, False
+    identifier = journal.containerId(container)
+    exited = events.state(identifier)
+    events.forget(identifier)
+    if exited is None:
+        return None, False
+    return exited.exitCode, exited.oom
+
+
+def endStream(state, slot):
+    """Cleans up a stream whose container has exited
+    and reports how it ended."""
+    # check whether there is a failure
+    detector = None
+    if slot.follower is not None:
+        slot.follower.finish()
+        detector = slot.follower.detector
+    checkRecovered(state, slot)
+    confirmed = None if slot.follower is None else slot.follower.latest()
+    state.supervisor.release(slot.channel)
+    failed = parseFailure(slot.container, detector)
+    exitCode, oom = exitStatus(state, slot.container)
+    if failed is None and (oom or exitCode not in (0, None)):
+        failed = Failure("oom" if oom else "exit", f"exit code {exitCode}")
+        logger.error(f"Stream Failed! ({failed.kind}) With {failed.line}")
+    retry = None
+    if failed:
+        retry = scheduleRetry(state, slot, failed, confirmed)
+    elif slot.retry is not None and slot.retry.outcome is None:
+        # the restart ended before it was seen playing
+        state.supervisor.recovery.finish(slot.retry, "complete")
+    data = {
+        "active": state.supervisor.isActive(),
+        "failure": failed,
+        "exitCode": exitCode,
+        "oom": oom,
+        "retry": retry,
+    }
+    if state.journal is not None:
+        status = journal.FAILED if failed else journal.ENDED
+        state.journal.finished(
+            slot.event, slot.container, status, failed.kind if failed else None
+        )
+    if retry is not None:
+        return notice(
+            "interrupted",
+            f"Stream on {slot.channel} failed ({failed.kind}),"
+            f" restarting it at {formatSeconds(retry.position)}",
+            slot.channel,
+            data,
+        )
+    if slot.retry is not None and slot.retry.outcome == "gaveUp":
+        logger.error(f"Gave up restarting the stream on {slot.channel}")
+    if failed:  # failure
+        logger.error(f"Stream on {slot.channel} Failed!")
+        return notice(
+            "failed",
+            f"Stream on {slot.channel} failed ({failed.kind})!",
+            slot.channel,
+            data,
+        )
+    # was ok and stopped normally
+    logger.info(f"Stream on {slot.channel} ended successfully!")
+    return notice(
+        "ended", f"Stream on {slot.channel} ended succesfully!", slot.channel, data
+    )
+
+
+def scheduleRetry(state, slot, failure, sample):
+    """Schedules the restart of the failed stream of slot at the
+    output ffmpeg confirmed last with sample. Returns the
+    recovery.Retry or None if the stream is not restarted."""
+    if slot.event is None:  # test picture
+        return None
+    confirmed = position(slot, sample)
+    event, played = resumePoint(slot, slot.offset if confirmed is None else confirmed)
+    lostAt = None if confirmed is None else sample.timestamp
+    retry = state.supervisor.recovery.failed(slot, failure, event, played, lostAt)
+    if retry is not None and state.journal is not None:
+        state.journal.log("interrupted", event, slot.container, failure.kind)
+    return retry
+
+
+def resumePoint(slot, seconds):
+    """Returns the item of slot playing seconds into its
+    input and how far it played"""
+    if slot.session is None:
+        return slot.event, seconds
+    index, played = slot.session.position(seconds)
+    return slot.session.events[index], played
+
+
+def checkRecovered(state, slot):
+    """Reports when a restarted stream delivers again and records
+    how long the channel was without output."""
+    retry = slot.retry
+    follower = slot.follower
+    if (
+        retry is None
+        or retry.outcome is not None
+        or follower is None
+        or follower.firstSample is None
+    ):
+        return None
+    state.supervisor.recovery.recovered(retry, follower.firstSample.timestamp)
+    message = (
+        f"Stream on {slot.channel} recovered after {len(retry.attempts)}"
+        f" restarts, {retry.gap:.1f} s without output"
+    )
+    logger.info(message)
+    if state.journal is not None:
+        state.journal.log("recovered", retry.event, slot.container, message)
+    return notice("recovered", message, slot.channel, retry)
+
+
+def checkFirstFrame(state, slot):
+    """Records the latency from the scheduled start to the first
+    progress line of the stream once it is there."""
+    follower = slot.follower
+    if (
+        slot.event is None
+        or slot.adopted
+        or slot.retry is not None
+        or slot.firstFrameLatency is not None
+        or follower is None
+        or follower.firstSample is None
+    ):
+        return None
+    latency = follower.firstSample.timestamp - slot.event.time.timestamp()
+    state.supervisor.recordLatency(slot, latency)
+    logger.info(f"First frame on {slot.channel} {latency:.3f} s after schedule")
+    return notice(
+        "firstFrame",
+        f"First frame on {slot.channel} {latency:.3f} s after schedule",
+        slot.channel,
+        latency,
+    )
+
+
+def checkHealth(slot):
+    """Reports when a stream falls behind realtime
+    or drops frames and when it recovers."""
+    reason = slot.follower.health()
+    if reason == slot.health:
+        return None
+    slot.health = reason
+    if reason is None:
+        logger.info(f"Stream on {slot.channel} recovered")
+        return notice("healthy", f"Stream on {slot.channel} recovered", slot.channel)
+    logger.warning(f"Stream on {slot.channel} is {reason}")
+    return notice("unhealthy", f"Stream on {slot.channel} is {reason}", slot.channel)
+
+
+def streamRate(slot):
+    """Returns the newest bitrate of the stream in slot
+    from its log follower or -/- if there is none yet."""
+    if slot.follower is None:
+        slot.follower = LogFollower(slot.container).start()
+    sample = slot.follower.latest()
+    if sample is None:
+        return "-/-"
+    if slot.session is not None:
+        progress = sessionProgress(slot.session, position(slot, sample))
+        return f"{formatBitrate(sample)} ({progress})"
+    return formatBitrate(sample)
+
+
+def position(slot, sample):
+    """Seconds of the input of slot that ffmpeg confirmed
+    with sample or None, a restart starts behind the offset"""
+    if sample is None or sample.outTime is None:
+        return None
+    return slot.offset + sample.outTime
+
+
+def sessionProgress(session, outTime):
+    """Formats which item of a session plays and how far it is"""
+    index, played = session.position(outTime)
+    length = session.itemDuration(index)
+    return (
+        f"{index + 1}/{len(session)} "
+        f"{formatSeconds(played)}/{formatSeconds(length)}"
+    )
+
+
+def formatSeconds(seconds):
+    return str(datetime.timedelta(seconds=int(seconds)))
+
+
+def formatRates(rates):
+    """Formats the bitrates of all channels for the status widget"""
+    if len(rates) == 1:
+        return next(iter(rates.values()))
+    return " | ".join(f"{channel}: {rate}" for channel, rate in rates.items())
@@ -0,0 +1,358 @@
+"""Headless stream scheduler.
+
+Runs a schedule without a display with
+``python daemon.py schedule.xlsx``."""
+import sys
+import asyncio
+import argparse
+import datetime
+import functools
+import threading
+import logging
+import core
+import transcode
+import schedulewatch
+import dockerevents
+import hostpool
+from processengine import ProcessEngine
+from engine import getEngine, setEngine
+from journal import Journal, JOURNAL_PATH
+from mediaindex import MediaIndex
+from supervisor import StreamSupervisor, PREWARM_LEAD
+from recovery import StreamRecovery, RETRY_DEADLINE
+
+
+# define global variables
+
+POLL_INTERVAL = 1.0  # seconds between checks of the running streams
+MAX_WAIT = 3600  # seconds, the scheduler wakes up at least this often
+
+logger = logging.getLogger("daemon")
+
+
+class AsyncScheduler:
+    """Owns scheduling, dispatch, monitoring and failure handling
+    of a state (core.SchedulerState or the window).
+    The scheduling task sleeps until the next stream is due,
+    the monitoring task polls the running streams. The core steps
+    talk to docker, so they run in an executor and never block
+    the event loop. Listeners get every core.Notice."""
+
+    def __init__(self, state, engine=None, pollInterval=POLL_INTERVAL):
+        self.state = state
+        self.engine = engine
+        self.pollInterval = pollInterval
+        self.listeners = []
+        self.loop = None
+        self.thread = None
+        self._wake = None
+        self._poll = None
+        self._lock = None
+        self._stopped = False
+        self._ready = threading.Event()
+
+    def subscribe(self, callback):
+        """Calls callback with every notice, from the scheduler thread"""
+        self.listeners.append(callback)
+
+    def emit(self, notices):
+        for notice in notices:
+            for callback in self.listeners:
+                callback(notice)
+
+    async def step(self, function, *args):
+        """Runs a core step in the executor and emits its notices.
+        Steps never overlap, so they can share the state."""
+        async with self._lock:
+            try:
+                notices = await self.loop.run_in_executor(
+                    None, functools.partial(function, self.state, *args)
+                )
+            except Exception as error:
+                # keep scheduling the other streams
+                logger.exception(f"{function.__name__} failed")
+                notices = [core.notice("error", f"{function.__name__} failed: {error}")]
+            # what the step journaled is committed in one transaction
+            await self.loop.run_in_executor(None, core.flushJournal, self.state)
+        self.emit(notices)
+        return notices
+
+    async def run(self):
+        self.loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._poll = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._ready.set()
+        await asyncio.gather(self._schedule(), self._monitor())
+
+    async def _schedule(self):
+        while not self._stopped:
+            now = datetime.datetime.now()
+            self.state.nowDT = now
+            await self.step(core.dispatchDue, now)
+            await self.step(core.prewarmDue, datetime.datetime.now())
+            await self.step(core.retryDue, datetime.datetime.now())
+            delay = core.nextDelay(self.state, datetime.datetime.now())
+            timeout = MAX_WAIT if delay is None else min(max(delay, 0), MAX_WAIT)
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def _monitor(self):
+        while not self._stopped:
+            notices = await self.step(core.pollStreams, self.engine)
+            if any(notice.kind == "interrupted" for notice in notices):
+                # the scheduler sleeps until the restart is due
+                self._wake.set()
+            await self.step(core.prunePast, datetime.datetime.now())
+            try:
+                await asyncio.wait_for(self._poll.wait(), self.pollInterval)
+            except asyncio.TimeoutError:
+                pass
+            self._poll.clear()
+
+    async def _submit(self, function, *args):
+        notices = await self.step(function, *args)
+        # the queue might have changed
+        self._wake.set()
+        return notices
+
+    # thread safe interface
+
+    def submit(self, function, *args):
+        """Runs core step function(state, *args) on the scheduler
+        and wakes it up. Waits until the scheduler runs.
+        Returns a concurrent.futures.Future."""
+        self._ready.wait()
+        return asyncio.run_coroutine_threadsafe(
+            self._submit(function, *args), self.loop
+        )
+
+    def wake(self):
+        """Makes the scheduler look at the queue again"""
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._wake.set)
+
+    def poll(self):
+        """Makes the monitor check the streams now"""
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._poll.set)
+
+    def containerExited(self, containerId, state):
+        """onExit of dockerevents.ContainerEvents, the stream
+        is cleaned up right away instead of on the next poll"""
+        logger.debug(f"Container {containerId[:12]} exited with {state.exitCode}")
+        self.poll()
+
+    def stop(self):
+        self._stopped = True
+        self.wake()
+        self.poll()
+
+    def startThread(self):
+        """Runs the scheduler in a daemon thread with its own loop"""
+        self.thread = threading.Thread(
+            target=asyncio.run, args=(self.run(),), daemon=True
+        )
+        self.thread.start()
+        self._ready.wait()
+        return self.thread
+
+
+# command line interface
+
+
+def logNotice(notice):
+    if notice.kind in ("error", "failed", "startFailed"):
+        level = logging.ERROR
+    elif notice.kind == "interrupted":
+        level = logging.WARNING
+    else:
+        level = logging.INFO
+    if notice.kind == "schedule":
+        logger.info(f"{len(notice.data)} upcoming streams")
+    else:
+        logger.log(level, f"{notice.kind}: {notice.message}")
+
+
+def parseArgs(argv):
+    parser = argparse.ArgumentParser(description="Headless stream scheduler")
+    parser.add_argument(
+        "schedule",
+        nargs="?",
+        default=None,
+        help="schedule workbook (.xlsx), defaults to the one of the last run",
+    )
+    parser.add_argument(
+        "--max-streams",
+        type=int,
+        default=None,
+        help="concurrent streams, defaults to cpu count / 2",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=("docker", "process"),
+        default="docker",
+        help="run ffmpeg in docker containers or as processes of this machine",
+    )
+    parser.add_argument(
+        "--hosts",
+        default=None,
+        help="ini file of the docker hosts streams are placed on, defaults to the"
+        " local daemon",
+    )
+    parser.add_argument(
+        "--prewarm",
+        type=float,
+        default=PREWARM_LEAD.total_seconds(),
+        help="seconds containers are prepared before their start",
+    )
+    parser.add_argument(
+        "--transcode-workers",
+        type=int,
+        default=transcode.WORKERS,
+        help="files transcoded ahead at once, 0 encodes every stream live",
+    )
+    parser.add_argument(
+        "--rendition-cache",
+        type=float,
+        default=transcode.MAX_BYTES / 1024**3,
+        help="GiB of disk for transcoded files",
+    )
+    parser.add_argument(
+        "--no-probe",
+        action="store_true",
+        help="do not probe durations, streams of a channel need a 30 min gap",
+    )
+    parser.add_argument(
+        "--retry-deadline",
+        type=float,
+        default=RETRY_DEADLINE,
+        help="seconds failed streams are restarted for, 0 never restarts them",
+    )
+    parser.add_argument(
+        "--no-watch",
+        action="store_true",
+        help="do not reload the schedule when the workbook changes",
+    )
+    parser.add_argument(
+        "--journal",
+        default=str(JOURNAL_PATH),
+        help="state journal, streams of an earlier run are taken over from it",
+    )
+    parser.add_argument("--log", default=None, help="log file, defaults to stderr")
+    parser.add_argument("--verbose", action="store_true", help="log debug messages")
+    args = parser.parse_args(argv)
+    if args.backend == "process" and args.hosts is not None:
+        parser.error("--hosts places streams on docker hosts, use --backend docker")
+    return args
+
+
+def main(argv=None):
+    args = parseArgs(sys.argv[1:] if argv is None else argv)
+    logging.basicConfig(
+        format="LOGGING::%(levelname)s::%(asctime)s:    %(message)s",
+        filename=args.log,
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        datefmt="%m/%d/%Y %I:%M:%S %p",
+    )
+    if args.backend == "process":
+        setEngine(ProcessEngine())
+    # renditions are written to the local cache, so the local daemon encodes them
+    local = getEngine()
+    maxStreams = args.max_streams
+    if args.hosts is not None:
+        pool = hostpool.readHosts(args.hosts)
+        for host in pool.hosts:
+            if not host.check():
+                logger.warning(f"Docker host {host.name} does not answer")
+        setEngine(pool)
+        if maxStreams is None:
+            maxStreams = pool.capacity() or None
+    supervisor = StreamSupervisor(
+        maxStreams,
+        datetime.timedelta(seconds=args.prewarm),
+        StreamRecovery(deadline=args.retry_deadline),
+    )
+    state = core.SchedulerState(supervisor)
+    if not args.no_probe:
+        state.mediaIndex = MediaIndex()
+    if args.transcode_workers > 0 and args.hosts is not None:
+        logger.info("Not transcoding, the docker hosts cannot read the renditions")
+    elif args.transcode_workers > 0:
+        cache = transcode.RenditionCache(maxBytes=args.rendition_cache * 1024**3)
+        state.transcoder = transcode.Transcoder(
+            cache, args.transcode_workers, engine=local
+        )
+    state.journal = Journal(args.journal)
+    state.instance = state.journal.instance()
+    try:
+        return runSchedule(state, args)
+    finally:
+        state.journal.close()
+
+
+def runSchedule(state, args):
+    """Continues the journaled run or starts the schedule of args"""
+    if args.backend == "process":
+        problems = core.checkFfmpeg()
+    else:
+        problems = core.checkDocker(
+            state.imageName,
+            adoptable=core.adoptableContainers(state),
+            instance=state.instance,
+        )
+    for problem in problems:
+        logger.error(problem)
+    if problems:
+        return 1
+    path = args.schedule or state.journal.source()
+    if path is None:
+        logger.error("No schedule given and none in the journal")
+        return 1
+    schedule, credentials, report = core.readSchedule(path)
+    if not report.ok:
+        logger.error(f"Schedule is not valid: {report}")
+        return 1
+    state.journal.setSource(path)
+    scheduler = AsyncScheduler(state)
+    scheduler.subscribe(logNotice)
+    # exits are seen from before the streams of an earlier run are taken over
+    events = dockerevents.followContainers(scheduler)
+    # monitoring of streams an earlier run left starts with the first poll
+    for notice in core.adoptStreams(state):
+        logNotice(notice)
+    for notice in core.restoreSchedule(state, schedule, credentials):
+        logNotice(notice)
+    if state.queue is None:
+        events.stop()
+        return 1
+    watcher = None
+    if not args.no_watch:
+        watcher = schedulewatch.watchSchedule(scheduler, path)
+    try:
+        asyncio.run(scheduler.run())
+    except KeyboardInterrupt:
+        logger.info("Interrupted, stopping streams")
+    finally:
+        if watcher is not None:
+            watcher.stop()
+        events.stop()
+        core.stopStreams(state)
+        if state.transcoder is not None:
+            state.transcoder.close()
+    for event, latency in state.supervisor.latencies:
+        logger.info(f"{event.time} {event.channel}: first frame after {latency:.3f} s")
+    for retry in state.supervisor.recovery.history:
+        gap = "" if retry.gap is None else f", {retry.gap:.1f} s without output"
+        logger.info(
+            f"{retry.event.time} {retry.channel}: {retry.outcome} after"
+            f" {len(retry.attempts)} restarts{gap}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""Container state from the event stream of docker"""
+import time
+import threading
+import collections
+import logging
+from core import INSTANCE_LABEL
+from engine import getEngine
+
+
+# define global variables
+
+WATCHED = ("start", "die", "oom", "kill")  # container events that are followed
+RECONNECT_DELAY = 1.0  # seconds before reconnecting, doubled after every failure
+MAX_RECONNECT_DELAY = 30.0
+
+# newest known state of a container, time in seconds since the epoch
+ContainerState = collections.namedtuple(
+    "ContainerState", ["status", "exitCode", "oom", "time"]
+)
+
+logger = logging.getLogger("dockerevents")
+
+
+class ContainerEvents:
+    """Follows the start, die, oom and kill events of the containers
+    of a scheduler instance in one background thread and keeps the
+    newest state of every container in a table. onExit(containerId,
+    state) is called from that thread as soon as a container died.
+    Events missed while reconnecting are replayed by docker, events
+    before the first connection are not: the table only answers for
+    all containers after one list since the connection (see beginSync)."""
+
+    def __init__(self, engine, instance, onExit=None):
+        self.engine = engine
+        self.instance = instance
+        self.onExit = onExit
+        self.table = {}
+        self.connected = threading.Event()
+        self.thread = None
+        self._generation = 0  # counts connections
+        self._synced = None  # generation the table is complete for
+        self._since = None  # time of the newest event
+        self._stream = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def filters(self):
+        return {
+            "type": "container",
+            "event": list(WATCHED),
+            "label": [f"{INSTANCE_LABEL}={self.instance}"],
+        }
+
+    def start(self):
+        self.thread = threading.Thread(
+            target=self.run, name="ContainerEvents", daemon=True
+        )
+        self.thread.start()
+        return self
+
+    def run(self):
+        delay = RECONNECT_DELAY
+        while not self._stopped.is_set():
+            try:
+                self._stream = self.engine.events(
+                    decode=True, filters=self.filters(), since=self._since
+                )
+                with self._lock:
+                    self._generation += 1
+                self.connected.set()
+                delay = RECONNECT_DELAY
+                for event in self._stream:
+                    self.handle(event)
+            except Exception as error:
+                if not self._stopped.is_set():
+                    logger.warning(f"Docker event stream failed: {error}")
+            finally:
+                self.connected.clear()
+            if self._stopped.wait(delay):
+                break
+            logger.info("Reconnecting to the docker event stream")
+            delay = min(delay * 2, MAX_RECONNECT_DELAY)
+
+    def handle(self, event):
+        """Records a decoded docker event"""
+        action = event.get("Action") or event.get("status")
+        identifier = event.get("id") or event.get("Actor", {}).get("ID")
+        if action not in WATCHED or identifier is None:
+            return
+        attributes = event.get("Actor", {}).get("Attributes", {})
+        moment = event.get("timeNano", 0) / 1e9 or event.get("time") or time.time()
+        self._since = int(moment)
+        with self._lock:
+            previous = self.table.get(identifier)
+            oom = action == "oom" or (previous is not None and previous.oom)
+            exitCode = None
+            if action == "die":
+                exitCode = int(attributes.get("exitCode", -1))
+            state = ContainerState(action, exitCode, oom, moment)
+            if action == "start":
+                state = state._replace(oom=False)
+            self.table[identifier] = state
+        logger.debug(f"Container {identifier[:12]}: {action}")
+        if action == "die" and self.onExit is not None:
+            self.onExit(identifier, state)
+
+    # queries, thread safe
+
+    def state(self, containerId):
+        """Returns the ContainerState or None if there was no event"""
+        with self._lock:
+            return self.table.get(containerId)
+
+    def exited(self, containerId):
+        state = self.state(containerId)
+        return state is not None and state.status == "die"
+
+    def live(self):
+        """Whether the table knows the state of every container"""
+        with self._lock:
+            return self.connected.is_set() and self._synced == self._generation
+
+    def beginSync(self):
+        """Call before listing the running containers, returns a token
+        for endSync or None if the stream is not connected"""
+        with self._lock:
+            return self._generation if self.connected.is_set() else None
+
+    def endSync(self, token):
+        """Marks the table complete after the list of beginSync, if
+        the connection did not change in between"""
+        with self._lock:
+            if token is not None and token == self._generation:
+                self._synced = token
+
+    def forget(self, containerId):
+        with self._lock:
+            self.table.pop(containerId, None)
+
+    def stop(self):
+        self._stopped.set()
+        stream = self._stream
+        if stream is not None and hasattr(stream, "close"):
+            try:
+                stream.close()
+            except Exception as error:
+                logger.debug(f"Closing the event stream failed: {error}")
+
+
+def followContainers(scheduler, engine=None):
+    """Subscribes the state of a daemon.AsyncScheduler to the events
+    of its containers, exits wake the monitoring of the scheduler.
+    Returns the started ContainerEvents."""
+    engine = getEngine() if engine is None else engine
+    state = scheduler.state
+    events = ContainerEvents(engine, state.instance, scheduler.containerExited)
+    state.containerEvents = events.start()
+    return events
@@ -0,0 +1,129 @@
+"""Long-lived docker session shared by the scheduler"""
+import time
+import threading
+from functools import partial
+import logging
+
+
+# define global variables
+
+POOL_SIZE = 10  # maximum number of pooled connections to the daemon
+HEALTH_INTERVAL = 30  # seconds between health checks of the session
+
+logger = logging.getLogger("engine")
+
+
+def fromEnv(poolSize):
+    """Client configured from the environment,
+    docker is only imported once the first client is needed"""
+    import docker
+
+    return docker.from_env(max_pool_size=poolSize)
+
+
+def fromUrl(url, tls, poolSize):
+    """Client of the docker daemon at url, e.g. tcp://host:2376"""
+    import docker
+
+    return docker.DockerClient(base_url=url, tls=tls, max_pool_size=poolSize)
+
+
+class DockerEngine:
+    """Wraps a single docker client that is created once and
+    reused by all lib functions. The client is created lazily,
+    checked with a cheap ping every HEALTH_INTERVAL seconds and
+    rebuilt automatically if the daemon went away in between.
+    Connecting, the health check and reconnecting hold a lock, so
+    threads sharing the engine never build or close clients at once.
+    Exposes the same attributes as a docker client so that it can be
+    passed wherever an engine is expected."""
+
+    def __init__(self, factory=None, poolSize=POOL_SIZE, healthInterval=HEALTH_INTERVAL):
+        if factory is None:
+            factory = partial(fromEnv, poolSize)
+        self.factory = factory
+        self.healthInterval = healthInterval
+        self._client = None
+        self._lastCheck = 0.0
+        self._lock = threading.RLock()
+
+    @property
+    def client(self):
+        """Returns the shared client, reconnecting if necessary"""
+        with self._lock:
+            if self._client is None:
+                self.connect()
+            elif time.monotonic() - self._lastCheck > self.healthInterval:
+                if not self.healthy():
+                    logger.warning("Docker session unhealthy, reconnecting")
+                    self.reconnect()
+            return self._client
+
+    def connect(self):
+        with self._lock:
+            self._client = self.factory()
+            self._lastCheck = time.monotonic()
+        logger.debug("Docker session created")
+
+    def healthy(self):
+        """Pings the daemon. Returns False if it does not answer."""
+        with self._lock:
+            self._lastCheck = time.monotonic()
+            try:
+                self._client.ping()
+            except BaseException:
+                return False
+            return True
+
+    def reconnect(self):
+        with self._lock:
+            self.close()
+            self.connect()
+
+    def close(self):
+        with self._lock:
+            if self._client is not None:
+                try:
+                    self._client.close()
+                except BaseException:
+                    pass
+            self._client = None
+
+    # docker client interface
+
+    @property
+    def containers(self):
+        return self.client.containers
+
+    @property
+    def images(self):
+        return self.client.images
+
+    def version(self):
+        return self.client.version()
+
+    def info(self):
+        return self.client.info()
+
+    def events(self, *args, **kwargs):
+        return self.client.events(*args, **kwargs)
+
+    def ping(self):
+        return self.client.ping()
+
+
+_engine = None
+
+
+def getEngine():
+    """Returns the engine shared by the whole scheduler"""
+    global _engine
+    if _engine is None:
+        _engine = DockerEngine()
+    return _engine
+
+
+def setEngine(engine):
+    """Makes engine, e.g. a hostpool.HostPool, the one of the scheduler"""
+    global _engine
+    _engine = engine
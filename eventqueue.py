@@ -0,0 +1,106 @@
+"""Priority queue of scheduled stream events"""
+import heapq
+import itertools
+import collections
+
+
+# define global variables
+
+DEFAULT_CHANNEL = "default"  # channel of schedules without a Channel column
+
+ScheduleEvent = collections.namedtuple(
+    "ScheduleEvent", ["time", "seq", "file", "channel"]
+)
+
+
+def toDatetime(value):
+    """Converts pandas timestamps to plain datetimes"""
+    if hasattr(value, "to_pydatetime"):
+        return value.to_pydatetime()
+    return value
+
+
+class EventQueue:
+    """Min-heap of ScheduleEvents ordered by start time.
+    Looking at the next event is O(1), popping and pruning
+    past events is O(log n) per event."""
+
+    def __init__(self, events=()):
+        self._heap = list(events)
+        heapq.heapify(self._heap)
+        self._seq = len(self._heap)
+
+    @classmethod
+    def fromSchedule(cls, schedule):
+        """Builds the queue from a schedule with File, Date/Time
+        and optionally Channel columns"""
+        if "Channel" in schedule.columns:
+            channels = schedule["Channel"].astype(str)
+        else:
+            channels = [DEFAULT_CHANNEL] * len(schedule)
+        return cls(
+            ScheduleEvent(toDatetime(time), seq, fileName, channel)
+            for seq, (time, fileName, channel) in enumerate(
+                zip(schedule["Date/Time"], schedule["File"], channels)
+            )
+        )
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __iter__(self):
+        """Iterates over events in start order"""
+        return iter(sorted(self._heap))
+
+    def push(self, time, fileName, channel=DEFAULT_CHANNEL):
+        event = ScheduleEvent(toDatetime(time), self._seq, fileName, channel)
+        self._seq += 1
+        heapq.heappush(self._heap, event)
+        return event
+
+    def remove(self, events):
+        """Removes events from anywhere in the queue in O(n)"""
+        seqs = {event.seq for event in events}
+        if not seqs:
+            return
+        self._heap = [event for event in self._heap if event.seq not in seqs]
+        heapq.heapify(self._heap)
+
+    def peek(self):
+        """Returns the next event or None"""
+        return self._heap[0] if self._heap else None
+
+    def pop(self):
+        return heapq.heappop(self._heap)
+
+    def prunePast(self, now):
+        """Removes all events that start at or before now.
+        Returns the removed events."""
+        pruned = []
+        while self._heap and self._heap[0].time <= now:
+            pruned.append(heapq.heappop(self._heap))
+        return pruned
+
+    def delayUntilNext(self, now):
+        """Returns seconds until the next event starts or None"""
+        if not self._heap:
+            return None
+        return (self._heap[0].time - now).total_seconds()
+
+    def walk(self):
+        """Yields the events in start order without touching
+        the queue. Walks the heap from its root, so taking the
+        first n events costs O(n log n) independent of the queue length."""
+        if not self._heap:
+            return
+        candidates = [(self._heap[0], 0)]
+        while candidates:
+            event, index = heapq.heappop(candidates)
+            yield event
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < len(self._heap):
+                    heapq.heappush(candidates, (self._heap[child], child))
+
+    def upcoming(self, n):
+        """Returns the next n events in start order"""
+        return list(itertools.islice(self.walk(), n))
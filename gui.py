@@ -1,29 +1,18 @@
 import tkinter
+import queue
 import lib
+from supervisor import StreamSupervisor
+from daemon import AsyncScheduler
+from transcode import Transcoder
+from mediaindex import MediaIndex
+from journal import Journal
+import dockerevents
 from functools import partial
 import datetime
 from pathlib import Path
 import logging
 import tempfile
 
-# set loggingpath
-
-datestring = datetime.datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
-tempdir = tempfile.gettempdir()
-logFile = Path(f"{tempdir}/{datestring}.log")
-logging.basicConfig(
-    format="LOGGING::%(levelname)s::%(asctime)s:    %(message)s",
-    filename=logFile,
-    level=logging.INFO,
-    datefmt="%m/%d/%Y %I:%M:%S %p",
-)
-
-# disable module loggers
-
-logging.getLogger("urllib3.connectionpool").disabled = True
-logging.getLogger("docker.utils.config").disabled = True
-logging.getLogger("docker.auth").disabled = True
-
 # define classes
 
 
@@ -38,12 +27,24 @@ class Window(tkinter.Frame):
         self.master.title("FGO Stream Scheduler")
         # set up parameter variables
         self.credentials = None
-        self.container = None
-        self.streamActive = False
+        self.channelCredentials = {}
+        self.supervisor = StreamSupervisor()
         self.imageName = "ffmpeg:1.0"
         self.schedule = None
+        self.queue = None
+        # reloads the schedule when its workbook changes
+        self.watcher = None
+        # scheduled files are transcoded ahead to stream them without encoding
+        self.transcoder = Transcoder()
+        # real durations of the scheduled files for overlap checks
+        self.mediaIndex = MediaIndex()
+        # streams and their containers survive restarts of the window
+        self.journal = Journal()
+        self.instance = self.journal.instance()
+        # exits of the containers are pushed by docker
+        self.containerEvents = None
+        self.nowDT = datetime.datetime.now()
         self.timeToStream = "".join(["-"] * 8)
-        self.logFile = f"C:\\temp\\{datetime.datetime.now()}.log"
         # set up widgets
         lib.createTimeWidget(self)
         lib.createStatusWidget(self)
@@ -100,10 +101,16 @@ class Window(tkinter.Frame):
         for i in range(2):
             self.columnconfigure(i, weight=1, minsize=25)
             self.rowconfigure(i, weight=1, minsize=25)
-        # check docker
-        lib.checkDocker(self.imageName)
-        # initial call to put checking stream events in the queue
-        lib.checkStreamEvents(self)
+        # scheduling and monitoring run headless, notices are drawn here
+        self.notices = queue.Queue()
+        self.scheduler = AsyncScheduler(self)
+        self.scheduler.subscribe(self.notices.put)
+        self.scheduler.startThread()
+        dockerevents.followContainers(self.scheduler)
+        # docker is only talked to on the scheduler thread
+        lib.verifyDocker(self)
+        lib.resumeJournal(self)
+        lib.drainNotices(self)
 
     def client_exit(self):
         exit()
@@ -112,12 +119,36 @@ class Window(tkinter.Frame):
 # start of app
 
 
-root = tkinter.Tk()
-root.geometry("600x400")
-app = Window(root)
-# close dialog
-root.protocol("WM_DELETE_WINDOW", partial(lib.askExit, app, root))
-# icon
-iconPath = Path("data") / "cropped-FGHomeOffice-1.png"
-root.iconphoto(False, tkinter.PhotoImage(file=iconPath))
-root.mainloop()
+def setupLogging():
+    """Logs to a file in the temp directory"""
+    datestring = datetime.datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
+    logFile = Path(tempfile.gettempdir()) / f"{datestring}.log"
+    logging.basicConfig(
+        format="LOGGING::%(levelname)s::%(asctime)s:    %(message)s",
+        filename=logFile,
+        level=logging.INFO,
+        datefmt="%m/%d/%Y %I:%M:%S %p",
+    )
+    # disable module loggers
+    logging.getLogger("urllib3.connectionpool").disabled = True
+    logging.getLogger("docker.utils.config").disabled = True
+    logging.getLogger("docker.auth").disabled = True
+
+
+def createApp():
+    """Builds the main window, returns root and app"""
+    root = tkinter.Tk()
+    root.geometry("600x400")
+    app = Window(root)
+    # close dialog
+    root.protocol("WM_DELETE_WINDOW", partial(lib.askExit, app, root))
+    # icon
+    iconPath = Path("data") / "cropped-FGHomeOffice-1.png"
+    root.iconphoto(False, tkinter.PhotoImage(file=iconPath))
+    return root, app
+
+
+if __name__ == "__main__":
+    setupLogging()
+    root, app = createApp()
+    root.mainloop()
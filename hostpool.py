@@ -0,0 +1,295 @@
+"""Several docker hosts sharing the streams of the scheduler"""
+import time
+import queue
+import threading
+import collections
+import configparser
+import logging
+from functools import partial
+from engine import DockerEngine, fromUrl, POOL_SIZE
+from supervisor import CORES_PER_STREAM
+from core import LABEL, WORKER_ROLES, workerContainer
+
+
+# define global variables
+
+DOWN_TIME = 30.0  # seconds a host that failed is skipped before it is pinged again
+# containers of any scheduler that run or are prepared to run
+STREAM_FILTERS = {"label": [LABEL], "status": ["created", "running"]}
+
+# free capacity of a host when a stream is placed
+Load = collections.namedtuple("Load", ["host", "streams", "freeSlots", "freeCpus"])
+
+logger = logging.getLogger("hostpool")
+
+
+class Host:
+    """One docker endpoint of the pool. slots is the number of streams
+    it encodes at once, by default its cores / CORES_PER_STREAM."""
+
+    def __init__(self, name, engine, slots=None, cpus=None):
+        self.name = name
+        self.engine = engine
+        self.slots = slots
+        self.cpus = cpus
+        self.downUntil = None  # monotonic time of the next ping once it failed
+
+    def __repr__(self):
+        return f"Host({self.name})"
+
+    def available(self):
+        """Whether the host is up, a failed host is pinged again
+        once DOWN_TIME passed"""
+        if self.downUntil is None:
+            return True
+        if time.monotonic() < self.downUntil:
+            return False
+        return self.check()
+
+    def check(self):
+        """Pings the host and learns its cores. Returns whether it answers."""
+        try:
+            self.engine.ping()
+            if self.cpus is None:
+                self.cpus = int(self.engine.info()["NCPU"])
+        except Exception as error:
+            self.fail(error)
+            return False
+        if self.downUntil is not None:
+            logger.info(f"Docker host {self.name} is back")
+        self.downUntil = None
+        return True
+
+    def fail(self, error):
+        if self.downUntil is None:
+            logger.warning(f"Docker host {self.name} failed: {error}")
+        self.downUntil = time.monotonic() + DOWN_TIME
+
+    def capacity(self):
+        if self.slots is not None:
+            return self.slots
+        return max(1, (self.cpus or 0) // CORES_PER_STREAM)
+
+    def load(self):
+        """Counts the streams that run on the host"""
+        if self.cpus is None and not self.check():
+            raise ConnectionError(f"Docker host {self.name} is down")
+        containers = self.engine.containers.list(all=True, filters=STREAM_FILTERS)
+        streams = len([cont for cont in containers if not workerContainer(cont)])
+        return Load(
+            self,
+            streams,
+            self.capacity() - streams,
+            self.cpus - streams * CORES_PER_STREAM,
+        )
+
+
+class HostPool:
+    """Docker hosts that are used like one engine. A stream is placed
+    on the available host with the most free encoder slots and cores
+    at the moment it is dispatched, the next host is tried if that one
+    fails. Listing and events cover all available hosts. Hosts that
+    fail are skipped for DOWN_TIME. Exposes the attributes of a docker
+    client that the scheduler uses, so that it can be passed wherever
+    an engine is expected. Renditions and playlists are files of the
+    scheduler that the hosts do not have, so streams on a pool are
+    encoded live one by one."""
+
+    localFiles = False  # see core.localFiles
+
+    def __init__(self, hosts):
+        self.hosts = list(hosts)
+        self.containers = PoolContainers(self)
+        self.images = PoolImages(self)
+
+    def available(self):
+        return [host for host in self.hosts if host.available()]
+
+    def check(self):
+        """Pings every host. Returns the hosts that answer."""
+        return [host for host in self.hosts if host.check()]
+
+    def capacity(self):
+        """Streams all hosts that answered encode at once"""
+        return sum(host.capacity() for host in self.hosts if host.downUntil is None)
+
+    def each(self, function):
+        """Returns function(host) of every available host,
+        hosts that fail are skipped and marked down"""
+        results = []
+        for host in self.available():
+            try:
+                results.append(function(host))
+            except Exception as error:
+                host.fail(error)
+        return results
+
+    def loads(self):
+        """Loads of the available hosts, least loaded first"""
+        return sorted(
+            self.each(Host.load),
+            key=lambda load: (load.freeSlots, load.freeCpus),
+            reverse=True,
+        )
+
+    def place(self, action, stream=True):
+        """Returns action(engine) of the least loaded host that
+        succeeds. Streams only go to hosts with a free slot."""
+        import docker
+
+        error = None
+        for load in self.loads():
+            if stream and load.freeSlots <= 0:
+                break
+            try:
+                result = action(load.host.engine)
+            except docker.errors.APIError as failure:
+                # the host answered, it just cannot run it
+                error = failure
+                logger.warning(f"Docker host {load.host.name} refused: {failure}")
+                continue
+            except Exception as failure:
+                error = failure
+                load.host.fail(failure)
+                continue
+            logger.debug(f"Placed on {load.host.name} with {load.freeSlots} free slots")
+            return result
+        if error is None:
+            error = "No docker host has a free slot"
+        raise docker.errors.DockerException(error)
+
+    # docker client interface
+
+    def version(self):
+        versions = self.each(lambda host: host.engine.version())
+        if not versions:
+            raise ConnectionError("No docker host answers")
+        return versions[0]
+
+    def ping(self):
+        self.version()
+        return True
+
+    def events(self, decode=False, filters=None, since=None):
+        streams = self.each(
+            lambda host: host.engine.events(decode=decode, filters=filters, since=since)
+        )
+        if not streams:
+            raise ConnectionError("No docker host answers")
+        return PoolEvents(streams)
+
+    def close(self):
+        for host in self.hosts:
+            host.engine.close()
+
+
+def isStream(labels):
+    """Whether a container with labels needs an encoder slot"""
+    role = (labels or {}).get(LABEL)
+    return role is not None and role not in WORKER_ROLES
+
+
+class PoolContainers:
+    """containers of a HostPool"""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def list(self, all=False, filters=None):
+        lists = self.pool.each(
+            lambda host: host.engine.containers.list(all=all, filters=filters)
+        )
+        return [container for containers in lists for container in containers]
+
+    def run(self, *args, **kwargs):
+        stream = isStream(kwargs.get("labels"))
+        return self.pool.place(
+            lambda engine: engine.containers.run(*args, **kwargs), stream
+        )
+
+    def create(self, *args, **kwargs):
+        stream = isStream(kwargs.get("labels"))
+        return self.pool.place(
+            lambda engine: engine.containers.create(*args, **kwargs), stream
+        )
+
+
+class PoolImages:
+    """images of a HostPool, an image has to be on every host"""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def get(self, name):
+        import docker
+
+        images = []
+        for host in self.pool.available():
+            try:
+                images.append(host.engine.images.get(name))
+            except docker.errors.ImageNotFound:
+                raise
+            except Exception as error:
+                host.fail(error)
+        if not images:
+            raise ConnectionError("No docker host answers")
+        return images[0]
+
+
+class PoolEvents:
+    """Event streams of several hosts read as one. It ends when one
+    of them ends, so that the reader connects again."""
+
+    def __init__(self, streams):
+        self.streams = streams
+        self.queue = queue.Queue()
+        for stream in streams:
+            threading.Thread(target=self.pump, args=(stream,), daemon=True).start()
+
+    def pump(self, stream):
+        try:
+            for event in stream:
+                self.queue.put(event)
+        except Exception as error:
+            self.queue.put(error)
+        self.queue.put(None)
+
+    def __iter__(self):
+        while True:
+            event = self.queue.get()
+            if event is None:
+                return
+            if isinstance(event, Exception):
+                raise event
+            yield event
+
+    def close(self):
+        for stream in self.streams:
+            if hasattr(stream, "close"):
+                stream.close()
+        self.queue.put(None)
+
+
+def readHosts(path, poolSize=POOL_SIZE):
+    """Reads a host pool from an ini file with a section per host:
+
+        [encoder1]
+        url = tcp://10.0.0.5:2376
+        tls = yes
+        slots = 4
+
+    tls and slots are optional. Returns the HostPool."""
+    config = configparser.ConfigParser()
+    if not config.read(path):
+        raise FileNotFoundError(f"No host pool at {path}")
+    hosts = []
+    for name in config.sections():
+        section = config[name]
+        factory = partial(
+            fromUrl, section["url"], section.getboolean("tls", False), poolSize
+        )
+        slots = section.getint("slots", None)
+        hosts.append(Host(name, DockerEngine(factory), slots))
+    if not hosts:
+        raise ValueError(f"{path} defines no docker hosts")
+    return HostPool(hosts)
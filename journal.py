@@ -0,0 +1,266 @@
+"""Durable journal of schedule items, dispatches and outcomes"""
+import os
+import uuid
+import sqlite3
+import datetime
+import threading
+import logging
+from pathlib import Path
+from eventqueue import ScheduleEvent
+
+
+# define global variables
+
+# the temp dir is wiped on reboot on many systems
+DATA_HOME = Path(os.environ.get("XDG_DATA_HOME") or Path.home() / ".local" / "share")
+JOURNAL_PATH = DATA_HOME / "streamscheduler" / "journal.sqlite"
+SCHEMA_VERSION = 2  # items are rows of their own, duplicates are kept
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    time TEXT NOT NULL,
+    file TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    status TEXT NOT NULL,
+    container TEXT,
+    updated TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS itemKey ON items (time, file, channel);
+CREATE INDEX IF NOT EXISTS itemStatus ON items (status);
+CREATE TABLE IF NOT EXISTS log (
+    at TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    time TEXT,
+    file TEXT,
+    channel TEXT,
+    container TEXT,
+    message TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+# version 1 keyed items by time, file and channel
+MIGRATE_ITEMS = [
+    "ALTER TABLE items RENAME TO itemsV1",
+    "DROP INDEX IF EXISTS itemStatus",
+]
+# one row of an item, duplicates of a schedule entry take turns
+QUEUED_ROW = (
+    "SELECT rowid FROM items WHERE time = ? AND file = ? AND channel = ?"
+    " AND status = 'queued' ORDER BY rowid LIMIT 1"
+)
+RESTARTED_ROW = (
+    "SELECT rowid FROM items WHERE time = ? AND file = ? AND channel = ?"
+    " AND status != 'queued' ORDER BY rowid DESC LIMIT 1"
+)
+
+# status of an item
+QUEUED = "queued"
+RUNNING = "running"
+ENDED = "ended"
+FAILED = "failed"
+SKIPPED = "skipped"
+REMOVED = "removed"
+STOPPED = "stopped"
+LOST = "lost"  # its container was gone after a restart
+
+logger = logging.getLogger("journal")
+
+
+def containerId(container):
+    """Id of a docker container, ids are passed through"""
+    if isinstance(container, str):
+        return container
+    return getattr(container, "id", None)
+
+
+def itemRow(event):
+    return event.time.isoformat(), event.file, event.channel
+
+
+class Journal:
+    """SQLite journal of the schedule items, the containers dispatched
+    for them and how they ended, so that a restarted scheduler can
+    continue. Writes are buffered and committed together in one
+    transaction by flush, which the scheduler calls after every step."""
+
+    def __init__(self, path=JOURNAL_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(
+            str(self.path), check_same_thread=False, isolation_level=None
+        )
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+        self.pending = []  # (statement, parameters) not yet committed
+        self._lock = threading.Lock()
+
+    def _migrate(self):
+        """Creates the tables or brings them to SCHEMA_VERSION"""
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+        tables = self.connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'items'"
+        ).fetchall()
+        statements = [statement for statement in SCHEMA.split(";") if statement.strip()]
+        self.connection.execute("BEGIN")
+        if tables and version < 2:
+            statements = MIGRATE_ITEMS + statements
+        for statement in statements:
+            self.connection.execute(statement)
+        if tables and version < 2:
+            self.connection.execute("INSERT INTO items SELECT * FROM itemsV1")
+            self.connection.execute("DROP TABLE itemsV1")
+        self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.connection.execute("COMMIT")
+
+    def _write(self, statement, parameters):
+        with self._lock:
+            self.pending.append((statement, parameters))
+
+    def _now(self):
+        return datetime.datetime.now().isoformat()
+
+    def flush(self):
+        """Commits the buffered writes in one transaction"""
+        with self._lock:
+            if not self.pending:
+                return
+            pending, self.pending = self.pending, []
+            try:
+                self.connection.execute("BEGIN")
+                for statement, parameters in pending:
+                    self.connection.execute(statement, parameters)
+                self.connection.execute("COMMIT")
+            except sqlite3.Error as error:
+                self.connection.execute("ROLLBACK")
+                logger.error(f"Could not write the journal: {error}")
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+    # writes
+
+    def setSource(self, path):
+        """Records the workbook the schedule was loaded from"""
+        self._write(
+            "INSERT OR REPLACE INTO meta VALUES ('schedule', ?)",
+            (str(Path(path).resolve()),),
+        )
+
+    def replaceQueue(self, events):
+        """Forgets the queued items of an earlier schedule"""
+        self._write("DELETE FROM items WHERE status = ?", (QUEUED,))
+        self.queued(events)
+
+    def queued(self, events):
+        """Adds items, every duplicate of an entry gets its own row"""
+        for event in events:
+            self._write(
+                "INSERT INTO items VALUES (?, ?, ?, ?, NULL, ?)",
+                (*itemRow(event), QUEUED, self._now()),
+            )
+
+    def dropped(self, events, status):
+        """Records queued items that will not run"""
+        for event in events:
+            self._write(
+                "UPDATE items SET status = ?, updated = ?"
+                f" WHERE rowid = ({QUEUED_ROW})",
+                (status, self._now(), *itemRow(event)),
+            )
+            self.log(status, event)
+
+    def dispatched(self, event, container, restart=False):
+        """Records the container of a queued item. A restart replaces
+        the container of the item that failed. Items that were not
+        journaled are added."""
+        row = RESTARTED_ROW if restart else QUEUED_ROW
+        self._write(
+            "UPDATE items SET status = ?, container = ?, updated = ?"
+            f" WHERE rowid = ({row})",
+            (RUNNING, containerId(container), self._now(), *itemRow(event)),
+        )
+        # changes() counts the rows of the update right before
+        self._write(
+            "INSERT INTO items SELECT ?, ?, ?, ?, ?, ? WHERE changes() = 0",
+            (*itemRow(event), RUNNING, containerId(container), self._now()),
+        )
+        self.log("started", event, container)
+
+    def finished(self, event, container, status, message=None):
+        """Records how the container of a stream ended. Every item
+        played by the container gets the status."""
+        identifier = containerId(container)
+        if identifier is None and event is not None:
+            self.dropped([event], status)
+            return
+        self._write(
+            "UPDATE items SET status = ?, updated = ?"
+            " WHERE container = ? AND status = ?",
+            (status, self._now(), identifier, RUNNING),
+        )
+        self.log(status, event, container, message)
+
+    def log(self, kind, event=None, container=None, message=None):
+        row = itemRow(event) if event is not None else (None, None, None)
+        self._write(
+            "INSERT INTO log VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (self._now(), kind, *row, containerId(container), message),
+        )
+
+    # reads, they see committed writes only
+
+    def _read(self, statement, parameters=()):
+        with self._lock:
+            return self.connection.execute(statement, parameters).fetchall()
+
+    def source(self):
+        """Returns the path of the last loaded workbook or None"""
+        rows = self._read("SELECT value FROM meta WHERE key = 'schedule'")
+        return rows[0][0] if rows else None
+
+    def instance(self):
+        """Id of the scheduler that uses the journal, it labels
+        the containers the scheduler starts"""
+        rows = self._read("SELECT value FROM meta WHERE key = 'instance'")
+        if rows:
+            return rows[0][0]
+        instance = uuid.uuid4().hex
+        self._write("INSERT INTO meta VALUES ('instance', ?)", (instance,))
+        self.flush()
+        return instance
+
+    def _events(self, rows):
+        return [
+            ScheduleEvent(datetime.datetime.fromisoformat(time), seq, file, channel)
+            for seq, (time, file, channel) in enumerate(rows)
+        ]
+
+    def pendingItems(self, now):
+        """Returns the queued items that start after now as ScheduleEvents"""
+        rows = self._read(
+            "SELECT time, file, channel FROM items"
+            " WHERE status = ? AND time > ? ORDER BY time",
+            (QUEUED, now.isoformat()),
+        )
+        return self._events(rows)
+
+    def running(self):
+        """Returns (event, container id) of every container that was
+        running when the journal was last written. Containers that
+        played several items come with the first one."""
+        rows = self._read(
+            "SELECT time, file, channel, container FROM items"
+            " WHERE status = ? AND container IS NOT NULL ORDER BY time",
+            (RUNNING,),
+        )
+        first = {}
+        for time, file, channel, identifier in rows:
+            first.setdefault(identifier, (time, file, channel))
+        return list(zip(self._events(first.values()), first))
+
+    def history(self, limit=100):
+        """Returns the newest log rows, newest first"""
+        return self._read("SELECT * FROM log ORDER BY rowid DESC LIMIT ?", (limit,))
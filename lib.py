@@ -1,58 +1,29 @@
-from pathlib import Path
 import datetime
-import docker
-import re
-from tkinter import filedialog
-import pandas as pd
+import time
+import queue
 import tkinter
 from tkinter.messagebox import showerror, showinfo, askyesno
 import pathlib
-import numpy as np
 import shutil
 import logging
+import core
+import schedulewatch
+from core import (
+    countImages,
+    dispatch_test_stream,
+    dispatch_stream,
+    parseCredentials,
+    parseContainerOutput,
+    parseFailure,
+)
+from scheduleview import ScheduleView
 
 
 # define global variables
 
-RTMPSETTINGS_TEMPLATE = (
-    "'{} "
-    "flashver=FMLE/3.020(compatible;20FMSc/1.0)"
-    " live=true pubUser={} pubPasswd={} playpath={}'"
-)
+NOTICE_INTERVAL = 100  # ms between draining notices of the scheduler
+EXIT_TIMEOUT = 10  # seconds the window waits for containers to stop
 
-FFMPEG_TEMPLATE_TEST = """ffmpeg -re\
-                        -f lavfi\
-                        -i testsrc\
-                        -c:v libx264\
-                        -b:v 1600k\
-                        -preset ultrafast\
-                        -b 900k\
-                        -c:a libfdk_aac\
-                        -b:a 128k\
-                        -s 960x720\
-                        -x264opts keyint=50\
-                        -g 25\
-                        -pix_fmt yuv420p\
-                        -f flv {}"""
-
-FFMPEG_TEMPLATE = """ffmpeg -re\
-                        -i {}\
-                        -c:v libx264\
-                        -b:v 1600k\
-                        -preset ultrafast\
-                        -b 900k\
-                        -c:a libfdk_aac\
-                        -b:a 128k\
-                        -s 1280x720\
-                        -x264opts keyint=50\
-                        -g 25\
-                        -pix_fmt yuv420p\
-                        -f flv {}"""
-
-# set loggingpath
-
-datestring = datetime.datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
-logFile = Path(f"C:/temp/{datestring}.log")
 logger = logging.getLogger("lib")
 
 # misc
@@ -63,82 +34,82 @@ def currentTime():
     return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
 
-def askExit(frame, root):
+def askExit(frame, root, engine=None):
     if askyesno("Exit", "Do you really want to exit? All containers will be killed!"):
-        stopAllContainers(frame, frame.imageName)
-        root.destroy()
+        if frame.scheduler is None:
+            if frame.transcoder is not None:
+                frame.transcoder.close()
+            stopAllContainers(frame, frame.imageName, engine=engine)
+            root.destroy()
+            return
+        # containers are stopped on the scheduler, the window keeps drawing
+        setStream(frame, "grey", "Stopping")
+        future = runStep(frame, core.stopImageContainers, frame.imageName, engine)
+        finishExit(frame, root, future, time.monotonic() + EXIT_TIMEOUT)
+
+
+def finishExit(frame, root, future, deadline):
+    """Closes the window once the containers are stopped"""
+    if not future.done() and time.monotonic() < deadline:
+        frame.after(NOTICE_INTERVAL, finishExit, frame, root, future, deadline)
+        return
+    if frame.watcher is not None:
+        frame.watcher.stop()
+    if frame.containerEvents is not None:
+        frame.containerEvents.stop()
+    frame.scheduler.stop()
+    if frame.transcoder is not None:
+        frame.transcoder.close()
+    root.destroy()
+
+
+def runStep(frame, function, *args):
+    """Runs core step function(frame, *args) on the scheduler thread,
+    so that docker never blocks the window. Its notices are drawn by
+    drainNotices. Without a scheduler the step runs right away.
+    Returns a concurrent.futures.Future or None."""
+    if frame.scheduler is None:
+        renderNotices(frame, function(frame, *args))
+        return None
+    return frame.scheduler.submit(function, *args)
 
 
 # parsing related functions
 
 
 def check_config_timing(df):
-    # check time difference
-    diffs = pd.Series(np.diff(df["Date/Time"]))
-    # LOGGING
-    logger.debug(f"Time differences: {diffs}")
-    target = datetime.timedelta(minutes=30)
-    try:
-        assert not any(diff < target for diff in diffs)
-    except AssertionError:
+    # check time difference between streams of the same channel
+    if not core.checkTiming(df):
         showerror("Error", "Stream timepoints are closer together than 30 min!")
         logger.error("Stream timepoints are closer together than 30 min!")
 
 
 def check_config_format(df):
     """Checks whether config entries are valid"""
-    try:
-        dirs = []
-        for row in df.iterrows():
-            dirs.append(Path(row[1]["File"]).parent)
-        assert all([x == dirs[0] for x in dirs])
-    except AssertionError:
-        showerror("Error", "Video files are not all in the same directory!")
-        logger.error("Video files are not all in the same directory!")
-        return False
-    # check datatypes
-    try:
-        for row in df.iterrows():
-            assert isinstance(row[1]["Date"], datetime.datetime)
-            assert isinstance(row[1]["Time"], datetime.time)
-            assert isinstance(row[1]["File"], str)
-    except AssertionError:
-        showerror("Error", "Schedule does not have the right format/datatypes!")
-        logger.error("Schedule does not have the right format/datatypes!")
-        return False
-    # check whether path to mp4 exists
-    try:
-        for fileP in df["File"]:
-            temp = pathlib.Path(fileP)
-            assert temp.exists()
-    except AssertionError:
-        showerror("Error", "Video files do not exist!")
-        logger.error("Video files do not exist!")
-        return False
-    return True
+    from validation import validateSchedule
 
+    return showReport(validateSchedule(df))
 
-def parseContainerOutput(contID):
-    """Parses container output"""
-    while True:
-        line = contID.logs(tail=1)
-        # logger
-        logger.info(f"Container Output is: {line}")
-        if len(line.strip().decode().split(" ")) < 10:
-            yield None
-        else:
-            # standard out trick to parse ffmpeg output
-            matched = re.findall(r"\d+\.\dkbits\/s", line.strip().decode())
-            if len(matched) > 0:
-                yield re.findall(r"\d+\.\dkbits\/s", line.strip().decode())[
-                    -1
-                ]  # yield newest bitrate
-            else:
-                yield None
+
+def check_config_files(df):
+    """Checks whether the video files of a schedule are valid"""
+    from validation import validateFiles
+
+    return showReport(validateFiles(df["File"]))
+
+
+def showReport(report):
+    if not report.ok:
+        showerror("Error", str(report))
+        logger.error(f"Schedule is not valid: {report}")
+        return False
+    return True
 
 
-def load_config(frame, filepath=None):
+def load_config(frame, filepath=None, cache=None):
     if filepath is None:
+        from tkinter import filedialog
+
         filename = filedialog.askopenfilename(
             initialdir="/",
             title="Select file",
@@ -146,216 +117,91 @@ def load_config(frame, filepath=None):
         )
     else:
         filename = filepath
-    schedule = pd.read_excel(filename)
-    # check format of config
-    good = check_config_format(schedule)
-    if good:
-        # combine date and time for display
-        schedule.loc[:, "Date/Time"] = schedule.apply(
-            lambda x: pd.Timestamp.combine(x["Date"], x["Time"]), axis=1
-        )
-        schedule = schedule.drop(columns=["Date", "Time"])
-        # sort by date/time
-        schedule = schedule.sort_values(by="Date/Time")
-        # check config
-        check_config_timing(schedule)
-        # prune out past events
-        schedule = schedule.loc[schedule["Date/Time"] > frame.nowDT, :]
-        if len(schedule) == 0:
-            showerror("Error", "Only past events provided!")
-            logger.error("Only past events provided!")
-        else:
-            # load credentials
-            credentials = pd.read_excel(filename, sheet_name="Credentials")
-            frame.credentials = credentials.T[0].to_dict()
-            # add pathmap for docker mapping
-            tempBase = pathlib.Path(schedule["File"].values[0]).parent
-            frame.pathMap = {tempBase: {"bind": "/vids"}}
-            frame.schedule = schedule
-            draw_config(frame, schedule)
-            checkRightTime(frame)
-            # logger
-            logger.info("Config loaded succesfully")
-
-
-def parseFailure(container):
-    """Check if container has failed.
-    This is very crude!"""
-    check = container.logs().decode()
-    if (
-        ("error" in check.lower())
-        or ("failure" in check.lower())
-        or ("not found" in check.lower())
-    ):
-        # logger
-        logger.error(f"Stream Failed! With the following line {check}")
-        return True
-    return False
-
-
-def draw_config(window, loadedFrame):
-    # draw elements
-    index = None
-    for index, row in enumerate(loadedFrame.head(n=10).iterrows()):
-        # only show filename
-        filePath = pathlib.Path(row[1]["File"])
-        window.grid["grid"][index][0].set(filePath.name)
-        window.grid["grid"][index][1].set(row[1]["Date/Time"])
-    if index is None:
-        for i in range(0, 10):
-            window.grid["grid"][i][0].set(" ".join(["-"] * 20))
-            window.grid["grid"][i][1].set(" ".join(["-"] * 20))
-    elif index < 9:  # Redraw blanks if less entries
-        for i in range(index + 1, 10):
-            window.grid["grid"][i][0].set(" ".join(["-"] * 20))
-            window.grid["grid"][i][1].set(" ".join(["-"] * 20))
-
-
-def checkDocker(imageName):
-    """Checks if docker is installed and
-    whether the right container is available"""
-    result = shutil.which("docker")
-    if result is None:
-        showerror("error", "Docker is not installed!")
-        logger.error("Docker is not installed!")
+    schedule, credentials = read_config(filename, cache)
+    if schedule is None:
         return
-    # checker whether docker client is reachable
-    client = docker.from_env()
-    try:
-        client.version()
-    except BaseException:
-        showerror("error", "Docker is not running!")
-        logger.error("Docker is not running!")
-        return
-    # check whether image is installed
-    try:
-        client.images.get(imageName)
-    except docker.errors.ImageNotFound:
-        showerror("Error", f"{imageName} not found in docker.images!")
-        logger.error(f"{imageName} not found in docker.images!")
-    if countImages(imageName) != 0:
-        showerror(
-            "Error",
-            "Other containers with the same image are running!\n Please stop the containers.",
-        )
-        logger.error(
-            "Other containers with the same image are running!\n Please stop the containers."
-        )
+    if frame.journal is not None:
+        frame.journal.setSource(filename)
+    if frame.scheduler is None:
+        renderNotices(frame, core.loadSchedule(frame, schedule, credentials))
+        checkRightTime(frame)
+    else:
+        # the scheduler owns the queue, its notices are drawn by drainNotices
+        frame.scheduler.submit(core.loadSchedule, schedule, credentials)
+        watchConfig(frame, filename, cache)
+
+
+def resumeJournal(frame):
+    """Takes over the streams the last run left running and
+    continues the schedule it had loaded"""
+    runStep(frame, core.adoptStreams)
+    source = frame.journal.source()
+    if source is not None and pathlib.Path(source).exists():
+        runStep(frame, core.restoreWorkbook, source)
+        if frame.scheduler is not None:
+            watchConfig(frame, source)
+
+
+def watchConfig(frame, filename, cache=None):
+    """Merges changes of the loaded workbook into the running schedule"""
+    if frame.watcher is not None:
+        frame.watcher.stop()
+    frame.watcher = schedulewatch.watchSchedule(frame.scheduler, filename, cache)
+
+
+def read_config(filename, cache=None):
+    """Reads, checks and normalizes a schedule workbook.
+    Returns the schedule and the credentials sheet
+    or None, None if the schedule is not valid."""
+    schedule, credentials, report = core.readSchedule(filename, cache)
+    if not showReport(report):
+        return None, None
+    return schedule, credentials
+
+
+def check_config_channels(schedule, channelCredentials):
+    """Checks whether every channel has credentials"""
+    missing = core.missingChannels(schedule, channelCredentials)
+    if missing:
+        showerror("Error", f"No credentials for channels: {', '.join(missing)}!")
+        logger.error(f"No credentials for channels: {missing}")
+        return False
+    return True
+
 
+def draw_config(window, rows):
+    """Shows the schedule (core.ScheduleRows) in the schedule view"""
+    window.scheduleView.setRows(rows)
 
-def countImages(imageName):
-    client = docker.from_env()
-    containerList = client.containers.list()
-    count = 0
-    for cont in containerList:
-        if imageName in str(cont.image):
-            count += 1
-    return count
+
+def checkDocker(imageName, engine=None):
+    """Checks if docker is installed and
+    whether the right container is available"""
+    for problem in core.checkDocker(imageName, engine=engine):
+        showerror("Error", problem)
+        logger.error(problem)
 
 
 # Streaming related functions
 
 
-def dispatch_test_stream(credentials, engine=None):
-    """Starts streaming via ffmpeg.
-    Returns subprocess.Popen instance."""
-    # fill in credentials
-    filledRTMP = RTMPSETTINGS_TEMPLATE.format(
-        credentials["rtmp-URL"],
-        credentials["User"],
-        credentials["Password"],
-        credentials["playpath"],
-    )
-    # fill in ffmpeg
-    ffmpegCommand = FFMPEG_TEMPLATE_TEST.format(filledRTMP)
-    # connect to docker client
-    if engine is None:
-        client = docker.from_env()
-    else:
-        client = engine
-    # start container
-    try:
-        contID = client.containers.run("ffmpeg:1.0", ffmpegCommand, detach=True)
-    except docker.errors.APIError:
-        showerror("Erro", "Docker is not ready/installed!")
-        logger.error("Docker is not ready/installed!")
-        return None
-    else:
-        return contID
-
-
-def dispatch_stream(videofile, credentials, pathmap, engine=None):
-    """Starts streaming via ffmpeg.
-    Returns docker container object."""
-    # fill in credentials
-    filledRTMP = RTMPSETTINGS_TEMPLATE.format(
-        credentials["rtmp-URL"],
-        credentials["User"],
-        credentials["Password"],
-        credentials["playpath"],
-    )
-    # fill in ffmpeg
-    ffmpegCommand = FFMPEG_TEMPLATE.format(videofile, filledRTMP)
-    # connect to docker client
-    if engine is None:
-        client = docker.from_env()
-    else:
-        client = engine
-    try:
-        contID = client.containers.run(
-            "ffmpeg:1.0", ffmpegCommand, detach=True, volumes=pathmap
-        )
-    except docker.errors.APIError:
-        showerror("Erro", "Docker is not ready/installed!")
-        logger.error("Docker is not ready/installed")
-        return None
-    else:
-        logger.debug(f"Stream dispatched with contID {contID}")
-        return contID
+def verifyDocker(frame, engine=None):
+    """Checks docker like checkDocker without blocking the window"""
+    return runStep(frame, core.verifyDocker, engine)
 
 
 def startTestContainer(frame, engine=None):
-    if frame.credentials is None:
-        showerror("Error", "No credentials specified!")
-        logger.error("No credentials specified!")
-        return
-    if frame.container is not None:
-        showerror("Error", "A stream is already running!")
-        logger.error("A stream is already running!")
-    else:
-        frame.container = dispatch_test_stream(frame.credentials, engine=engine)
-        if frame.container is not None:
-            setStream(frame, "grey", "Waiting")
-            frame.streamActive = True
+    return runStep(frame, core.startTestStream, engine)
 
 
-def stopTestContainer(frame):
-    if frame.container is not None:
-        frame.container.stop()
-        frame.container = None
-        frame.streamActive = False
-    else:
-        showerror("Error", "No container is running!")
-        logger.error("No container is running!")
-        return
-    if countImages(frame.imageName) == 0:
-        setStream(frame, "yellow", "Incative")
+def stopTestContainer(frame, engine=None):
+    return runStep(frame, core.stopTestStream, engine)
 
 
-def stopAllContainers(frame, imageName):
+def stopAllContainers(frame, imageName, engine=None):
     """stops all running docker containers
     with the specified image name."""
-    frame.streamActive = False
-    client = docker.from_env()
-    containers = client.containers.list()
-    if len(containers) == 0:
-        logger.info("No containers are running!")
-    else:
-        for cont in containers:
-            if imageName in str(cont.image):
-                cont.stop()
-        showinfo("Stopped", "All containers stopped!")
-        logger.info("All containers stopped!")
+    return runStep(frame, core.stopImageContainers, imageName, engine)
 
 
 # gui-related functions
@@ -392,6 +238,10 @@ def onUpdate(frame):
     frame.now.set(setString)
     # update internal time
     frame.nowDT = datetime.datetime.now()
+    # update time to next stream
+    nextEvent = None if frame.queue is None else frame.queue.peek()
+    if nextEvent is not None:
+        frame.timeToStream = abs(frame.nowDT - nextEvent.time)
     # schedule timer to call myself after 1 second
     frame.after(1000, onUpdate, frame)
 
@@ -421,50 +271,6 @@ def createStatusWidget(frame):
     frameS.grid(column=0, row=1, sticky="S")
 
 
-def checkStream(frame):
-    """checks continuously whether
-    a Stream is running and sets the
-    statusWidget accordingly"""
-    client = docker.from_env()
-    # check whether container is running
-    if frame.container is not None:
-        status = frame.container.status
-        if status == "created":
-            # check whether stream is in client
-            containers = client.containers.list()
-            if frame.container not in containers:
-                # check whether there is a failure
-                failed = parseFailure(frame.container)
-                if failed:  # failure
-                    setStream(frame, "yellow", "Inactive")
-                    frame.streamActive = False  # reset stream active flag
-                    frame.container = None  # reset container
-                    # logger
-                    logger.error("Stream Failed!")
-                    showerror("Error", "Stream failed!")
-                else:  # was ok and stopped normally
-                    setStream(frame, "yellow", "Inactive")
-                    frame.streamActive = False  # reset stream active flag
-                    frame.after(0, showinfo, "Info", "Stream ended succesfully!")
-                    logger.info("Stream ended successfully!")
-                    frame.container = None
-            else:  # just started
-                setStream(frame, "green", "-/-")
-                logger.debug(frame.container.logs())
-                # get bitrate
-                output = next(parseContainerOutput(frame.container))
-                # set stream Ok
-                if output is not None:
-                    setStream(frame, "green", output)
-        if status == "running":
-            setStream(frame, "green", "-/-")
-            # get bitrate
-            output = next(parseContainerOutput(frame.container))
-            # set stream Ok
-            if output is not None:
-                setStream(frame, "green", output)
-
-
 def setStream(frame, color, rate):
     frame.status.set(color)
     # update status to green
@@ -473,108 +279,79 @@ def setStream(frame, color, rate):
 
 
 def drawConfigGrid(window):
-    # make empty grid
-    grid = [[[], []] for i in range(10)]
-    # setup grid parameter in window
-    window.grid = {"Names": [], "grid": grid}
-    frameM = tkinter.Frame(window)  # child of window
-    # draw column boxes
-    window.grid["Names"] = {}
-    for i, name in enumerate(["File", "Date/Time"]):
-        frame = tkinter.Frame(frameM, relief=tkinter.RAISED, borderwidth=1)
-        frame.grid(row=0, column=i)
-        label = tkinter.Label(master=frame, text=f"{name}")
-        label.pack()
-        frameM.columnconfigure(i, weight=1, minsize=200)
-        frameM.rowconfigure(0, weight=1, minsize=20)
-        window.grid["Names"][name] = label
-    # draw grid elements
-    for index, row in enumerate(range(10), start=1):
-        for j in range(2):
-            frame = tkinter.Frame(frameM, relief=tkinter.SUNKEN, borderwidth=1)
-            window.grid["grid"][row][j] = tkinter.StringVar()
-            window.grid["grid"][row][j].set(" ".join(["-"] * 20))
-            frame.grid(row=index, column=j)
-            label = tkinter.Label(
-                master=frame, textvariable=window.grid["grid"][row][j]
-            )
-            label.pack()
-            frameM.columnconfigure(index, weight=1, minsize=200)
-            frameM.rowconfigure(j, weight=1, minsize=20)
-    frameM.grid(row=0, columnspan=2)
+    """Creates the scrollable schedule view"""
+    window.scheduleView = ScheduleView(window)
+    window.scheduleView.grid(row=0, columnspan=2, sticky=tkinter.NSEW)
+
+
+# notices of the scheduler core
+
+
+def renderNotice(frame, notice):
+    """Shows a notice of the scheduler core in the window"""
+    kind = notice.kind
+    if kind == "schedule":
+        draw_config(frame, notice.data)
+    elif kind == "status":
+        # set stream Ok, orange if a stream falls behind
+        color = "orange" if notice.data["unhealthy"] else "green"
+        setStream(frame, color, notice.message)
+    elif kind == "started":
+        frame.after(10, showinfo, "Start", notice.message)
+    elif kind == "startFailed":
+        frame.after(10, showerror, "Error", notice.message)
+    elif kind in ("ended", "failed"):
+        if not notice.data["active"]:
+            setStream(frame, "yellow", "Inactive")
+        if kind == "failed":
+            showerror("Error", notice.message)
+        else:
+            frame.after(0, showinfo, "Info", notice.message)
+    elif kind == "interrupted":
+        # no dialog, the stream is restarted
+        setStream(frame, "orange", "Restarting")
+    elif kind == "testStarted":
+        setStream(frame, "grey", notice.message)
+    elif kind == "stopped":
+        if not notice.data["active"]:
+            setStream(frame, "yellow", "Inactive")
+        if notice.message:
+            showinfo("Stopped", notice.message)
+    elif kind == "error":
+        showerror("Error", notice.message)
+
+
+def renderNotices(frame, notices):
+    for notice in notices:
+        renderNotice(frame, notice)
+
+
+def drainNotices(frame):
+    """Renders the notices the scheduler posted
+    since the last call"""
+    while True:
+        try:
+            notice = frame.notices.get_nowait()
+        except queue.Empty:
+            break
+        renderNotice(frame, notice)
+    frame.after(NOTICE_INTERVAL, drainNotices, frame)
+
+
+# synchronous scheduling steps, the window runs them on a daemon.AsyncScheduler
+
+
+def checkStream(frame, engine=None):
+    """checks whether Streams are running and
+    sets the statusWidget accordingly"""
+    renderNotices(frame, core.pollStreams(frame, engine))
 
 
 def checkRightTime(frame):
-    """checks whether it is time to stream."""
-    if frame.schedule is None:  # not schedule loaded
-        return
-    if len(frame.schedule) == 0:  # no more streams to stream
-        return
-    if not frame.streamActive:
-        # check the next stream to start
-        nextRow = next(frame.schedule.iterrows())[1]
-        time = nextRow["Date/Time"]
-        videoFile = nextRow["File"]
-        # convert to target path in container
-        targetPath = f"/vids/{Path(videoFile).name}"
-        # check whether it is time to start
-        now = frame.nowDT
-        difference = datetime.timedelta(seconds=20)
-        frame.timeToStream = np.abs(now - time)
-        logger.debug(f"Time to stream is: {frame.timeToStream}")
-        logger.debug(
-            f"Next stream is: {frame.schedule['File'].values[0]} - {frame.schedule['Date/Time'].values[0]}"
-        )
-        if np.abs(now - time) < difference:
-            frame.container = dispatch_stream(
-                targetPath, frame.credentials, frame.pathMap
-            )
-            if frame.container is not None:
-                frame.after(
-                    10,
-                    showinfo,
-                    "Start",
-                    f"Stream start: {Path(videoFile).name} at {time}",
-                )
-                logger.info("Stream started!")
-                # set stream activate to true
-                frame.streamActive = True
-            else:
-                frame.after(
-                    10,
-                    showerror,
-                    "Error",
-                    "Error starting stream. Docker is not ready/installed.",
-                )
-                logger.error("Error starting stream. Docker is not ready/installed.")
-            # pluck the row from the schedule. Even if there was an error, otherwise streams in the future will not run
-            frame.schedule = frame.schedule.iloc[1:, :]
-            # redraw config
-            draw_config(frame, frame.schedule)
+    """checks whether it is time to stream"""
+    renderNotices(frame, core.dispatchDue(frame, frame.nowDT, dispatch_stream))
 
 
 def checkPastStream(frame):
-    """Gets rid of streams that are in the past.
-    This can happen if two streams are scheduled
-    right after each after and the first one takes longer
-    than the difference."""
-    if frame.streamActive:
-        oldLength = len(frame.schedule)
-        frame.schedule = frame.schedule.loc[
-            frame.schedule["Date/Time"] > frame.nowDT, :
-        ]
-        if oldLength != len(frame.schedule):
-            draw_config(frame, frame.schedule)
-
-
-def checkStreamEvents(frame):
-    """Main event that checks all
-    stream related things"""
-    # check whether stream needs to be started
-    checkRightTime(frame)
-    # check stream status
-    checkStream(frame)
-    # check past stream
-    checkPastStream(frame)
-    # schedule next stream
-    frame.after(1000, checkStreamEvents, frame)
+    """Gets rid of streams that are in the past"""
+    renderNotices(frame, core.prunePast(frame, frame.nowDT))
@@ -0,0 +1,183 @@
+"""Index of probed media information of video files"""
+import os
+import time
+import json
+import shutil
+import logging
+import threading
+import subprocess
+import collections
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import core
+from engine import getEngine
+from schedulecache import CACHE_HOME, privateDirectory
+
+
+# define global variables
+
+# durations plan the streams, so the index is kept where only the user can write
+INDEX_FILE = CACHE_HOME / "streamscheduler" / "media" / "index.json"
+WORKERS = 8  # files probed at once
+RETRY_FAILED = 600.0  # seconds before a file that could not be probed is probed again
+FFPROBE_COMMAND = [
+    "ffprobe",
+    "-v",
+    "error",
+    "-show_entries",
+    "format=duration,bit_rate:stream=codec_type,codec_name,width,height",
+    "-of",
+    "json",
+]
+
+MediaInfo = collections.namedtuple(
+    "MediaInfo",
+    ["duration", "videoCodec", "audioCodec", "width", "height", "bitrate"],
+)
+
+logger = logging.getLogger("mediaindex")
+
+
+def parseProbe(output):
+    """Builds MediaInfo from the json ffprobe prints"""
+    probe = json.loads(output)
+    streams = probe.get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"), {})
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), {})
+    form = probe.get("format", {})
+    duration = form.get("duration")
+    bitrate = form.get("bit_rate")
+    return MediaInfo(
+        float(duration) if duration not in (None, "N/A") else None,
+        video.get("codec_name"),
+        audio.get("codec_name"),
+        video.get("width"),
+        video.get("height"),
+        int(bitrate) if bitrate not in (None, "N/A") else None,
+    )
+
+
+def probeLocal(fileName):
+    """Probes a file with the ffprobe of the host"""
+    result = subprocess.run(
+        FFPROBE_COMMAND + [str(fileName)], capture_output=True, check=True
+    )
+    return parseProbe(result.stdout)
+
+
+def probeDocker(fileName, engine=None):
+    """Probes a file with the ffprobe of the stream image"""
+    source = Path(fileName)
+    client = getEngine() if engine is None else engine
+    output = client.containers.run(
+        core.IMAGE_NAME,
+        FFPROBE_COMMAND + [f"/probe/{source.name}"],
+        entrypoint="",
+        volumes={str(source.parent): {"bind": "/probe", "mode": "ro"}},
+        remove=True,
+        stderr=False,
+        labels={core.LABEL: "probe"},
+    )
+    return parseProbe(output)
+
+
+def defaultProbe():
+    return probeLocal if shutil.which("ffprobe") is not None else probeDocker
+
+
+def fileId(fileName):
+    """Identifies a version of a file by path, size and mtime"""
+    stat = os.stat(fileName)
+    return f"{fileName}|{stat.st_size}|{stat.st_mtime_ns}"
+
+
+class MediaIndex:
+    """Media information of every file that was probed, persisted to
+    indexFile. Unknown files are probed in parallel, every version
+    of a file only once. Versions that could not be probed are not
+    probed again for retryFailed seconds."""
+
+    def __init__(
+        self,
+        indexFile=INDEX_FILE,
+        probe=None,
+        workers=WORKERS,
+        retryFailed=RETRY_FAILED,
+    ):
+        self.indexFile = None if indexFile is None else Path(indexFile)
+        self.probe = defaultProbe() if probe is None else probe
+        self.workers = workers
+        self.retryFailed = retryFailed
+        self.entries = self._read()
+        self.failed = {}  # file id: monotonic time the probe failed
+        self._lock = threading.Lock()
+
+    def _read(self):
+        if self.indexFile is None or not self.indexFile.exists():
+            return {}
+        try:
+            privateDirectory(self.indexFile.parent)
+        except OSError as error:
+            logger.warning(f"Not reading the media index: {error}")
+            return {}
+        try:
+            entries = json.loads(self.indexFile.read_text())
+            return {key: MediaInfo(*value) for key, value in entries.items()}
+        except (ValueError, TypeError) as error:
+            logger.warning(f"Dropping unreadable media index: {error}")
+            return {}
+
+    def _write(self):
+        if self.indexFile is None:
+            return
+        try:
+            privateDirectory(self.indexFile.parent)
+            temp = self.indexFile.with_suffix(".tmp")
+            temp.write_text(json.dumps(self.entries))
+            os.replace(temp, self.indexFile)
+        except OSError as error:
+            logger.warning(f"Could not write media index: {error}")
+
+    def _probe(self, key, fileName):
+        try:
+            return key, self.probe(fileName)
+        except Exception as error:
+            logger.error(f"Could not probe {fileName}: {error}")
+            return key, None
+
+    def lookup(self, fileNames):
+        """Returns {fileName: MediaInfo or None} and probes unknown files"""
+        keys = {}
+        for fileName in dict.fromkeys(fileNames):
+            try:
+                keys[fileName] = fileId(fileName)
+            except OSError:
+                keys[fileName] = None
+        with self._lock:
+            now = time.monotonic()
+            missing = {
+                key: fileName
+                for fileName, key in keys.items()
+                if key is not None
+                and key not in self.entries
+                and now - self.failed.get(key, -self.retryFailed) >= self.retryFailed
+            }
+            if missing:
+                logger.info(f"Probing {len(missing)} files")
+                with ThreadPoolExecutor(self.workers) as pool:
+                    probed = pool.map(lambda item: self._probe(*item), missing.items())
+                    for key, info in probed:
+                        if info is None:
+                            self.failed[key] = now
+                        else:
+                            self.failed.pop(key, None)
+                            self.entries[key] = info
+                self._write()
+            return {fileName: self.entries.get(key) for fileName, key in keys.items()}
+
+    def durations(self, fileNames):
+        """Returns {fileName: seconds or None}"""
+        return {
+            fileName: None if info is None else info.duration
+            for fileName, info in self.lookup(fileNames).items()
+        }
@@ -0,0 +1,391 @@
+"""Background monitoring of running stream containers"""
+import re
+import time
+import logging
+import threading
+import collections
+
+
+# define global variables
+
+RING_SIZE = 600  # number of progress samples kept per stream
+PROGRESS_BLOCK = 12  # lines of one ffmpeg -progress block
+MIN_SPEED = 0.9  # realtime ratio below which a stream falls behind
+HEALTH_WINDOW = 10  # samples a stream has to be slow before it is reported
+
+Sample = collections.namedtuple(
+    "Sample",
+    [
+        "timestamp",
+        "bitrate",
+        "fps",
+        "speed",
+        "frame",
+        "totalSize",
+        "outTime",
+        "dupFrames",
+        "dropFrames",
+    ],
+    defaults=(None,) * 5,
+)
+EMPTY_SAMPLE = Sample(None, None, None, None)
+
+SEPARATOR = re.compile(rb"[\r\n]")
+BITRATE = re.compile(rb"(\d+\.\d)kbits/s")
+KBITS = b"kbits/s"
+ZERO, NINE, DOT = b"0."[0], b"9"[0], b"."[0]
+WHITESPACE = b" \t\n\r\x0b\x0c"  # what bytes.strip() removes
+MIN_TOKENS = 10  # words of an ffmpeg status line
+FPS = re.compile(rb"fps=\s*(\d+(?:\.\d+)?)")
+SPEED = re.compile(rb"speed=\s*(\d+(?:\.\d+)?)x")
+
+# failure kinds and the output that indicates them, most specific first
+FAILURE_PATTERNS = collections.OrderedDict(
+    [
+        (
+            "connection",
+            rb"connection refused|connection reset|connection timed out"
+            rb"|network is unreachable|failed to connect|cannot open connection",
+        ),
+        (
+            "auth",
+            rb"authentication failed|unauthori[sz]ed|forbidden|access denied"
+            rb"|invalid credentials|badauth",
+        ),
+        (
+            "input",
+            rb"no such file or directory|not found|could not open"
+            rb"|invalid data found when processing input",
+        ),
+        (
+            "encoder",
+            rb"error while opening encoder|error initializing output stream"
+            rb"|error while encoding|conversion failed|encoder.{0,40}error",
+        ),
+        ("error", rb"error|failure"),
+    ]
+)
+MAX_CARRY = 4096  # bytes of an incomplete line kept between chunks
+
+Failure = collections.namedtuple("Failure", ["kind", "line"])
+
+
+def toBitrate(value):
+    return float(value[: -len(b"kbits/s")])
+
+
+def toSeconds(value):
+    return int(value) / 1e6
+
+
+def toSpeed(value):
+    return float(value.rstrip(b"x"))
+
+
+# ffmpeg -progress keys and the Sample fields they fill
+PROGRESS_FIELDS = {
+    b"frame": ("frame", int),
+    b"fps": ("fps", float),
+    b"bitrate": ("bitrate", toBitrate),
+    b"total_size": ("totalSize", int),
+    b"out_time_us": ("outTime", toSeconds),
+    b"speed": ("speed", toSpeed),
+    b"dup_frames": ("dupFrames", int),
+    b"drop_frames": ("dropFrames", int),
+}
+
+logger = logging.getLogger("monitor")
+
+
+def findBitrate(data, end=None):
+    """Finds the newest bitrate like 918.3kbits/s before end by scanning
+    data backwards, without copying any part of it.
+    Returns (kbits per second, start, stop) of the token or None."""
+    stop = len(data) if end is None else end
+    while True:
+        unit = data.rfind(KBITS, 0, stop)
+        if unit < 0:
+            return None
+        # exactly one decimal, at least one digit before the dot
+        if unit >= 3 and ZERO <= data[unit - 1] <= NINE and data[unit - 2] == DOT:
+            value, scale, index = 0, 1, unit - 3
+            while index >= 0 and ZERO <= data[index] <= NINE:
+                value += (data[index] - ZERO) * scale
+                scale *= 10
+                index -= 1
+            if scale > 1:
+                bitrate = (value * 10 + data[unit - 1] - ZERO) / 10
+                return bitrate, index + 1, unit + len(KBITS)
+        # look at the occurrences before this one
+        stop = unit + len(KBITS) - 1
+
+
+def tokenCount(line):
+    """Number of space separated words of the stripped line"""
+    start, stop = 0, len(line)
+    while start < stop and line[start] in WHITESPACE:
+        start += 1
+    while stop > start and line[stop - 1] in WHITESPACE:
+        stop -= 1
+    return line.count(b" ", start, stop) + 1
+
+
+def lastBitrate(line, minTokens=MIN_TOKENS):
+    """Returns the newest bitrate token of an ffmpeg status line
+    like "920.3kbits/s" or None. Short lines are prompts, not status."""
+    if tokenCount(line) < minTokens:
+        return None
+    found = findBitrate(line)
+    if found is None:
+        return None
+    return line[found[1] : found[2]].decode()
+
+
+def parseProgressLine(line, timestamp=None):
+    """Parses one ffmpeg status line into a Sample.
+    Returns None if the line does not contain a bitrate."""
+    found = findBitrate(line)
+    if found is None:
+        return None
+    fps = FPS.search(line)
+    speed = SPEED.search(line)
+    return Sample(
+        time.time() if timestamp is None else timestamp,
+        found[0],
+        float(fps.group(1)) if fps else None,
+        float(speed.group(1)) if speed else None,
+    )
+
+
+def formatBitrate(sample):
+    """Formats the bitrate of a sample for the status widget"""
+    if sample.bitrate is None:
+        return "-/-"
+    return f"{sample.bitrate:.1f}kbits/s"
+
+
+class ProgressParser:
+    """Builds Samples from the key=value blocks ffmpeg writes
+    with -progress. Every line is split once, values of
+    unknown keys are skipped and N/A values become None."""
+
+    def __init__(self):
+        self.blocks = 0
+        self._fields = {}
+
+    def pair(self, key, value, timestamp=None):
+        """Takes one key=value line.
+        Returns a Sample when the block is complete."""
+        key = key.strip()
+        if key == b"progress":
+            fields, self._fields = self._fields, {}
+            self.blocks += 1
+            if timestamp is None:
+                timestamp = time.time()
+            return EMPTY_SAMPLE._replace(timestamp=timestamp, **fields)
+        field = PROGRESS_FIELDS.get(key)
+        if field is not None:
+            name, convert = field
+            try:
+                self._fields[name] = convert(value.strip())
+            except ValueError:
+                self._fields[name] = None
+        return None
+
+    def feed(self, data, timestamp=None):
+        """Parses complete blocks of data. Returns their Samples."""
+        samples = []
+        for line in data.splitlines():
+            key, separator, value = line.partition(b"=")
+            if separator:
+                sample = self.pair(key, value, timestamp)
+                if sample is not None:
+                    samples.append(sample)
+        return samples
+
+
+def health(samples, window=HEALTH_WINDOW):
+    """Returns why a stream is unhealthy or None.
+    A stream is unhealthy if it ran slower than realtime
+    or dropped frames during the last window samples."""
+    recent = list(samples)[-window:]
+    if len(recent) < window:
+        return None
+    speeds = [sample.speed for sample in recent if sample.speed is not None]
+    if len(speeds) == window and max(speeds) < MIN_SPEED:
+        return f"running at {speeds[-1]:.2f}x"
+    drops = [sample.dropFrames for sample in recent if sample.dropFrames is not None]
+    if len(drops) > 1 and drops[-1] > drops[0]:
+        return f"dropped {drops[-1] - drops[0]} frames"
+    return None
+
+
+class FailureDetector:
+    """Scans container output for failures incrementally.
+    Output is either pushed with feed() or pulled with check(), which
+    only requests the log written since the previous check. Every byte
+    is scanned once by a single compiled pattern; only the line that
+    matched is classified by kind."""
+
+    def __init__(self, patterns=None):
+        if patterns is None:
+            patterns = FAILURE_PATTERNS
+        self.kinds = [
+            (kind, re.compile(pattern, re.IGNORECASE))
+            for kind, pattern in patterns.items()
+        ]
+        self.pattern = re.compile(
+            b"|".join(b"(?:%s)" % pattern for pattern in patterns.values()),
+            re.IGNORECASE,
+        )
+        self.since = None
+        self.failure = None
+        self._partial = b""
+
+    def check(self, container):
+        """Reads the output written since the last check.
+        Returns a Failure or None."""
+        now = time.time()
+        # progress goes to stdout, messages to stderr
+        if self.since is None:
+            chunk = container.logs(stdout=False, stderr=True)
+        else:
+            chunk = container.logs(stdout=False, stderr=True, since=self.since)
+        self.since = now
+        self.feed(chunk)
+        self.flush()
+        return self.failure
+
+    def feed(self, chunk):
+        """Scans complete lines of chunk"""
+        if self.failure is not None:
+            return
+        data = self._partial + chunk
+        end = max(data.rfind(b"\n"), data.rfind(b"\r")) + 1
+        self._partial = data[end:][-MAX_CARRY:]
+        self._scan(data, end)
+
+    def flush(self):
+        """Scans the remaining incomplete line"""
+        data, self._partial = self._partial, b""
+        if self.failure is None:
+            self._scan(data, len(data))
+
+    def _scan(self, data, end):
+        match = self.pattern.search(data, 0, end)
+        if match is None:
+            return
+        start = max(
+            data.rfind(b"\n", 0, match.start()), data.rfind(b"\r", 0, match.start())
+        )
+        stop = SEPARATOR.search(data, match.end())
+        line = data[start + 1 : stop.start() if stop else len(data)]
+        for kind, pattern in self.kinds:
+            if pattern.search(line):
+                self.failure = Failure(kind, line.decode(errors="replace").strip())
+                break
+
+
+class LogFollower:
+    """Follows the progress output (stdout) of one container in a
+    background thread and keeps the newest samples in a ring buffer.
+    ffmpeg output is parsed incrementally, so lines that are split
+    across chunks are reassembled before parsing. Plain ffmpeg status
+    lines are still understood for containers started without -progress."""
+
+    def __init__(self, container, size=RING_SIZE, detector=None):
+        self.container = container
+        self.detector = FailureDetector() if detector is None else detector
+        self.samples = collections.deque(maxlen=size)
+        self.firstSample = None
+        self.progress = ProgressParser()
+        self._partial = b""
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._stream = None
+        self._thread = None
+
+    def start(self):
+        """Reads the current last progress block once and starts following"""
+        self.detector.check(self.container)
+        self.feed(
+            self.container.logs(stdout=True, stderr=False, tail=PROGRESS_BLOCK)
+        )
+        self.flush()
+        self._thread = threading.Thread(
+            target=self._follow, name="LogFollower", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def _follow(self):
+        try:
+            self._stream = self.container.logs(
+                stdout=True,
+                stderr=False,
+                stream=True,
+                follow=True,
+                since=self.detector.since,
+            )
+            for chunk in self._stream:
+                if self._stopped.is_set():
+                    break
+                self.feed(chunk)
+        except BaseException as error:
+            logger.debug(f"Log stream closed: {error}")
+        finally:
+            self.flush()
+
+    def feed(self, chunk):
+        """Parses all complete lines of chunk"""
+        with self._lock:
+            parts = SEPARATOR.split(self._partial + chunk)
+            self._partial = parts.pop()
+            for line in parts:
+                self._parse(line)
+
+    def flush(self):
+        """Parses the remaining incomplete line"""
+        with self._lock:
+            self._parse(self._partial)
+            self._partial = b""
+
+    def _parse(self, line):
+        sample = None
+        key, separator, value = line.partition(b"=")
+        if separator and b"=" not in value:
+            sample = self.progress.pair(key, value)
+        if sample is None and self.progress.blocks == 0:
+            # plain ffmpeg status line
+            sample = parseProgressLine(line)
+        if sample is not None:
+            started = sample.frame is None or sample.frame > 0
+            if self.firstSample is None and started:
+                self.firstSample = sample
+            self.samples.append(sample)
+
+    def latest(self):
+        """Returns the newest sample or None"""
+        try:
+            return self.samples[-1]
+        except IndexError:
+            return None
+
+    def health(self):
+        """Returns why the stream is unhealthy or None"""
+        with self._lock:
+            return health(self.samples)
+
+    def finish(self, timeout=1):
+        """Waits for the log stream of an exited container to drain"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.stop()
+
+    def stop(self):
+        self._stopped.set()
+        if self._stream is not None and hasattr(self._stream, "close"):
+            try:
+                self._stream.close()
+            except BaseException:
+                pass
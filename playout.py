@@ -0,0 +1,126 @@
+"""Gapless playout of back-to-back streams of one channel"""
+import os
+import uuid
+import bisect
+import shutil
+import datetime
+import logging
+from pathlib import Path
+from schedulecache import CACHE_HOME, privateDirectory
+
+
+# define global variables
+
+MAX_GAP = datetime.timedelta(seconds=5)  # streams closer than this share a session
+# playlists decide what is broadcast, so they are kept where only the user can write
+PLAYLIST_DIR = CACHE_HOME / "streamscheduler" / "playlists"
+PLAYLIST_MOUNT = "/playlist"  # playlist directory inside the container
+LINK_HEADER = "ffconcat version 1.0\n"
+# the next link is opened by a nested concat demuxer, which would
+# reject the absolute item paths without safe 0
+LINK_OPTIONS = "option safe 0\n"
+
+logger = logging.getLogger("playout")
+
+
+def itemKey(event):
+    """Identifies a schedule entry independent of the queue it is in"""
+    return (event.time, event.file, event.channel)
+
+
+def chain(events, first, duration, maxGap=MAX_GAP):
+    """Returns the events of first's channel that follow first back
+    to back. events are walked in start order; duration(event) returns
+    seconds or None, the chain stops at streams of unknown length."""
+    result = []
+    length = duration(first)
+    if length is None:
+        return result
+    end = first.time + datetime.timedelta(seconds=length)
+    for event in events:
+        if event.time > end + maxGap:
+            break
+        if event.channel != first.channel or event.time <= first.time:
+            continue
+        length = duration(event)
+        if event.time < end or length is None:
+            break
+        result.append(event)
+        end = event.time + datetime.timedelta(seconds=length)
+    return result
+
+
+class PlayoutSession:
+    """Streams of one channel played by a single ffmpeg process, so that
+    the connection and the encoder stay up between them.
+    The input is a chain of ffconcat files that each name one item and
+    the next link. ffmpeg only opens a link when the item before it ended,
+    so items can be appended until the last item started playing.
+    Raises PermissionError if others can write to directory."""
+
+    def __init__(self, channel, directory=PLAYLIST_DIR):
+        self.channel = channel
+        privateDirectory(Path(directory))
+        self.directory = Path(directory) / uuid.uuid4().hex
+        self.directory.mkdir(mode=0o700)
+        self.events = []
+        self.inputs = []
+        self.starts = []  # offset of every item from the session start
+        self.end = 0.0
+        self._keys = set()
+
+    def __len__(self):
+        return len(self.events)
+
+    def __contains__(self, event):
+        return itemKey(event) in self._keys
+
+    @staticmethod
+    def linkName(index):
+        return f"link{index}.ffconcat"
+
+    @property
+    def input(self):
+        """Input of ffmpeg inside the container"""
+        return f"{PLAYLIST_MOUNT}/{self.linkName(0)}"
+
+    def volumes(self):
+        return {str(self.directory): {"bind": PLAYLIST_MOUNT, "mode": "ro"}}
+
+    def _writeLink(self, index):
+        lines = [LINK_HEADER, f"file '{self.inputs[index]}'\n"]
+        if index + 1 < len(self.inputs):
+            lines += [f"file '{self.linkName(index + 1)}'\n", LINK_OPTIONS]
+        path = self.directory / self.linkName(index)
+        temp = path.with_suffix(".tmp")
+        temp.write_text("".join(lines))
+        os.replace(temp, path)
+
+    def add(self, event, videoInput, duration):
+        """Appends an item, videoInput is its path inside the container"""
+        self.events.append(event)
+        self.inputs.append(videoInput)
+        self.starts.append(self.end)
+        self.end += duration
+        self._keys.add(itemKey(event))
+        self._writeLink(len(self.inputs) - 1)
+        if len(self.inputs) > 1:
+            # link the previous last item to the new one
+            self._writeLink(len(self.inputs) - 2)
+
+    def canExtend(self, outTime):
+        """Whether the last item has not started playing at outTime"""
+        return outTime is None or outTime < self.starts[-1]
+
+    def position(self, outTime):
+        """Returns the index of the item playing at outTime
+        and the seconds played of it."""
+        index = max(bisect.bisect_right(self.starts, outTime or 0.0) - 1, 0)
+        return index, (outTime or 0.0) - self.starts[index]
+
+    def itemDuration(self, index):
+        end = self.starts[index + 1] if index + 1 < len(self.starts) else self.end
+        return end - self.starts[index]
+
+    def cleanup(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
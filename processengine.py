@@ -0,0 +1,488 @@
+"""Streams as ffmpeg processes of this machine instead of docker containers"""
+import os
+import time
+import uuid
+import shlex
+import queue
+import shutil
+import selectors
+import threading
+import subprocess
+import collections
+import logging
+from core import hostPath
+
+
+# define global variables
+
+READ_SIZE = 1 << 16  # bytes read from a pipe at once
+READ_TIMEOUT = 0.2  # seconds the reader waits for new pipes
+MAX_CHUNKS = 4096  # output chunks kept per pipe
+STOP_TIMEOUT = 5.0  # seconds ffmpeg gets to finish before it is killed
+KEEP_EXITED = 32  # exited processes kept for their output, docker keeps them all
+
+logger = logging.getLogger("processengine")
+
+
+def matchFilters(container, filters):
+    """Applies the id, ancestor, label and status filters of docker"""
+    for key, values in (filters or {}).items():
+        values = values if isinstance(values, list) else [values]
+        if key == "id" and container.id not in values:
+            return False
+        if key == "ancestor" and container.image not in values:
+            return False
+        if key == "status" and container.state() not in values:
+            return False
+        if key == "label":
+            for value in values:
+                name, _, expected = value.partition("=")
+                if name not in container.labels:
+                    return False
+                if expected and container.labels[name] != expected:
+                    return False
+    return True
+
+
+class OutputBuffer:
+    """Output of one pipe as chunks with the time they were read.
+    The oldest chunks are dropped beyond maxChunks."""
+
+    def __init__(self, maxChunks=MAX_CHUNKS):
+        self.chunks = collections.deque(maxlen=maxChunks)  # (time, bytes)
+        self.count = 0  # chunks ever appended
+        self.closed = False
+        self._condition = threading.Condition()
+
+    def append(self, chunk):
+        with self._condition:
+            self.chunks.append((time.time(), chunk))
+            self.count += 1
+            self._condition.notify_all()
+
+    def close(self):
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+    def wake(self):
+        with self._condition:
+            self._condition.notify_all()
+
+    def read(self, since=None):
+        with self._condition:
+            return b"".join(
+                chunk for at, chunk in self.chunks if since is None or at >= since
+            )
+
+    def follow(self, since=None, wait=True, stopped=None):
+        """Yields the chunks written since and, with wait, every new
+        chunk until the pipe is closed or stopped is set"""
+        stopped = threading.Event() if stopped is None else stopped
+        with self._condition:
+            position = self.count - len(self.chunks)
+            for at, _ in self.chunks:
+                if since is None or at >= since:
+                    break
+                position += 1
+        while True:
+            with self._condition:
+                while wait and self.count <= position and not self.closed:
+                    if stopped.is_set():
+                        return
+                    self._condition.wait()
+                first = self.count - len(self.chunks)
+                position = max(position, first)
+                chunks = [chunk for _, chunk in list(self.chunks)[position - first :]]
+                position = self.count
+                done = self.closed or not wait
+            yield from chunks
+            if done and not chunks:
+                return
+
+
+class LogStream:
+    """Followed output of a pipe, close() ends it from any thread
+    like closing the log stream of docker"""
+
+    def __init__(self, buffer, since=None, follow=True):
+        self.buffer = buffer
+        self.stopped = threading.Event()
+        self._chunks = buffer.follow(since, follow, self.stopped)
+
+    def __iter__(self):
+        return self._chunks
+
+    def close(self):
+        self.stopped.set()
+        self.buffer.wake()
+
+
+class PipeReader:
+    """Reads the pipes of all processes in one thread. The pipes are
+    non-blocking and polled with a selector, so a quiet process never
+    holds up the others. Without selectable pipes (Windows) every pipe
+    gets a blocking reader thread instead."""
+
+    def __init__(self):
+        self.selectable = os.name != "nt"
+        self.selector = selectors.DefaultSelector() if self.selectable else None
+        self.thread = None
+        self._added = queue.Queue()  # (pipe, buffer, onClose) to register
+        self._stopped = threading.Event()
+
+    def add(self, pipe, buffer, onClose):
+        """Appends everything read from pipe to buffer,
+        calls onClose() once the pipe is at its end"""
+        if not self.selectable:
+            threading.Thread(
+                target=self.readBlocking, args=(pipe, buffer, onClose), daemon=True
+            ).start()
+            return
+        os.set_blocking(pipe.fileno(), False)
+        self._added.put((pipe, buffer, onClose))
+        if self.thread is None:
+            self.thread = threading.Thread(
+                target=self.run, name="PipeReader", daemon=True
+            )
+            self.thread.start()
+
+    def run(self):
+        while not self._stopped.is_set():
+            while not self._added.empty():
+                pipe, buffer, onClose = self._added.get()
+                self.selector.register(pipe, selectors.EVENT_READ, (buffer, onClose))
+            if not self.selector.get_map():
+                self._stopped.wait(READ_TIMEOUT)
+                continue
+            for key, _ in self.selector.select(READ_TIMEOUT):
+                self.read(key)
+
+    def read(self, key):
+        buffer, onClose = key.data
+        try:
+            chunk = os.read(key.fd, READ_SIZE)
+        except BlockingIOError:
+            return
+        except OSError:
+            chunk = b""
+        if chunk:
+            buffer.append(chunk)
+            return
+        self.selector.unregister(key.fileobj)
+        key.fileobj.close()
+        buffer.close()
+        onClose()
+
+    def readBlocking(self, pipe, buffer, onClose):
+        for chunk in iter(lambda: pipe.read1(READ_SIZE), b""):
+            buffer.append(chunk)
+        pipe.close()
+        buffer.close()
+        onClose()
+
+    def stop(self):
+        self._stopped.set()
+
+
+class ProcessContainer:
+    """ffmpeg process in place of a docker container object. Paths
+    inside the container are mapped to this machine through the
+    volumes. Like a docker container object its status is the one
+    it was created with until reload()."""
+
+    def __init__(self, engine, args, image=None, labels=None):
+        self.id = uuid.uuid4().hex
+        self.engine = engine
+        self.args = args
+        self.image = image
+        self.labels = labels or {}
+        self.status = "created"
+        self.process = None
+        self.exitCode = None
+        self.stdout = OutputBuffer()
+        self.stderr = OutputBuffer()
+        self._open = 2  # pipes not at their end
+        self._exited = threading.Event()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"ProcessContainer({self.id[:12]}, {self.state()})"
+
+    def start(self):
+        if self.process is not None:
+            return
+        self.process = subprocess.Popen(
+            self.args,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        logger.debug(f"Process {self.process.pid} started: {self.args[0]}")
+        self.engine.publish("start", self)
+        pipes = ((self.process.stdout, self.stdout), (self.process.stderr, self.stderr))
+        for pipe, buffer in pipes:
+            self.engine.reader.add(pipe, buffer, self._pipeClosed)
+
+    def _pipeClosed(self):
+        with self._lock:
+            self._open -= 1
+            if self._open:
+                return
+        if self.process.poll() is None:
+            # closed its pipes but still runs, do not hold up the reader
+            threading.Thread(target=self._reap, daemon=True).start()
+        else:
+            self._reap()
+
+    def _reap(self):
+        self.exitCode = self.process.wait()
+        self._exited.set()
+        logger.debug(f"Process {self.process.pid} exited with {self.exitCode}")
+        self.engine.publish("die", self, self.exitCode)
+
+    def state(self):
+        if self.process is None:
+            return "created"
+        return "exited" if self._exited.is_set() else "running"
+
+    def reload(self):
+        self.status = self.state()
+
+    def logs(
+        self,
+        stdout=True,
+        stderr=True,
+        stream=False,
+        follow=False,
+        since=None,
+        tail="all",
+        **kwargs,
+    ):
+        """Output like docker logs, since in seconds since the epoch,
+        tail the number of last lines"""
+        buffers = [self.stdout] if stdout else []
+        if stderr:
+            buffers.append(self.stderr)
+        if stream:
+            if len(buffers) != 1:
+                raise ValueError("Only one of stdout and stderr can be streamed")
+            return LogStream(buffers[0], since, follow)
+        output = b"".join(buffer.read(since) for buffer in buffers)
+        if tail == "all":
+            return output
+        return b"".join(output.splitlines(keepends=True)[-tail:]) if tail else b""
+
+    def wait(self, timeout=None):
+        if self.process is None:
+            raise RuntimeError("The process was not started")
+        if not self._exited.wait(timeout):
+            raise TimeoutError(f"Process {self.process.pid} still runs")
+        return {"StatusCode": self.exitCode}
+
+    def stop(self, timeout=STOP_TIMEOUT):
+        """Terminates ffmpeg, kills it if it does not end within timeout"""
+        if self.state() != "running":
+            return
+        self.process.terminate()
+        try:
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self._exited.wait(timeout)
+
+    def kill(self):
+        if self.state() == "running":
+            self.process.kill()
+
+    def remove(self, force=False):
+        if self.state() == "running":
+            if not force:
+                raise RuntimeError("Stop the process before removing it")
+            self.stop()
+        self.engine.forget(self)
+
+
+class ProcessContainers:
+    """containers of a ProcessEngine"""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def list(self, all=False, filters=None):
+        return [
+            container
+            for container in self.engine.table()
+            if (all or container.state() == "running")
+            and matchFilters(container, filters)
+        ]
+
+    def create(self, image, command, volumes=None, labels=None, **kwargs):
+        args = self.engine.command(command, volumes)
+        container = ProcessContainer(self.engine, args, image, labels)
+        self.engine.track(container)
+        return container
+
+    def run(self, image, command, detach=False, volumes=None, labels=None, **kwargs):
+        """Starts the process. Without detach it waits for
+        the process and returns its output like docker does."""
+        if not detach:
+            args = self.engine.command(command, volumes)
+            result = subprocess.run(args, capture_output=True, check=True)
+            return result.stdout
+        import docker
+
+        container = self.create(image, command, volumes, labels)
+        try:
+            container.start()
+        except OSError as error:
+            # like a container that docker cannot start
+            self.engine.forget(container)
+            raise docker.errors.APIError(f"{container.args[0]}: {error}")
+        return container
+
+    def get(self, containerId):
+        for container in self.engine.table():
+            if container.id == containerId:
+                return container
+        raise KeyError(containerId)
+
+
+class ProcessImages:
+    """images of a ProcessEngine, there is only the ffmpeg of this machine"""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def get(self, name):
+        return self.engine.version()
+
+
+class ProcessEvents:
+    """Start and die events of the processes, as docker reports them"""
+
+    def __init__(self, engine, filters=None):
+        self.engine = engine
+        self.filters = filters or {}
+        self.queue = queue.Queue()
+
+    def publish(self, action, container, exitCode):
+        wanted = self.filters.get("event")
+        if wanted is not None and action not in wanted:
+            return
+        if not matchFilters(container, {"label": self.filters.get("label", [])}):
+            return
+        attributes = dict(container.labels)
+        if exitCode is not None:
+            attributes["exitCode"] = str(exitCode)
+        self.queue.put(
+            {
+                "Type": "container",
+                "Action": action,
+                "id": container.id,
+                "Actor": {"ID": container.id, "Attributes": attributes},
+                "time": int(time.time()),
+                "timeNano": time.time_ns(),
+            }
+        )
+
+    def __iter__(self):
+        while True:
+            event = self.queue.get()
+            if event is None:
+                return
+            yield event
+
+    def close(self):
+        self.engine.unsubscribe(self)
+        self.queue.put(None)
+
+
+class ProcessEngine:
+    """Runs streams as ffmpeg processes of this machine. Starting one
+    costs no container create and start and no bind mounts, and no
+    docker daemon is needed. Exposes the part of the docker client
+    the scheduler uses, like engine.DockerEngine: the image is only
+    kept for filters, paths inside the container are mapped through
+    the volumes. executables maps a program to the command that runs
+    it, e.g. {"ffmpeg": ["/opt/ffmpeg/bin/ffmpeg"]}."""
+
+    localPaths = True  # playlists have to name the files of this machine
+
+    def __init__(self, executables=None):
+        self.executables = {} if executables is None else executables
+        self.containers = ProcessContainers(self)
+        self.images = ProcessImages(self)
+        self.reader = PipeReader()
+        self._table = {}
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    def command(self, command, volumes=None):
+        """Arguments of a docker command with the program and
+        the paths of this machine"""
+        args = shlex.split(command) if isinstance(command, str) else list(command)
+        args = self.executables.get(args[0], [args[0]]) + args[1:]
+        if isinstance(volumes, dict):
+            args = [hostPath(arg, volumes) for arg in args]
+        return args
+
+    def track(self, container):
+        """Adds container, forgets the oldest exited processes
+        beyond KEEP_EXITED since nobody removes them"""
+        with self._lock:
+            self._table[container.id] = container
+            exited = [c for c in self._table.values() if c.state() == "exited"]
+            for old in exited[: max(len(exited) - KEEP_EXITED, 0)]:
+                del self._table[old.id]
+
+    def forget(self, container):
+        with self._lock:
+            self._table.pop(container.id, None)
+
+    def table(self):
+        with self._lock:
+            return list(self._table.values())
+
+    def publish(self, action, container, exitCode=None):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.publish(action, container, exitCode)
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    # docker client interface
+
+    def version(self):
+        """Raises if ffmpeg cannot be found"""
+        program = self.executables.get("ffmpeg", ["ffmpeg"])[0]
+        path = shutil.which(program)
+        if path is None:
+            raise FileNotFoundError(f"{program} is not installed")
+        return {"Platform": {"Name": "process"}, "Executable": path}
+
+    def ping(self):
+        self.version()
+        return True
+
+    def info(self):
+        return {"NCPU": os.cpu_count() or 1}
+
+    def events(self, decode=False, filters=None, since=None):
+        """Events of the processes from now on, since is ignored
+        because the processes do not outlive the engine"""
+        subscriber = ProcessEvents(self, filters)
+        with self._lock:
+            self._subscribers.append(subscriber)
+        return subscriber
+
+    def close(self):
+        for container in self.table():
+            container.stop()
+        for subscriber in list(self._subscribers):
+            subscriber.close()
+        self.reader.stop()
@@ -0,0 +1,125 @@
+"""Restarting streams that failed while they were on air"""
+import time
+import collections
+import logging
+
+
+# define global variables
+
+RETRY_DELAY = 2.0  # seconds before the first restart, doubled for every further one
+MAX_RETRY_DELAY = 60.0
+RETRY_DEADLINE = 600.0  # seconds after a failure the stream is given up
+PERMANENT = ("auth", "input")  # failure kinds a restart does not fix
+
+# one restart, position in seconds of the item it seeks to
+Attempt = collections.namedtuple("Attempt", ["number", "at", "position", "container"])
+
+logger = logging.getLogger("recovery")
+
+
+class Retry:
+    """Restarts of the stream of a channel after it failed.
+    position is how far ffmpeg confirmed the output of event, in
+    seconds, lostAt the time of that output. gap is the time
+    without output once a restart delivers again."""
+
+    def __init__(self, channel, event, position, lostAt, deadline):
+        self.channel = channel
+        self.event = event
+        self.position = position
+        self.lostAt = lostAt
+        self.deadline = deadline
+        self.failures = []  # kind of every failure
+        self.attempts = []
+        self.dueAt = None
+        self.gap = None
+        self.outcome = None  # recovered, gaveUp, superseded, complete or stopped
+
+    def __repr__(self):
+        return (
+            f"Retry({self.channel}, {self.event.file}, {self.position:.1f} s, "
+            f"{len(self.attempts)} attempts, {self.outcome})"
+        )
+
+
+class StreamRecovery:
+    """Bookkeeping of the restarts of failed streams. The restarts
+    of a stream back off exponentially from delay to maxDelay and
+    stop deadline seconds after it failed, a deadline of 0 never
+    restarts. Every Retry that ended is kept in history."""
+
+    def __init__(
+        self, delay=RETRY_DELAY, maxDelay=MAX_RETRY_DELAY, deadline=RETRY_DEADLINE
+    ):
+        self.delay = delay
+        self.maxDelay = maxDelay
+        self.deadline = deadline
+        self.pending = {}  # channel: Retry waiting for its restart
+        self.history = []
+
+    def backoff(self, attempts):
+        return min(self.delay * 2**attempts, self.maxDelay)
+
+    def failed(self, slot, failure, event, position, lostAt=None):
+        """Schedules the restart of the stream of slot at position of
+        event. A failed restart continues the Retry of the slot.
+        Returns the Retry or None if the stream is given up."""
+        now = time.time()
+        retry = slot.retry
+        if retry is not None and retry.outcome is not None:
+            retry = None  # the stream recovered and failed again
+        if failure.kind in PERMANENT or self.deadline <= 0:
+            if retry is not None:
+                self.finish(retry, "gaveUp")
+            return None
+        if retry is None:
+            retry = Retry(slot.channel, event, position, now, now + self.deadline)
+        else:
+            retry.event, retry.position = event, position
+        if lostAt is not None:
+            retry.lostAt = lostAt
+        retry.failures.append(failure.kind)
+        return retry if self.schedule(retry, now) else None
+
+    def schedule(self, retry, now=None):
+        """Sets when retry is due. Returns False once its deadline passed."""
+        now = time.time() if now is None else now
+        if now >= retry.deadline:
+            self.finish(retry, "gaveUp")
+            return False
+        retry.dueAt = min(now + self.backoff(len(retry.attempts)), retry.deadline)
+        self.pending[retry.channel] = retry
+        return True
+
+    def due(self, now):
+        return [retry for retry in self.pending.values() if retry.dueAt <= now]
+
+    def nextDelay(self, now):
+        """Seconds until the next restart or None"""
+        if not self.pending:
+            return None
+        return max(min(retry.dueAt for retry in self.pending.values()) - now, 0)
+
+    def attempt(self, retry, container):
+        """Records a restart, container is None if it did not start"""
+        self.pending.pop(retry.channel, None)
+        number = len(retry.attempts) + 1
+        retry.attempts.append(Attempt(number, time.time(), retry.position, container))
+        logger.info(f"Restart {number} on {retry.channel} at {retry.position:.1f} s")
+
+    def recovered(self, retry, at):
+        """The restarted stream delivered its first output at time at"""
+        retry.gap = max(at - retry.lostAt, 0.0)
+        self.finish(retry, "recovered")
+
+    def finish(self, retry, outcome):
+        if self.pending.get(retry.channel) is retry:
+            del self.pending[retry.channel]
+        retry.outcome = outcome
+        self.history.append(retry)
+        logger.info(f"Restarting {retry.event.file} on {retry.channel}: {outcome}")
+
+    def cancel(self):
+        """Gives up the pending restarts, when the streams are stopped"""
+        for retry in list(self.pending.values()):
+            self.finish(retry, "stopped")
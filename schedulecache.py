@@ -0,0 +1,115 @@
+"""On-disk cache of parsed schedule workbooks"""
+import os
+import stat
+import hashlib
+import logging
+from pathlib import Path
+
+
+# define global variables
+
+SCHEMA_VERSION = 1  # bump when the normalized schedule changes
+# pickles run code when loaded, so they are kept where only the user can write
+CACHE_HOME = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache")
+CACHE_DIR = CACHE_HOME / "streamscheduler" / "schedules"
+MAX_ENTRIES = 20  # cached workbooks kept on disk
+CHUNK_SIZE = 1 << 20
+
+logger = logging.getLogger("schedulecache")
+
+
+def fileHash(path):
+    """sha256 of the file content"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fileObj:
+        for chunk in iter(lambda: fileObj.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def privateDirectory(directory):
+    """Creates directory with mode 0700. Raises PermissionError
+    if another user owns it or others can write to it."""
+    directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+    if os.name == "nt":
+        return
+    info = directory.stat()
+    if info.st_uid != os.getuid() or info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        raise PermissionError(f"{directory} is not private to this user")
+
+
+def readWorkbook(path):
+    """Opens the workbook once and reads the schedule
+    and the Credentials sheet. Returns both as DataFrames,
+    credentials are None if the sheet is missing."""
+    import pandas as pd
+
+    with pd.ExcelFile(path) as workbook:
+        schedule = workbook.parse(workbook.sheet_names[0])
+        credentials = None
+        if "Credentials" in workbook.sheet_names:
+            credentials = workbook.parse("Credentials")
+    return schedule, credentials
+
+
+class ScheduleCache:
+    """Normalized schedules and credentials pickled to disk,
+    keyed by workbook content hash and schema version."""
+
+    def __init__(self, directory=CACHE_DIR, maxEntries=MAX_ENTRIES):
+        self.directory = Path(directory)
+        self.maxEntries = maxEntries
+
+    def key(self, path):
+        return f"{fileHash(path)}-v{SCHEMA_VERSION}"
+
+    def path(self, key):
+        return self.directory / f"{key}.pkl"
+
+    def load(self, key):
+        """Returns (schedule, credentials) or None if not cached"""
+        import pandas as pd
+
+        cachePath = self.path(key)
+        if not cachePath.exists():
+            return None
+        try:
+            privateDirectory(self.directory)
+        except OSError as error:
+            logger.warning(f"Not reading the schedule cache: {error}")
+            return None
+        try:
+            return pd.read_pickle(cachePath)
+        except Exception as error:
+            logger.warning(f"Dropping unreadable cache entry {cachePath}: {error}")
+            cachePath.unlink()
+            return None
+
+    def store(self, key, schedule, credentials):
+        import pandas as pd
+
+        try:
+            privateDirectory(self.directory)
+            pd.to_pickle((schedule, credentials), self.path(key))
+            self.evict()
+        except OSError as error:
+            logger.warning(f"Could not cache schedule: {error}")
+
+    def evict(self):
+        """Removes the least recently written entries"""
+        entries = sorted(
+            self.directory.glob("*.pkl"), key=lambda entry: entry.stat().st_mtime
+        )
+        for entry in entries[: -self.maxEntries]:
+            entry.unlink()
+
+
+_cache = None
+
+
+def getCache():
+    """Returns the cache shared by the whole scheduler"""
+    global _cache
+    if _cache is None:
+        _cache = ScheduleCache()
+    return _cache
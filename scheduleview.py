@@ -0,0 +1,143 @@
+"""Scrollable schedule table of the window"""
+import tkinter
+import datetime
+from pathlib import Path
+
+
+# define global variables
+
+# column names and their minimal width in pixels
+COLUMNS = [
+    ("File", 200),
+    ("Date/Time", 160),
+    ("Channel", 90),
+    ("Duration", 80),
+    ("Status", 80),
+]
+VISIBLE_ROWS = 10  # rows that have widgets
+WHEEL_ROWS = 3  # rows scrolled per mouse wheel step
+EMPTY_CELL = "-"
+STATUS_COLORS = {"running": "green", "prepared": "light green", "session": "khaki"}
+
+
+def formatDuration(seconds):
+    if seconds is None:
+        return "?"
+    return str(datetime.timedelta(seconds=round(seconds)))
+
+
+def rowCells(row):
+    """Returns the texts of the cells of a core.ScheduleRow"""
+    event = row.event
+    return (
+        Path(event.file).name,
+        str(event.time),
+        str(event.channel),
+        formatDuration(row.duration),
+        row.status,
+    )
+
+
+class ScheduleView(tkinter.Frame):
+    """Table of the whole schedule. Only the visible rows have widgets,
+    scrolling shows other rows in them. Cells are only set when their
+    text changed, so redrawing costs the same for any schedule size."""
+
+    def __init__(self, master=None, visibleRows=VISIBLE_ROWS):
+        tkinter.Frame.__init__(self, master)
+        self.background = self.cget("bg")
+        self.rows = []
+        self.first = 0  # index of the row shown at the top
+        self.headers = {}
+        for column, (name, width) in enumerate(COLUMNS):
+            frame = tkinter.Frame(self, relief=tkinter.RAISED, borderwidth=1)
+            frame.grid(row=0, column=column, sticky=tkinter.NSEW)
+            label = tkinter.Label(master=frame, text=name)
+            label.pack()
+            self.columnconfigure(column, weight=1, minsize=width)
+            self.headers[name] = label
+        self.cells = []  # StringVars of the visible rows
+        self.shown = []  # texts the cells show
+        self.labels = []
+        for index in range(visibleRows):
+            self.addRow(index)
+        self.scrollbar = tkinter.Scrollbar(
+            self, orient=tkinter.VERTICAL, command=self.yview
+        )
+        self.scrollbar.grid(
+            row=1, column=len(COLUMNS), rowspan=visibleRows, sticky=tkinter.NS
+        )
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.bind(sequence, self.onWheel)
+        self.redraw()
+
+    def addRow(self, index):
+        variables, labels = [], []
+        for column in range(len(COLUMNS)):
+            frame = tkinter.Frame(self, relief=tkinter.SUNKEN, borderwidth=1)
+            frame.grid(row=index + 1, column=column, sticky=tkinter.NSEW)
+            variable = tkinter.StringVar()
+            variable.set(EMPTY_CELL)
+            label = tkinter.Label(master=frame, textvariable=variable)
+            label.pack()
+            for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+                label.bind(sequence, self.onWheel)
+            variables.append(variable)
+            labels.append(label)
+        self.rowconfigure(index + 1, weight=1, minsize=20)
+        self.cells.append(variables)
+        self.shown.append([EMPTY_CELL] * len(COLUMNS))
+        self.labels.append(labels)
+
+    def setRows(self, rows):
+        """Shows rows (core.ScheduleRow), keeps the scroll
+        position unless it is past the end"""
+        self.rows = rows
+        self.first = min(self.first, self.lastFirst())
+        self.redraw()
+
+    def lastFirst(self):
+        return max(len(self.rows) - len(self.cells), 0)
+
+    def scrollTo(self, first):
+        first = min(max(int(first), 0), self.lastFirst())
+        if first != self.first:
+            self.first = first
+            self.redraw()
+
+    def redraw(self):
+        """Sets the cells whose text changed"""
+        blank = (EMPTY_CELL,) * len(COLUMNS)
+        for offset, variables in enumerate(self.cells):
+            index = self.first + offset
+            texts = rowCells(self.rows[index]) if index < len(self.rows) else blank
+            shown = self.shown[offset]
+            for column, text in enumerate(texts):
+                if shown[column] != text:
+                    variables[column].set(text)
+                    if column == len(COLUMNS) - 1:
+                        color = STATUS_COLORS.get(text, self.background)
+                        self.labels[offset][column].configure(bg=color)
+                    shown[column] = text
+        self.scrollbar.set(*self.fractions())
+
+    def fractions(self):
+        """Visible part of the schedule for the scrollbar"""
+        if not self.rows:
+            return 0.0, 1.0
+        total = len(self.rows)
+        return self.first / total, min(self.first + len(self.cells), total) / total
+
+    def yview(self, *args):
+        """Scrollbar command, moveto fraction or scroll n units/pages"""
+        if args[0] == "moveto":
+            self.scrollTo(round(float(args[1]) * len(self.rows)))
+        elif args[0] == "scroll":
+            step = int(args[1])
+            if args[2] == "pages":
+                step *= len(self.cells)
+            self.scrollTo(self.first + step)
+
+    def onWheel(self, event):
+        up = getattr(event, "num", None) == 4 or getattr(event, "delta", 0) > 0
+        self.scrollTo(self.first + (-WHEEL_ROWS if up else WHEEL_ROWS))
@@ -0,0 +1,135 @@
+"""Reloading schedule workbooks when they change on disk"""
+import os
+import threading
+import logging
+from pathlib import Path
+import core
+from schedulecache import fileHash
+
+
+# define global variables
+
+POLL_INTERVAL = 2.0  # seconds between checks of the file without file events
+EVENT_POLL_INTERVAL = 30.0  # seconds between checks with file events
+SETTLE_TIME = 0.5  # seconds a file has to rest before it is read
+
+logger = logging.getLogger("schedulewatch")
+
+
+def fileSignature(path):
+    """Size and modification time of path or None if it is missing"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class ScheduleWatcher:
+    """Calls onChange(path) from a background thread when the content
+    of path changed. Listens to file system events if watchdog is
+    installed and polls size and modification time otherwise. The
+    file is only hashed when those change, so saving a workbook
+    without changes does not reload it."""
+
+    def __init__(self, path, onChange, interval=POLL_INTERVAL, settle=SETTLE_TIME):
+        self.path = Path(path).resolve()
+        self.onChange = onChange
+        self.interval = interval
+        self.settle = settle
+        self.signature = fileSignature(self.path)
+        self.digest = fileHash(self.path) if self.signature is not None else None
+        self.observer = None
+        self.thread = None
+        self._changed = threading.Event()
+        self._stopped = threading.Event()
+
+    def start(self):
+        self.observer = self.observe()
+        interval = self.interval
+        if self.observer is not None:
+            # polling only catches events that got lost
+            interval = max(interval, EVENT_POLL_INTERVAL)
+        self.thread = threading.Thread(
+            target=self.run, args=(interval,), name="ScheduleWatcher", daemon=True
+        )
+        self.thread.start()
+        return self
+
+    def observe(self):
+        """Subscribes to file system events of the directory of
+        the file. Returns the observer or None without watchdog."""
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            logger.info("watchdog is not installed, polling the schedule")
+            return None
+        watcher = self
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                # editors save to a temporary file and move it over the file
+                paths = (event.src_path, getattr(event, "dest_path", ""))
+                if any(path and Path(path) == watcher.path for path in paths):
+                    watcher._changed.set()
+
+        observer = Observer()
+        observer.schedule(Handler(), str(self.path.parent))
+        observer.daemon = True
+        observer.start()
+        return observer
+
+    def run(self, interval):
+        while not self._stopped.is_set():
+            self._changed.wait(interval)
+            # wait until the writer is done
+            while self._changed.is_set() and not self._stopped.is_set():
+                self._changed.clear()
+                self._stopped.wait(self.settle)
+            if not self._stopped.is_set():
+                self.check()
+
+    def check(self):
+        """Calls onChange if the content changed since the last
+        check. Returns whether it did."""
+        signature = fileSignature(self.path)
+        if signature is None or signature == self.signature:
+            return False
+        if self._stopped.wait(self.settle) or fileSignature(self.path) != signature:
+            # still being written, look again next time
+            return False
+        self.signature = signature
+        try:
+            digest = fileHash(self.path)
+        except OSError as error:
+            logger.warning(f"Could not read {self.path}: {error}")
+            return False
+        if digest == self.digest:
+            return False
+        self.digest = digest
+        logger.info(f"{self.path} changed")
+        try:
+            self.onChange(self.path)
+        except Exception:
+            # keep watching
+            logger.exception(f"Reloading {self.path} failed")
+        return True
+
+    def stop(self):
+        self._stopped.set()
+        if self.observer is not None:
+            self.observer.stop()
+
+
+def watchSchedule(scheduler, path, cache=None, **kwargs):
+    """Reloads the schedule of a daemon.AsyncScheduler whenever the
+    workbook at path changes. The workbook is parsed on the watcher
+    thread, only the merge runs on the scheduler.
+    Returns the started ScheduleWatcher."""
+
+    def reload(path):
+        schedule, credentials, report = core.readSchedule(path, cache)
+        scheduler.submit(core.reloadSchedule, schedule, credentials, report)
+
+    return ScheduleWatcher(path, reload, **kwargs).start()
@@ -0,0 +1,309 @@
+"""Simulation of the scheduler on a virtual clock.
+
+Replays days of schedule through the core steps, in the order the
+daemon runs them, against a simulated docker engine (testlib.simEngine)
+and reports how fast and how precise scheduling was. Needs neither
+docker nor a display:
+``python simulate.py --days 7 --channels 4``"""
+import sys
+import types
+import random
+import argparse
+import datetime
+import contextlib
+import collections
+import tracemalloc
+import time
+import logging
+import core
+import monitor
+import supervisor
+import recovery
+import testlib
+from daemon import POLL_INTERVAL, MAX_WAIT
+from eventqueue import EventQueue
+from supervisor import StreamSupervisor
+
+
+# define global variables
+
+START = datetime.datetime(2030, 1, 1)
+MIN_STEP = 0.001  # seconds the clock moves when a step asks to run again at once
+PHASES = ("dispatch", "prewarm", "retry", "poll", "prune")
+PERCENTILES = (50, 90, 99, 100)
+
+def makeSchedule(days, channels, spacing=7200, files=20, seed=0, start=START):
+    """Returns an EventQueue with a stream every spacing seconds on
+    every channel and {video name: seconds} of the files it plays.
+    Streams are shorter than spacing, so channels are never busy."""
+    rng = random.Random(seed)
+    durations = {
+        f"video{i}.mp4": rng.uniform(0.25, 0.9) * spacing for i in range(files)
+    }
+    names = list(durations)
+    queue = EventQueue()
+    for channel in range(channels):
+        # stagger the channels
+        moment = start + datetime.timedelta(seconds=rng.uniform(60, spacing))
+        while moment < start + datetime.timedelta(days=days):
+            queue.push(moment, f"/videos/{rng.choice(names)}", f"channel{channel}")
+            moment += datetime.timedelta(seconds=spacing)
+    return queue, durations
+
+
+@contextlib.contextmanager
+def virtualTime(clock, modules=(monitor, supervisor, recovery)):
+    """Makes time.time() of modules return the virtual time"""
+    originals = [module.time for module in modules]
+    for module in modules:
+        module.time = types.SimpleNamespace(time=clock.time)
+    try:
+        yield clock
+    finally:
+        for module, original in zip(modules, originals):
+            module.time = original
+
+
+def memoryGrowthOf(before, after):
+    """Bytes allocated between two snapshots and still alive,
+    without the measurements of the simulation itself"""
+    harness = [
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, tracemalloc.__file__),
+    ]
+    after = after.filter_traces(harness)
+    before = before.filter_traces(harness)
+    return sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+
+def percentiles(values, points=PERCENTILES):
+    """Returns {point: value} of sorted values, nearest rank"""
+    if not values:
+        return {point: None for point in points}
+    ordered = sorted(values)
+    last = len(ordered) - 1
+    return {
+        point: ordered[min(max(-(-point * len(ordered) // 100) - 1, 0), last)]
+        for point in points
+    }
+
+
+Report = collections.namedtuple(
+    "Report",
+    [
+        "events",
+        "ticks",
+        "wallTime",
+        "tickLatency",  # {percentile: seconds}
+        "phaseCPU",  # {phase: seconds}
+        "memoryGrowth",  # bytes
+        "memoryPeak",  # bytes
+        "dispatchError",  # {percentile: seconds late of the start}
+        "firstFrame",  # {percentile: seconds from schedule to first frame}
+        "notices",  # {kind: count}
+        "busyWakeups",  # times a step asked to run again at once
+    ],
+)
+
+
+class Simulation:
+    """Runs the core steps of a state on a virtual clock.
+    The scheduling steps run when the next stream is due or has
+    to be prepared, the monitoring steps every pollInterval, like
+    the tasks of daemon.AsyncScheduler do."""
+
+    def __init__(
+        self,
+        queue,
+        durations,
+        maxStreams=4,
+        pollInterval=POLL_INTERVAL,
+        profile=None,
+        start=START,
+        trackMemory=True,
+    ):
+        self.clock = testlib.VirtualClock(start)
+        profile = testlib.simProfile(durations) if profile is None else profile
+        self.engine = testlib.simEngine(self.clock, profile)
+        self.state = core.SchedulerState(StreamSupervisor(maxStreams))
+        self.state.queue = queue
+        self.state.credentials = {
+            "rtmp-URL": "rtmp://simulated",
+            "User": "user",
+            "Password": "password",
+            "playpath": "stream",
+        }
+        self.pollInterval = datetime.timedelta(seconds=pollInterval)
+        self.trackMemory = trackMemory
+        self.events = len(queue)
+        self.cpu = dict.fromkeys(PHASES, 0.0)
+        self.tickLatencies = []
+        self.dispatchErrors = []
+        self.notices = collections.Counter()
+        self.busyWakeups = 0
+        self.woken = False
+
+    def step(self, phase, function, *args):
+        started = time.process_time()
+        notices = function(self.state, *args)
+        self.cpu[phase] += time.process_time() - started
+        for notice in notices:
+            self.notices[notice.kind] += 1
+            if notice.kind == "interrupted":
+                self.woken = True
+            if notice.kind == "started":
+                late = self.clock.now() - notice.data.time
+                self.dispatchErrors.append(late.total_seconds())
+
+    def pump(self):
+        """Hands the output written since the last poll to the followers,
+        which the docker log stream would do in the background"""
+        for slot in self.state.supervisor.slots.values():
+            if slot.follower is not None:
+                slot.follower.feed(slot.container.pump())
+
+    def schedule(self, now):
+        self.step("dispatch", core.dispatchDue, now, self.engine.dispatch)
+        self.step("prewarm", core.prewarmDue, now, self.engine.prepare)
+        self.step("retry", core.retryDue, now, self.engine.dispatch)
+        delay = core.nextDelay(self.state, now)
+        if delay is None:
+            delay = MAX_WAIT
+        elif delay <= 0:
+            self.busyWakeups += 1
+        delay = min(max(delay, MIN_STEP), MAX_WAIT)
+        return now + datetime.timedelta(seconds=delay)
+
+    def monitor(self, now):
+        self.pump()
+        self.step("poll", core.pollStreams, self.engine)
+        self.step("prune", core.prunePast, now)
+        return now + self.pollInterval
+
+    def run(self, until=None):
+        """Simulates until the virtual time until or, if None,
+        until the queue is empty and every stream ended"""
+        if self.trackMemory:
+            tracemalloc.start()
+            before = tracemalloc.take_snapshot()
+        nextSchedule = nextPoll = self.clock.now()
+        wallStarted = time.perf_counter()
+        with virtualTime(self.clock):
+            while True:
+                now = min(nextSchedule, nextPoll)
+                if until is not None and now > until:
+                    break
+                if until is None and not self.state.queue and not self.active():
+                    break
+                self.clock.set(now)
+                started = time.perf_counter()
+                if now >= nextSchedule:
+                    nextSchedule = self.schedule(now)
+                if now >= nextPoll:
+                    nextPoll = self.monitor(now)
+                if self.woken:
+                    # like the monitor wakes the scheduler of the daemon
+                    self.woken = False
+                    nextSchedule = now
+                self.tickLatencies.append(time.perf_counter() - started)
+            core.stopStreams(self.state)
+        wallTime = time.perf_counter() - wallStarted
+        memoryGrowth = memoryPeak = 0
+        if self.trackMemory:
+            memoryPeak = tracemalloc.get_traced_memory()[1]
+            memoryGrowth = memoryGrowthOf(before, tracemalloc.take_snapshot())
+            tracemalloc.stop()
+        return Report(
+            self.events,
+            len(self.tickLatencies),
+            wallTime,
+            percentiles(self.tickLatencies),
+            dict(self.cpu),
+            memoryGrowth,
+            memoryPeak,
+            percentiles(self.dispatchErrors),
+            percentiles([latency for _, latency in self.state.supervisor.latencies]),
+            dict(self.notices),
+            self.busyWakeups,
+        )
+
+    def active(self):
+        supervisor = self.state.supervisor
+        return (
+            supervisor.isActive()
+            or bool(supervisor.warm)
+            or bool(supervisor.recovery.pending)
+        )
+
+
+def formatPercentiles(values, scale=1.0, unit="s"):
+    return "  ".join(
+        f"p{point} -" if value is None else f"p{point} {value * scale:.3f}{unit}"
+        for point, value in values.items()
+    )
+
+
+def formatReport(report):
+    lines = [
+        f"events                  {report.events}",
+        f"ticks                   {report.ticks} in {report.wallTime:.2f} s",
+        f"tick latency            {formatPercentiles(report.tickLatency, 1e6, 'us')}",
+    ]
+    for phase, seconds in report.phaseCPU.items():
+        lines.append(f"cpu {phase:<20}{seconds * 1e3:.1f} ms")
+    lines += [
+        f"memory growth           {report.memoryGrowth / 1024:.1f} KiB"
+        f" (peak {report.memoryPeak / 1024:.1f} KiB)",
+        f"dispatch error          {formatPercentiles(report.dispatchError)}",
+        f"first frame             {formatPercentiles(report.firstFrame)}",
+        f"busy wakeups            {report.busyWakeups}",
+        "notices                 "
+        + ", ".join(f"{kind} {n}" for kind, n in sorted(report.notices.items())),
+    ]
+    return "\n".join(lines)
+
+
+def parseArgs(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=float, default=1, help="days of schedule")
+    parser.add_argument("--channels", type=int, default=4)
+    parser.add_argument(
+        "--spacing", type=float, default=7200, help="seconds between streams"
+    )
+    parser.add_argument("--max-streams", type=int, default=None)
+    parser.add_argument("--poll", type=float, default=POLL_INTERVAL)
+    parser.add_argument(
+        "--failure", type=float, default=0.02, help="share of failing streams"
+    )
+    parser.add_argument("--slow-start", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--no-memory", action="store_true", help="do not trace allocations"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parseArgs(sys.argv[1:] if argv is None else argv)
+    # failing streams are expected
+    logging.disable(logging.ERROR)
+    queue, durations = makeSchedule(
+        args.days, args.channels, args.spacing, seed=args.seed
+    )
+    profile = testlib.simProfile(
+        durations, slowStart=args.slow_start, failure=args.failure, seed=args.seed
+    )
+    simulation = Simulation(
+        queue,
+        durations,
+        maxStreams=args.max_streams or args.channels,
+        pollInterval=args.poll,
+        profile=profile,
+        trackMemory=not args.no_memory,
+    )
+    print(formatReport(simulation.run()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""Bookkeeping of concurrently running streams"""
+import os
+import time
+import datetime
+import logging
+from eventqueue import DEFAULT_CHANNEL
+from recovery import StreamRecovery
+
+
+# define global variables
+
+CORES_PER_STREAM = 2  # cores one live x264 encode needs
+PREWARM_LEAD = datetime.timedelta(seconds=30)  # containers are created this early
+
+logger = logging.getLogger("supervisor")
+
+
+def defaultCap():
+    """Number of concurrent streams the host can encode"""
+    return max(1, (os.cpu_count() or 1) // CORES_PER_STREAM)
+
+
+class StreamSlot:
+    """State of the stream running on one channel"""
+
+    def __init__(self, channel, container, event=None):
+        self.channel = channel
+        self.container = container
+        self.event = event
+        self.follower = None
+        self.startedAt = time.time()
+        self.firstFrameLatency = None
+        self.health = None  # why the stream is unhealthy
+        self.session = None  # PlayoutSession of back to back streams
+        self.volumes = {}
+        self.adopted = False  # taken over from an earlier run
+        self.offset = 0.0  # seconds of the input skipped by a restart
+        self.retry = None  # recovery.Retry that restarted the stream
+
+    def close(self):
+        """Stops following the stream and removes its playlist"""
+        if self.follower is not None:
+            self.follower.stop()
+            self.follower = None
+        if self.session is not None:
+            self.session.cleanup()
+
+
+class StreamSupervisor:
+    """Tracks the running stream of every channel and
+    enforces the concurrency cap. Containers of streams that start
+    within prewarmLead are created ahead of time and kept in warm
+    slots until their start. Streams that failed are restarted
+    through recovery."""
+
+    def __init__(self, maxStreams=None, prewarmLead=PREWARM_LEAD, recovery=None):
+        self.maxStreams = defaultCap() if maxStreams is None else maxStreams
+        self.prewarmLead = prewarmLead
+        self.recovery = StreamRecovery() if recovery is None else recovery
+        self.slots = {}
+        self.warm = {}
+        self.prepared = set()  # seq of every event a prewarm was tried for
+        self.latencies = []  # (event, seconds from schedule to first frame)
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __contains__(self, channel):
+        return channel in self.slots
+
+    def items(self):
+        return list(self.slots.items())
+
+    def get(self, channel=DEFAULT_CHANNEL):
+        return self.slots.get(channel)
+
+    def container(self, channel=DEFAULT_CHANNEL):
+        """Returns the container running on channel or None"""
+        slot = self.slots.get(channel)
+        return None if slot is None else slot.container
+
+    def isActive(self, channel=None):
+        """Whether channel or, if None, any channel is streaming"""
+        if channel is None:
+            return len(self.slots) > 0
+        return channel in self.slots
+
+    def canStart(self, channel):
+        return channel not in self.slots and len(self.slots) < self.maxStreams
+
+    def attach(self, channel, container, event=None):
+        if channel in self.slots:
+            raise ValueError(f"Channel {channel} is already streaming")
+        slot = StreamSlot(channel, container, event)
+        self.slots[channel] = slot
+        logger.debug(f"Stream attached on {channel}: {container}")
+        return slot
+
+    def release(self, channel):
+        """Forgets the stream of channel and stops following it.
+        Returns its slot or None."""
+        slot = self.slots.pop(channel, None)
+        if slot is not None:
+            slot.close()
+        return slot
+
+    def releaseAll(self):
+        return [self.release(channel) for channel in list(self.slots)]
+
+    # prewarmed streams
+
+    def canPrepare(self, channel):
+        return (
+            channel not in self.warm
+            and len(self.warm) + len(self.slots) < self.maxStreams
+        )
+
+    def prepare(self, channel, container, event):
+        slot = StreamSlot(channel, container, event)
+        self.warm[channel] = slot
+        logger.debug(f"Stream prepared on {channel}: {container}")
+        return slot
+
+    def launch(self, event):
+        """Moves the container prepared for event to the running slots.
+        Returns its slot or None if there is none."""
+        slot = self.warm.get(event.channel)
+        if slot is None or slot.event != event or event.channel in self.slots:
+            return None
+        del self.warm[event.channel]
+        self.prepared.discard(event.seq)
+        slot.startedAt = time.time()
+        self.slots[event.channel] = slot
+        return slot
+
+    def discard(self, event):
+        """Forgets event and its prepared container.
+        Returns the warm slot or None."""
+        self.prepared.discard(event.seq)
+        slot = self.warm.get(event.channel)
+        if slot is not None and slot.event == event:
+            self.warm.pop(event.channel).close()
+            return slot
+        return None
+
+    def recordLatency(self, slot, latency):
+        slot.firstFrameLatency = latency
+        self.latencies.append((slot.event, latency))
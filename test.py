@@ -1,17 +1,48 @@
 import unittest
 import lib
+import core
+import daemon
 import pandas as pd
 from pandas.testing import assert_frame_equal
 from lib import checkStream
 import testlib
 from pathlib import Path
 from functools import partial
+from engine import DockerEngine, setEngine
+import monitor
+from eventqueue import EventQueue, DEFAULT_CHANNEL
+from supervisor import StreamSupervisor
+from recovery import StreamRecovery, RETRY_DELAY
+import datetime
+import validation
+import schedulecache
+import transcode
+import mediaindex
+import playout
+import simulate
+import scheduleview
+import schedulewatch
+import journal
+import dockerevents
+import hostpool
+import docker
+import tempfile
+import sqlite3
+import os
+import queue
+import threading
+import concurrent.futures
+import subprocess
+import sys
 import logging
+import time
 
 # TestCases
 
 # Switch off logging
 logging.getLogger("lib").disabled = True
+logging.getLogger("core").disabled = True
+logging.getLogger("daemon").disabled = True
 
 
 class TestCheckStream(unittest.TestCase):
@@ -25,20 +56,21 @@ class TestCheckStream(unittest.TestCase):
         lib.createStatusWidget(mockframe)
         lib.checkStream(mockframe)
         self.assertEqual(mockframe.status.get(), "yellow")
-        self.assertEqual(mockframe.streamActive, False)
+        self.assertFalse(mockframe.supervisor.isActive())
 
     def test_checkStream_containerRunningEarly(self):
         """Tests whether the reaction to a running container that
         has no valid bitrate output is correct."""
         # test whether nothing happens if container is none
         mockframe = testlib.mockFrame()
-        mockframe.container = testlib.mockContainer(status="running", log=b"asdf")
+        container = testlib.mockContainer(status="running", log=b"asdf")
+        mockframe.supervisor.attach(DEFAULT_CHANNEL, container)
         # monkey patch onupdate
         lib.onUpdate = lambda x: 1
         lib.createStatusWidget(mockframe)
         lib.checkStream(mockframe)
         self.assertEqual(mockframe.status.get(), "green")
-        self.assertEqual(mockframe.streamActive, False)
+        self.assertTrue(mockframe.supervisor.isActive())
         self.assertEqual(mockframe.lbl_StreamSpeed["text"], "-/-")
 
     def test_checkStream_containerRunningLate(self):
@@ -46,86 +78,84 @@ class TestCheckStream(unittest.TestCase):
         has no valid bitrate output is correct."""
         # test whether nothing happens if container is none
         mockframe = testlib.mockFrame()
-        mockframe.container = testlib.mockContainer(
+        container = testlib.mockContainer(
             status="running",
             log=b"\rframe 918.3kbits/s 38.8image 25 fps \frame 920.3kbits/s"
             b"\rframe 918.3kbits/s 38.8image 25 fps \frame 920.3kbits/s"
             b"\rframe 918.3kbits/s 38.8image 25 fps \frame 920.3kbits/s"
             b"\rframe 918.3kbits/s 38.8image 25 fps \frame 920.3kbits/s",
         )
+        mockframe.supervisor.attach(DEFAULT_CHANNEL, container)
         # monkey patch onupdate
         lib.onUpdate = lambda x: 1
         lib.createStatusWidget(mockframe)
         lib.checkStream(mockframe)
         self.assertEqual(mockframe.status.get(), "green")
-        self.assertEqual(mockframe.streamActive, False)
+        self.assertTrue(mockframe.supervisor.isActive())
         self.assertEqual(mockframe.lbl_StreamSpeed["text"], "920.3kbits/s")
 
     def test_checkStream_containerCreated_inList(self):
         """Tests whether the reaction to a created container that
         is then the client.containers.list is correct"""
         mockframe = testlib.mockFrame()
-        mockframe.container = testlib.mockContainer(status="created", log=b"asdf")
+        container = testlib.mockContainer(status="created", log=b"asdf")
+        mockframe.supervisor.attach(DEFAULT_CHANNEL, container)
         # monkey patch onupdate
         oldOnUpdate = lib.onUpdate
         lib.onUpdate = lambda x: 1
-        # monkeypatch client
-        oldClient = lib.docker.from_env
-        lib.docker.from_env = lambda: testlib.mockEngine(
-            testlib.mockImages(), containers=[mockframe.container]
+        # mock client
+        engine = testlib.mockEngine(
+            testlib.mockImages(), containers=[container]
         )
         lib.createStatusWidget(mockframe)
-        lib.checkStream(mockframe)
+        lib.checkStream(mockframe, engine=engine)
         self.assertEqual(mockframe.status.get(), "green")
-        self.assertEqual(mockframe.streamActive, False)
+        self.assertTrue(mockframe.supervisor.isActive())
         self.assertEqual(mockframe.lbl_StreamSpeed["text"], "-/-")
         # undo monkeypatch
         lib.onUpdate = oldOnUpdate
-        lib.docker.from_env = oldClient
 
     def test_checkStream_containerCreated_finished(self):
         """Check whether reaction to a container that has been created and
         finished succesfully is correct."""
         mockframe = testlib.mockFrame()
-        mockframe.container = testlib.mockContainer(status="created", log=b"asdf")
+        container = testlib.mockContainer(status="created", log=b"asdf")
+        mockframe.supervisor.attach(DEFAULT_CHANNEL, container)
         # monkey patch onupdate
         oldOnUpdate = lib.onUpdate
         lib.onUpdate = lambda x: 1
-        # monkeypatch client
-        oldClient = lib.docker.from_env
-        lib.docker.from_env = lambda: testlib.mockEngine(testlib.mockImages())
+        # mock client
+        engine = testlib.mockEngine(testlib.mockImages())
         lib.createStatusWidget(mockframe)
-        lib.checkStream(mockframe)
+        lib.checkStream(mockframe, engine=engine)
         self.assertEqual(mockframe.status.get(), "yellow")
-        self.assertEqual(mockframe.streamActive, False)
+        self.assertFalse(mockframe.supervisor.isActive())
         self.assertEqual(mockframe.lbl_StreamSpeed["text"], "Inactive")
-        self.assertEqual(mockframe.container, None)
+        self.assertIsNone(mockframe.supervisor.container())
         # undo monkeypatch
         lib.onUpdate = oldOnUpdate
-        lib.docker.from_env = oldClient
 
     def test_checkStream_containerCreated_crashed(self):
         """Check whether reaction to a container that has been created and
         finished succesfully is correct."""
         mockframe = testlib.mockFrame()
-        mockframe.container = testlib.mockContainer(status="created", log=b"error")
+        container = testlib.mockContainer(status="created", log=b"error")
+        mockframe.supervisor.attach(DEFAULT_CHANNEL, container)
         # monkey patch onupdate
         oldOnUpdate = lib.onUpdate
         lib.onUpdate = lambda x: 1
-        # monkeypatch client
-        oldClient = lib.docker.from_env
-        lib.docker.from_env = lambda: testlib.mockEngine(testlib.mockImages())
+        # mock client
+        engine = testlib.mockEngine(testlib.mockImages())
         lib.showerror = testlib.raiseAssertion
         lib.createStatusWidget(mockframe)
-        badcall = partial(checkStream, mockframe)
+        badcall = partial(checkStream, mockframe, engine=engine)
         self.assertRaises(AssertionError, badcall)
         self.assertEqual(mockframe.status.get(), "yellow")
-        self.assertEqual(mockframe.streamActive, False)
+        self.assertFalse(mockframe.supervisor.isActive())
         self.assertEqual(mockframe.lbl_StreamSpeed["text"], "Inactive")
-        self.assertEqual(mockframe.container, None)
+        self.assertIsNone(mockframe.supervisor.container())
         # undo monkeypatch
         lib.onUpdate = oldOnUpdate
-        lib.docker.from_env = oldClient
 
 
 class TestCheckRightTime(unittest.TestCase):
@@ -137,8 +167,8 @@ class TestCheckRightTime(unittest.TestCase):
         oldDispatch = lib.dispatch_stream
         lib.dispatch_stream = testlib.raiseAssertion
         lib.checkRightTime(mockframe)  # should not raise AssertionError
-        self.assertEqual(mockframe.container, None)
-        self.assertEqual(mockframe.streamActive, False)
+        self.assertIsNone(mockframe.supervisor.container())
+        self.assertFalse(mockframe.supervisor.isActive())
         # undo monkeypatch
         lib.dispatch_stream = oldDispatch
 
@@ -147,26 +177,29 @@ class TestCheckRightTime(unittest.TestCase):
         # add current time
         mockframe.nowDT = pd.Timestamp("2010-06-21 12:00:00")
         # add schedule
-        mockframe.schedule = pd.DataFrame(
-            {
-                "File": [
-                    "C:\\Users\\michael.mitter\\Documents\\streamscheduler\\test_files\\vids\\test.mp4",
-                    "C:\\Users\\michael.mitter\\Documents\\streamscheduler\\test_files\\vids\\test2.mp4",
-                    "C:\\Users\\michael.mitter\\Documents\\streamscheduler\\test_files\\vids\\test4.mp4",
-                ],
-                "Date/Time": [
-                    pd.Timestamp("2025-06-21 12:00:00"),
-                    pd.Timestamp("2025-06-22 13:00:00"),
-                    pd.Timestamp("2025-07-23 14:00:00"),
-                ],
-            }
+        mockframe.queue = EventQueue.fromSchedule(
+            pd.DataFrame(
+                {
+                    "File": [
+                        "C:\\Users\\michael.mitter\\Documents\\streamscheduler\\test_files\\vids\\test.mp4",
+                        "C:\\Users\\michael.mitter\\Documents\\streamscheduler\\test_files\\vids\\test2.mp4",
+                        "C:\\Users\\michael.mitter\\Documents\\streamscheduler\\test_files\\vids\\test4.mp4",
+                    ],
+                    "Date/Time": [
+                        pd.Timestamp("2025-06-21 12:00:00"),
+                        pd.Timestamp("2025-06-22 13:00:00"),
+                        pd.Timestamp("2025-07-23 14:00:00"),
+                    ],
+                }
+            )
         )
         # monkeypatch dispatch stream
         oldDispatch = lib.dispatch_stream
         lib.dispatch_stream = testlib.raiseAssertion
         lib.checkRightTime(mockframe)  # should not raise AssertionError
-        self.assertEqual(mockframe.container, None)
-        self.assertEqual(mockframe.streamActive, False)
+        self.assertIsNone(mockframe.supervisor.container())
+        self.assertFalse(mockframe.supervisor.isActive())
+        self.assertEqual(len(mockframe.queue), 3)
         # undo monkeypatch
         lib.dispatch_stream = oldDispatch
 
@@ -175,47 +208,56 @@ class TestCheckRightTime(unittest.TestCase):
         # add current time
         mockframe.nowDT = pd.Timestamp("2010-06-21 12:00:00")
         # add schedule
-        mockframe.schedule = pd.DataFrame(
-            {
-                "File": [
-                    "C:\\Users\\michael.mitter\\Documents\\streamscheduler\\test_files\\vids\\test.mp4",
-                    "C:\\Users\\michael.mitter\\Documents\\streamscheduler\\test_files\\vids\\test2.mp4",
-                    "C:\\Users\\michael.mitter\\Documents\\streamscheduler\\test_files\\vids\\test4.mp4",
-                ],
-                "Date/Time": [
-                    pd.Timestamp("2009-06-21 12:00:00"),
-                    pd.Timestamp("2009-06-22 13:00:00"),
-                    pd.Timestamp("2009-07-23 14:00:00"),
-                ],
-            }
+        mockframe.queue = EventQueue.fromSchedule(
+            pd.DataFrame(
+                {
+                    "File": [
+                        "C:\\Users\\michael.mitter\\Documents\\streamscheduler\\test_files\\vids\\test.mp4",
+                        "C:\\Users\\michael.mitter\\Documents\\streamscheduler\\test_files\\vids\\test2.mp4",
+                        "C:\\Users\\michael.mitter\\Documents\\streamscheduler\\test_files\\vids\\test4.mp4",
+                    ],
+                    "Date/Time": [
+                        pd.Timestamp("2009-06-21 12:00:00"),
+                        pd.Timestamp("2009-06-22 13:00:00"),
+                        pd.Timestamp("2009-07-23 14:00:00"),
+                    ],
+                }
+            )
         )
         # monkeypatch dispatch stream
         oldDispatch = lib.dispatch_stream
         lib.dispatch_stream = testlib.raiseAssertion
+        oldDrawConfig = lib.draw_config
+        lib.draw_config = lambda x, y: None
         lib.checkRightTime(mockframe)  # should not raise AssertionError
-        self.assertEqual(mockframe.container, None)
-        self.assertEqual(mockframe.streamActive, False)
+        self.assertIsNone(mockframe.supervisor.container())
+        self.assertFalse(mockframe.supervisor.isActive())
+        # missed streams are pruned
+        self.assertEqual(len(mockframe.queue), 0)
         # undo monkeypatch
         lib.dispatch_stream = oldDispatch
+        lib.draw_config = oldDrawConfig
 
     def test_checkRightTime_RightTime(self):
         mockframe = testlib.mockFrame()
         # add current time
         mockframe.nowDT = pd.Timestamp("2010-06-21 12:00:00")
         # add schedule
-        mockframe.schedule = pd.DataFrame(
-            {
-                "File": [
-                    "C:\\Users\\michael.mitter\\Documents\\streamscheduler\\test_files\\vids\\test.mp4",
-                    "C:\\Users\\michael.mitter\\Documents\\streamscheduler\\test_files\\vids\\test2.mp4",
-                    "C:\\Users\\michael.mitter\\Documents\\streamscheduler\\test_files\\vids\\test4.mp4",
-                ],
-                "Date/Time": [
-                    pd.Timestamp("2010-06-21 12:00:01"),
-                    pd.Timestamp("2009-06-22 13:00:00"),
-                    pd.Timestamp("2009-07-23 14:00:00"),
-                ],
-            }
+        mockframe.queue = EventQueue.fromSchedule(
+            pd.DataFrame(
+                {
+                    "File": [
+                        "C:\\Users\\michael.mitter\\Documents\\streamscheduler\\test_files\\vids\\test.mp4",
+                        "C:\\Users\\michael.mitter\\Documents\\streamscheduler\\test_files\\vids\\test2.mp4",
+                        "C:\\Users\\michael.mitter\\Documents\\streamscheduler\\test_files\\vids\\test4.mp4",
+                    ],
+                    "Date/Time": [
+                        pd.Timestamp("2010-06-21 12:00:00"),
+                        pd.Timestamp("2010-06-22 13:00:00"),
+                        pd.Timestamp("2010-07-23 14:00:00"),
+                    ],
+                }
+            )
         )
         # monkeypatch dispatch stream
         oldDispatch = lib.dispatch_stream
@@ -223,7 +265,7 @@ class TestCheckRightTime(unittest.TestCase):
         goodCall = partial(lib.checkRightTime, mockframe)
         self.assertRaises(AssertionError, goodCall)
         # second monkeypatch to check whether events afterwards happen correctly
-        lib.dispatch_stream = lambda x, y, z: None
+        lib.dispatch_stream = lambda x, y, z, labels=None: None
         mockframe.after = (
             testlib.raiseAssertion
         )  # this is called by the error dispatching functions
@@ -233,17 +275,84 @@ class TestCheckRightTime(unittest.TestCase):
         self.assertRaises(AssertionError, goodCall)
         # call it again to see whether the effects are correct
         mockframe.after = (
-            lambda x, y, z, a: None
-        )  # this is called by the error dispatching functions
+            lambda *args: None
+        )  # this is called by the error dispatching functions and the timer
         lib.checkRightTime(
             mockframe
         )  # before the call only goes through to frame.after because assertion is raised there
-        self.assertEqual(len(mockframe.schedule), 2)
-        self.assertEqual(mockframe.streamActive, False)
+        self.assertEqual(len(mockframe.queue), 2)
+        self.assertFalse(mockframe.supervisor.isActive())
+        # stream one second before its time is not started
+        mockframe.nowDT = pd.Timestamp("2010-06-22 12:59:59")
+        lib.dispatch_stream = testlib.raiseAssertion
+        lib.checkRightTime(mockframe)
+        self.assertEqual(len(mockframe.queue), 2)
         # undo monkeypatch
         lib.dispatch_stream = oldDispatch
         lib.draw_config = oldDrawConfig
 
+    def test_nextDelay(self):
+        state = core.SchedulerState(
+            StreamSupervisor(prewarmLead=datetime.timedelta(0))
+        )
+        self.assertIsNone(core.nextDelay(state, datetime.datetime.now()))
+        now = datetime.datetime(2030, 1, 1)
+        state.queue = EventQueue()
+        state.queue.push(now + datetime.timedelta(seconds=60), "test.mp4")
+        # delay until the exact start
+        self.assertEqual(core.nextDelay(state, now), 60)
+
+    def test_prewarm(self):
+        state = core.SchedulerState(StreamSupervisor(2))
+        state.credentials = {}
+        now = datetime.datetime(2030, 1, 1)
+        state.queue = EventQueue()
+        state.queue.push(now + datetime.timedelta(seconds=60), "test.mp4")
+        # wake up to prepare the container first
+        self.assertEqual(core.nextDelay(state, now), 30)
+        prepared = testlib.mockContainer(b"", status="created")
+        now = now + datetime.timedelta(seconds=30)
+        core.prewarmDue(state, now, lambda video, credentials, pathmap, labels=None: prepared)
+        self.assertIs(state.supervisor.warm[DEFAULT_CHANNEL].container, prepared)
+        self.assertEqual(core.nextDelay(state, now), 30)
+        # at the start the prepared container is only started
+        now = now + datetime.timedelta(seconds=30)
+        notices = core.dispatchDue(state, now, testlib.raiseAssertion)
+        self.assertEqual(notices[0].kind, "started")
+        self.assertEqual(prepared.status, "running")
+        self.assertIs(state.supervisor.container(), prepared)
+        self.assertEqual(state.supervisor.warm, {})
+
+    def test_prewarmDropped(self):
+        state = core.SchedulerState(StreamSupervisor(2))
+        state.credentials = {}
+        now = datetime.datetime(2030, 1, 1)
+        state.queue = EventQueue()
+        state.queue.push(now + datetime.timedelta(seconds=10), "test.mp4")
+        prepared = testlib.mockContainer(b"", status="created")
+        core.prewarmDue(state, now, lambda video, credentials, pathmap, labels=None: prepared)
+        # channel is still busy at the start, prepared container is removed
+        state.supervisor.attach(DEFAULT_CHANNEL, testlib.mockContainer(b""))
+        core.dispatchDue(state, now + datetime.timedelta(seconds=10))
+        self.assertEqual(prepared.status, "removed")
+        self.assertEqual(state.supervisor.warm, {})
+        self.assertEqual(state.supervisor.prepared, set())
+
+    def test_firstFrameLatency(self):
+        state = core.SchedulerState()
+        container = testlib.mockContainer(b"frame 918.3kbits/s", status="running")
+        event = EventQueue().push(
+            datetime.datetime.now() - datetime.timedelta(seconds=2), "test.mp4"
+        )
+        slot = state.supervisor.attach(DEFAULT_CHANNEL, container, event)
+        slot.follower = monitor.LogFollower(container).start()
+        notices = core.pollStreams(state, testlib.mockEngine(containers=[container]))
+        self.assertEqual([notice.kind for notice in notices], ["firstFrame", "status"])
+        self.assertAlmostEqual(slot.firstFrameLatency, 2, delta=0.5)
+        self.assertEqual(state.supervisor.latencies, [(event, slot.firstFrameLatency)])
+        # recorded only once
+        self.assertEqual(len(core.pollStreams(state)), 1)
+
 
 class TestGui(unittest.TestCase):
     def test_createTimeWidget(self):
@@ -283,7 +392,7 @@ class TestGui(unittest.TestCase):
 
     def test_checkPastStream(self):
         mockframe = testlib.mockFrame()
-        mockframe.streamActive = True
+        mockframe.supervisor.attach(DEFAULT_CHANNEL, testlib.mockContainer())
         mockframe.nowDT = pd.Timestamp("2009-07-23 14:00:00")
         # monkey patch draw config and on update
         oldDrawConfig = lib.draw_config
@@ -305,9 +414,9 @@ class TestGui(unittest.TestCase):
                 ],
             }
         )
-        mockframe.schedule = goodDf
+        mockframe.queue = EventQueue.fromSchedule(goodDf)
         lib.checkPastStream(mockframe)
-        assert_frame_equal(mockframe.schedule, goodDf)
+        self.assertEqual(len(mockframe.queue), 3)
         # one past event
         badDf = pd.DataFrame(
             {
@@ -323,9 +432,11 @@ class TestGui(unittest.TestCase):
                 ],
             }
         )
-        mockframe.schedule = badDf
+        mockframe.queue = EventQueue.fromSchedule(badDf)
         lib.checkPastStream(mockframe)
-        assert_frame_equal(mockframe.schedule, badDf.iloc[1:, :])
+        self.assertEqual(
+            [event.file for event in mockframe.queue], list(badDf["File"].iloc[1:])
+        )
         # restore old draw config
         lib.draw_config = oldDrawConfig
         lib.onUpdate = oldOnUpdate
@@ -333,10 +444,50 @@ class TestGui(unittest.TestCase):
     def test_drawconfigGrid(self):
         mockframe = testlib.mockFrame()
         lib.drawConfigGrid(mockframe)
-        self.assertEqual(list(mockframe.grid["Names"].keys()), ["File", "Date/Time"])
-        self.assertEqual(len(mockframe.grid["grid"]), 10)
-        for i in range(10):
-            self.assertEqual(len(mockframe.grid["grid"][i]), 2)
+        view = mockframe.scheduleView
+        self.assertEqual(
+            list(view.headers), ["File", "Date/Time", "Channel", "Duration", "Status"]
+        )
+        self.assertEqual(len(view.cells), scheduleview.VISIBLE_ROWS)
+        for row in view.cells:
+            self.assertEqual(len(row), 5)
+
+    def test_scheduleView(self):
+        view = scheduleview.ScheduleView()
+        queue = EventQueue()
+        start = datetime.datetime(2030, 1, 1)
+        for hour in range(100):
+            queue.push(start + datetime.timedelta(hours=hour), f"/vids/{hour}.mp4")
+        rows = [core.ScheduleRow(event, "queued", 1800.0) for event in queue]
+        view.setRows(rows)
+        cells = lambda: [[cell.get() for cell in row] for row in view.cells]
+        self.assertEqual(
+            cells()[0],
+            ["0.mp4", "2030-01-01 00:00:00", DEFAULT_CHANNEL, "0:30:00", "queued"],
+        )
+        # every event can be scrolled to, widgets exist only for visible rows
+        view.yview("moveto", "1.0")
+        self.assertEqual(cells()[-1][0], "99.mp4")
+        self.assertEqual(view.fractions(), (0.9, 1.0))
+        view.yview("scroll", "-1", "pages")
+        self.assertEqual(cells()[0][0], "80.mp4")
+        # only cells whose text changed are set
+        sets = []
+
+        def recordSet(original, text):
+            sets.append(text)
+            original(text)
+
+        for row in view.cells:
+            for cell in row:
+                cell.set = partial(recordSet, cell.set)
+        rows[81] = rows[81]._replace(status="running")
+        view.setRows(rows)
+        self.assertEqual(sets, ["running"])
+        # shorter schedules blank the remaining rows
+        view.setRows(rows[:3])
+        self.assertEqual(view.first, 0)
+        self.assertEqual(cells()[3], [scheduleview.EMPTY_CELL] * 5)
 
     def test_askExit(self):
         # make mockfraem
@@ -347,18 +498,75 @@ class TestGui(unittest.TestCase):
         # monkey patch in alwasy true
         lib.askyesno = lambda x, y: True
         # set stream to active
-        mockframe.streamActive = True
-        destroyCall = partial(lib.askExit, frame=mockframe, root=mockroot)
+        mockframe.supervisor.attach(DEFAULT_CHANNEL, testlib.mockContainer())
+        destroyCall = partial(
+            lib.askExit, frame=mockframe, root=mockroot, engine=testlib.mockEngine()
+        )
         self.assertRaises(testlib.RootDestroyedException, destroyCall)
         # set stream to inactive
         lib.askyesno = lambda x, y: False
         # set stream to active
-        mockframe.streamActive = True
+        mockframe.supervisor.attach(DEFAULT_CHANNEL, testlib.mockContainer())
         destroyCall = partial(lib.askExit, frame=mockframe, root=mockroot)
         # restore old function
         lib.askyesno = oldAskYesNo
 
 
+    def test_dockerOffThread(self):
+        # a slow docker daemon does not block the window
+        mockframe = testlib.mockFrame()
+        lib.createStatusWidget(mockframe)
+        mockframe.credentials = {
+            "rtmp-URL": "a",
+            "User": "b",
+            "Password": "c",
+            "playpath": "d",
+        }
+        engine = testlib.mockEngine()
+        engine.containers = slowContainers(0.3)
+        engine.containers.engine = engine
+        mockframe.notices = queue.Queue()
+        mockframe.scheduler = daemon.AsyncScheduler(mockframe, engine, 10)
+        mockframe.scheduler.subscribe(mockframe.notices.put)
+        mockframe.scheduler.startThread()
+        oldShowinfo = lib.showinfo
+        infos = []
+        lib.showinfo = lambda title, message: infos.append(message)
+        try:
+            for step, status in (
+                (lib.startTestContainer, "Waiting"),
+                (partial(lib.stopAllContainers, imageName="asdf"), "Inactive"),
+            ):
+                started = time.perf_counter()
+                future = step(mockframe, engine=engine)
+                self.assertLess(time.perf_counter() - started, 0.1)
+                future.result(timeout=5)
+                lib.drainNotices(mockframe)
+                self.assertEqual(mockframe.streamSpeed.get(), status)
+            self.assertEqual(infos, ["All containers stopped!"])
+            self.assertFalse(mockframe.supervisor.isActive())
+        finally:
+            lib.showinfo = oldShowinfo
+            mockframe.scheduler.stop()
+            mockframe.scheduler.thread.join(timeout=2)
+
+
+class slowContainers(testlib.mockContainers):
+    """Containers of a docker daemon that answers after delay seconds"""
+
+    def __init__(self, delay):
+        testlib.mockContainers.__init__(self)
+        self.delay = delay
+
+    def list(self, **kwargs):
+        time.sleep(self.delay)
+        return testlib.mockContainers.list(self, **kwargs)
+
+    def run(self, *args, **kwargs):
+        time.sleep(self.delay)
+        return testlib.mockContainers.run(self, *args, **kwargs)
+
+
 class TestParse(unittest.TestCase):
     def setUp(self) -> None:
         self.GoodContainer = testlib.mockContainer(
@@ -413,16 +621,17 @@ class TestParse(unittest.TestCase):
         lib.load_config(
             self.mockframe, filepath="./test_files/test_schedule_1_mock_good.xlsx"
         )
+        cells = self.mockframe.scheduleView.cells
         i = 0
         for i in range(len(self.mockframe.schedule)):
-            tempFile = self.mockframe.grid["grid"][i][0].get()
+            tempFile = cells[i][0].get()
             self.assertEqual(Path(self.mockframe.schedule.iloc[i, 0]).name, tempFile)
-            tempDateTime = pd.Timestamp(self.mockframe.grid["grid"][i][1].get())
+            tempDateTime = pd.Timestamp(cells[i][1].get())
             self.assertEqual(self.mockframe.schedule.iloc[i, 1], tempDateTime)
-        # Test that the other lines contain ----
-        for index in range(i + 1, 10):
-            temp = self.mockframe.grid["grid"][index][0].get()
-            self.assertEqual(temp, " ".join(["-"] * 20))
+            self.assertEqual(cells[i][4].get(), "queued")
+        # Test that the other lines are empty
+        for index in range(i + 1, len(cells)):
+            self.assertEqual(cells[index][0].get(), scheduleview.EMPTY_CELL)
 
     def test_checkConfigTiming(self):
         # bad example
@@ -470,67 +679,696 @@ class TestParse(unittest.TestCase):
         self.assertTrue(lib.parseFailure(badContainer2))
         badContainer3 = testlib.mockContainer(b"Not found...")
         self.assertTrue(lib.parseFailure(badContainer3))
+        goodContainer = testlib.mockContainer(b"frame= 10 bitrate= 918.3kbits/s")
+        self.assertFalse(lib.parseFailure(goodContainer))
 
 
 class TestDockers(unittest.TestCase):
     def makeGood(self):
         # setup things in a way that all tests of checkDocker will pass
         lib.shutil.which = lambda x: "asdf"  # this will make the call return something
-        lib.docker.from_env = lambda: testlib.mockEngine(testlib.mockImages())
-        lib.countImages = lambda x: 0
+        self.engine = testlib.mockEngine(testlib.mockImages())
+        core.countImages = lambda x, engine=None: 0
 
     def test_checkDocker(self):
         # save all functions that will be monkey patched here
         oldWhich = lib.shutil.which
-        oldClient = lib.docker.from_env
-        oldCountImages = lib.countImages
+        oldCountImages = core.countImages
         oldShowerror = lib.showerror
         # check if everything passes
         lib.showerror = testlib.raiseAssertion
         self.makeGood()
-        lib.checkDocker("ffmpeg:1.0")
+        lib.checkDocker("ffmpeg:1.0", engine=self.engine)
         # simulate docker not installed
         lib.shutil.which = lambda x: None
-        badCall = partial(lib.checkDocker, "asdf")
+        badCall = partial(lib.checkDocker, "asdf", engine=self.engine)
         self.assertRaises(AssertionError, badCall)
         # reset to good version
         self.makeGood()
         # simulate version is not ok
-        lib.docker.from_env = lambda: testlib.mockEngine(
-            testlib.mockImages(), version="Bad"
-        )
-        badCall = partial(lib.checkDocker, "asdf")
+        badEngine = testlib.mockEngine(testlib.mockImages(), version="Bad")
+        badCall = partial(lib.checkDocker, "asdf", engine=badEngine)
         self.assertRaises(AssertionError, badCall)
         # reset to good version
         self.makeGood()
         # simulate image is not installed
-        lib.docker.from_env = lambda: testlib.mockEngine(testlib.mockImages(good=False))
-        badCall = partial(lib.checkDocker, "asdf")
+        badEngine = testlib.mockEngine(testlib.mockImages(good=False))
+        badCall = partial(lib.checkDocker, "asdf", engine=badEngine)
         self.assertRaises(AssertionError, badCall)
         # simulate count of image is not right
         self.makeGood()
-        lib.countImages = lambda x: 1
-        badCall = partial(lib.checkDocker, "asdf")
+        core.countImages = lambda x, engine=None: 1
+        badCall = partial(lib.checkDocker, "asdf", engine=self.engine)
         self.assertRaises(AssertionError, badCall)
         # restore old funcitons
-        lib.countImages = oldCountImages
-        lib.docker.from_env = oldClient
+        core.countImages = oldCountImages
         lib.shutil.which = oldWhich
         lib.showerror = oldShowerror
 
     def test_countImages(self):
         rightContainer = testlib.mockContainer(name="asdf")
         # 0 images
-        oldClient = lib.docker.from_env
-        lib.docker.from_env = lambda: testlib.mockEngine(containers=[])
-        self.assertEqual(lib.countImages("asdf"), 0)
+        engine = testlib.mockEngine(containers=[])
+        self.assertEqual(lib.countImages("asdf", engine=engine), 0)
         # 2 images
-        lib.docker.from_env = lambda: testlib.mockEngine(
-            containers=[rightContainer, rightContainer]
+        engine = testlib.mockEngine(containers=[rightContainer, rightContainer])
+        self.assertEqual(lib.countImages("asdf", engine=engine), 2)
+        # images whose name contains the image name are not ours
+        engine = testlib.mockEngine(containers=[testlib.mockContainer(name="asdf2")])
+        self.assertEqual(lib.countImages("asdf", engine=engine), 0)
+
+    def test_workerContainers(self):
+        # transcodes and probes of the scheduler are not streams
+        stream = testlib.mockContainer(name="asdf")
+        transcode = testlib.mockContainer(name="asdf")
+        transcode.labels = {core.LABEL: "transcode"}
+        engine = testlib.mockEngine(containers=[transcode])
+        state = core.SchedulerState()
+        state.imageName = "asdf"
+        self.assertEqual(lib.countImages("asdf", engine=engine), 0)
+        state.supervisor.attach(DEFAULT_CHANNEL, stream)
+        engine.containers.containerList.insert(0, stream)
+        stream.engine, stream.index = engine, 0
+        notices = core.stopTestStream(state, engine)
+        self.assertFalse(notices[0].data["active"])
+        # stopping all containers leaves the transcode running
+        engine.containers.containerList.insert(0, stream)
+        core.stopImageContainers(state, engine=engine)
+        self.assertEqual(engine.containers.containerList, [transcode])
+        # and they take no encoder slot of a pool
+        self.assertFalse(hostpool.isStream({core.LABEL: "probe"}))
+        self.assertTrue(hostpool.isStream(core.streamLabels(state, role="test")))
+
+    def test_labels(self):
+        state = core.SchedulerState(StreamSupervisor(2))
+        state.credentials = {
+            "rtmp-URL": "rtmp://server",
+            "User": "user",
+            "Password": "password",
+            "playpath": "stream",
+        }
+        engine = testlib.mockEngine()
+        engine.containers = filterRecorder()
+        engine.containers.engine = engine
+        event = EventQueue().push(datetime.datetime(2030, 1, 1), "/vids/a.mp4", "b")
+        core.startStream(
+            state, event, event.time, partial(core.dispatch_stream, engine=engine)
+        )
+        container = state.supervisor.container("b")
+        self.assertEqual(container.labels[core.INSTANCE_LABEL], state.instance)
+        self.assertEqual(container.labels[core.CHANNEL_LABEL], "b")
+        labelled = core.labelEvent(container.labels)
+        self.assertEqual((labelled.time, labelled.file), (event.time, event.file))
+        state.supervisor.get("b").follower.stop()
+        # a foreign container on the host is never listed
+        engine.containers.containerList.append(testlib.mockContainer(status="running"))
+        container.status = "created"
+        core.pollStreams(state, engine)
+        self.assertEqual(engine.containers.filters, [{"id": [container.id]}])
+        self.assertIs(state.supervisor.container("b"), container)
+
+
+class filterRecorder(testlib.mockContainers):
+    """Records the filters containers are listed with"""
+
+    def __init__(self):
+        testlib.mockContainers.__init__(self)
+        self.filters = []
+
+    def list(self, all=False, filters=None):
+        self.filters.append(filters)
+        return testlib.mockContainers.list(self, all, filters)
+
+
+class TestEngine(unittest.TestCase):
+    def test_sharedClient(self):
+        # client is only built once
+        calls = []
+        factory = lambda: calls.append(1) or testlib.mockEngine()
+        engine = DockerEngine(factory=factory)
+        self.assertIs(engine.containers, engine.containers)
+        self.assertEqual(len(calls), 1)
+        # engine can be used instead of a client
+        rightContainer = testlib.mockContainer(name="asdf")
+        engine.containers.containerList.append(rightContainer)
+        self.assertEqual(lib.countImages("asdf", engine=engine), 1)
+
+    def test_reconnect(self):
+        # unhealthy client is replaced on the next health check
+        clients = [testlib.mockEngine(version="Bad"), testlib.mockEngine()]
+        engine = DockerEngine(factory=lambda: clients.pop(0), healthInterval=0)
+        firstClient = engine.client
+        time.sleep(0.01)
+        self.assertIsNot(engine.client, firstClient)
+        self.assertEqual(len(clients), 0)
+
+    def test_concurrentConnect(self):
+        # threads that use the engine first share one client
+        calls = []
+
+        def factory():
+            calls.append(1)
+            time.sleep(0.05)
+            return testlib.mockEngine()
+
+        engine = DockerEngine(factory=factory)
+        clients = queue.Queue()
+        threads = [
+            threading.Thread(target=lambda: clients.put(engine.client))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len({id(clients.get()) for _ in threads}), 1)
+
+
+class TestHostPool(unittest.TestCase):
+    def setUp(self):
+        self.credentials = {
+            "User": 12345,
+            "Password": 678910,
+            "rtmp-URL": "rtmp://i.amagood.server",
+            "playpath": "dclive_0_1@2345",
+        }
+        self.state = core.SchedulerState(StreamSupervisor(8))
+        self.state.credentials = self.credentials
+
+    def dispatch(self, pool, channel="a"):
+        event = EventQueue().push(datetime.datetime.now(), "/vids/test.mp4", channel)
+        return core.dispatch_stream(
+            "/vids/test.mp4",
+            self.credentials,
+            None,
+            engine=pool,
+            labels=core.streamLabels(self.state, event),
+        )
+
+    def streams(self, pool):
+        return [len(host.engine.containers) for host in pool.hosts]
+
+    def test_placement(self):
+        # 8 cores give 4 slots, 4 cores 2
+        pool = testlib.mockPool(8, 4)
+        self.assertEqual(len(pool.check()), 2)
+        self.assertEqual(pool.capacity(), 6)
+        placed = []
+        for _ in range(6):
+            self.dispatch(pool)
+            placed.append(self.streams(pool))
+        # always on the host with the most free slots and cores
+        self.assertEqual(
+            placed, [[1, 0], [2, 0], [3, 0], [3, 1], [4, 1], [4, 2]]
+        )
+        self.assertIsNone(self.dispatch(pool))
+        # the image has to be on every host
+        pool.hosts[0].engine.imagesInst = testlib.mockImages()
+        pool.hosts[1].engine.imagesInst = testlib.mockImages(good=False)
+        self.assertRaises(docker.errors.ImageNotFound, pool.images.get, "asdf")
+        self.assertEqual(len(pool.available()), 2)
+        # other containers and probes do not take slots
+        pool = testlib.mockPool(4)
+        host = pool.hosts[0].engine
+        host.containers.run("other")
+        host.containers.run("probe", labels={core.LABEL: "probe"})
+        self.assertEqual(pool.loads()[0].freeSlots, 2)
+        self.dispatch(pool)
+        self.assertEqual(pool.loads()[0].freeSlots, 1)
+
+    def test_localFiles(self):
+        # renditions and playlists of the scheduler are not on the hosts
+        self.state.transcoder = transcode.Transcoder(workers=1)
+        self.state.transcoder.rendition = lambda fileName: Path("/cache/a.mp4")
+        self.state.mediaIndex = testlib.mockMediaIndex(default=600.0)
+        self.state.queue = EventQueue()
+        first = self.state.queue.push(datetime.datetime(2030, 1, 1), "/vids/a.mp4")
+        self.state.queue.push(first.time + datetime.timedelta(minutes=10), "/vids/b.mp4")
+        oldEngine = core.getEngine()
+        setEngine(testlib.mockPool(4))
+        try:
+            video, pathMap, session = core.streamInput(self.state, first)
+        finally:
+            setEngine(oldEngine)
+            self.state.transcoder.close()
+        self.assertEqual((video, pathMap, session), ("/vids/a.mp4", None, None))
+
+    def test_failover(self):
+        pool = testlib.mockPool(4, 4)
+        down = pool.hosts[0]
+        down.engine.down = True
+        self.assertIsNotNone(self.dispatch(pool))
+        self.assertEqual(self.streams(pool), [0, 1])
+        self.assertIsNotNone(down.downUntil)
+        self.assertEqual(pool.available(), [pool.hosts[1]])
+        self.assertEqual(len(pool.containers.list()), 1)
+        # pinged again once the down time is over
+        down.engine.down = False
+        down.downUntil = time.monotonic()
+        self.assertEqual(len(pool.available()), 2)
+        self.dispatch(pool)
+        self.assertEqual(self.streams(pool), [1, 1])
+
+    def test_restartOnOtherHost(self):
+        pool = testlib.mockPool(4, 4)
+        dispatch = partial(core.dispatch_stream, engine=pool)
+        core.loadSchedule(
+            self.state,
+            pd.DataFrame(
+                {
+                    "File": ["/vids/test.mp4"],
+                    "Date/Time": [datetime.datetime.now()],
+                }
+            ),
+            pd.DataFrame(self.credentials, index=[0]),
+        )
+        core.dispatchDue(self.state, datetime.datetime.now(), dispatch)
+        self.assertEqual(self.streams(pool), [1, 0])
+        # the host of the stream goes away
+        pool.hosts[0].engine.down = True
+        notices = core.pollStreams(self.state, pool)
+        self.assertEqual([notice.kind for notice in notices], ["interrupted"])
+        self.assertEqual(notices[0].data["failure"].kind, "unreachable")
+        later = datetime.datetime.now() + datetime.timedelta(seconds=RETRY_DELAY)
+        notices = core.retryDue(self.state, later, dispatch)
+        self.assertEqual([notice.kind for notice in notices], ["resumed"])
+        self.assertEqual(self.streams(pool), [1, 1])
+
+    def test_events(self):
+        pool = testlib.mockPool(4, 4)
+        stream = pool.events(decode=True, filters={"type": "container"})
+        first, second = (host.engine for host in pool.hosts)
+        self.assertEqual(second.eventFilters, {"type": "container"})
+        container = testlib.mockContainer()
+        first.eventStream.publish("start", container)
+        second.eventStream.publish("die", container)
+        events = iter(stream)
+        actions = {next(events)["Action"], next(events)["Action"]}
+        self.assertEqual(actions, {"start", "die"})
+        # ends with any host, the reader connects again
+        second.eventStream.close()
+        self.assertEqual(list(events), [])
+
+    def test_readHosts(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "hosts.ini"
+            path.write_text(
+                "[local]\nurl = unix:///var/run/docker.sock\n\n"
+                "[encoder]\nurl = tcp://10.0.0.5:2376\ntls = yes\nslots = 3\n"
+            )
+            pool = hostpool.readHosts(path)
+            self.assertRaises(FileNotFoundError, hostpool.readHosts, path.parent / "x")
+        self.assertEqual([host.name for host in pool.hosts], ["local", "encoder"])
+        self.assertEqual([host.slots for host in pool.hosts], [None, 3])
+        self.assertEqual(
+            pool.hosts[1].engine.factory.args, ("tcp://10.0.0.5:2376", True, 10)
+        )
+
+
+class TestMonitor(unittest.TestCase):
+    def test_parseProgressLine(self):
+        sample = monitor.parseProgressLine(
+            b"frame= 1234 fps= 25 q=-1.0 size= 1234kB time=00:00:49.36"
+            b" bitrate= 918.3kbits/s speed=1.01x",
+            timestamp=0,
         )
-        self.assertEqual(lib.countImages("asdf"), 2)
-        # restore old client
-        lib.docker.from_env = oldClient
+        self.assertEqual(sample, monitor.Sample(0, 918.3, 25.0, 1.01))
+        self.assertIsNone(monitor.parseProgressLine(b"press [q] press [h]"))
+
+    def test_findBitrate(self):
+        line = b"size= 1kB bitrate= 918.3kbits/s x 920.35kbits/s"
+        self.assertEqual(monitor.findBitrate(line)[0], 918.3)
+        value, start, stop = monitor.findBitrate(line, line.index(b" x"))
+        self.assertEqual(line[start:stop], b"918.3kbits/s")
+        self.assertIsNone(monitor.findBitrate(b"bitrate=N/A .3kbits/s 3kbits/s"))
+        self.assertEqual(monitor.tokenCount(b"\r a  b \n"), 3)
+
+    def test_lastBitrate_corpus(self):
+        # agrees with the regular expression on a synthetic ffmpeg log
+        data = Path("./test_files/ffmpeg_stderr.log").read_bytes()
+        parsed = 0
+        for line in monitor.SEPARATOR.split(data):
+            expected = monitor.BITRATE.findall(line)
+            if len(line.strip().split(b" ")) < monitor.MIN_TOKENS or not expected:
+                self.assertIsNone(monitor.lastBitrate(line))
+                continue
+            expectedToken = f"{expected[-1].decode()}kbits/s"
+            self.assertEqual(monitor.lastBitrate(line), expectedToken)
+            self.assertEqual(monitor.findBitrate(line)[0], float(expected[-1]))
+            parsed += 1
+        self.assertGreater(parsed, 600)
+
+    def test_follower_splitChunks(self):
+        follower = monitor.LogFollower(testlib.mockContainer(b""))
+        # line is split across chunks
+        follower.feed(b"\rframe= 10 fps= 25 bitrate= 91")
+        self.assertIsNone(follower.latest())
+        follower.feed(b"8.3kbits/s speed=1x\rframe= 11 fps= 25 bitrate= 9")
+        self.assertEqual(follower.latest().bitrate, 918.3)
+        follower.flush()
+        self.assertEqual(len(follower.samples), 1)
+
+    def test_follower_ringBuffer(self):
+        follower = monitor.LogFollower(testlib.mockContainer(b""), size=5)
+        for i in range(20):
+            follower.feed(f"bitrate= {i}.0kbits/s\n".encode())
+        self.assertEqual(len(follower.samples), 5)
+        self.assertEqual(follower.latest().bitrate, 19.0)
+
+    def test_follower_stream(self):
+        container = testlib.mockContainer(
+            b"asdf", stream=[b"bitrate= 918.3kbits/s\r", b"bitrate= 920.3kbits/s\r"]
+        )
+        follower = monitor.LogFollower(container).start()
+        follower._thread.join(1)
+        self.assertEqual(monitor.formatBitrate(follower.latest()), "920.3kbits/s")
+
+
+    def test_progressParser(self):
+        parser = monitor.ProgressParser()
+        block = (
+            b"frame=1234\nfps=25.00\nstream_0_0_q=-1.0\nbitrate= 918.3kbits/s\n"
+            b"total_size=5669644\nout_time_us=49360000\nout_time_ms=49360000\n"
+            b"out_time=00:00:49.360000\ndup_frames=0\ndrop_frames=2\n"
+            b"speed=1.01x\nprogress=continue\n"
+        )
+        self.assertEqual(
+            parser.feed(block, timestamp=0),
+            [monitor.Sample(0, 918.3, 25.0, 1.01, 1234, 5669644, 49.36, 0, 2)],
+        )
+        # values that are not available yet
+        samples = parser.feed(b"frame=0\nbitrate=N/A\nspeed=N/A\nprogress=end\n", 0)
+        self.assertEqual(samples, [monitor.Sample(0, None, None, None, 0)])
+
+    def test_follower_progress(self):
+        follower = monitor.LogFollower(testlib.mockContainer(b""))
+        follower.feed(b"frame=0\nbitrate=N/A\nprogress=continue\n")
+        follower.feed(b"frame=25\nbitrate= 918.3kbits/s\nprogress=contin")
+        self.assertEqual(len(follower.samples), 1)
+        follower.feed(b"ue\n")
+        self.assertEqual(follower.latest().bitrate, 918.3)
+        # first sample with a frame out
+        self.assertEqual(follower.firstSample.frame, 25)
+
+    def test_health(self):
+        fast = [monitor.Sample(0, 900.0, 25.0, 1.0, dropFrames=0)] * 10
+        self.assertIsNone(monitor.health(fast))
+        slow = [monitor.Sample(0, 900.0, 20.0, 0.8)] * 10
+        self.assertEqual(monitor.health(slow), "running at 0.80x")
+        dropping = fast[:9] + [monitor.Sample(0, 900.0, 25.0, 1.0, dropFrames=5)]
+        self.assertEqual(monitor.health(dropping), "dropped 5 frames")
+        self.assertIsNone(monitor.health(slow[:3]))
+
+
+class TestFailureDetector(unittest.TestCase):
+    def test_classify(self):
+        lines = {
+            b"[tcp @ 0x1] Connection to tcp://a:1935 failed: Connection refused": "connection",
+            b"RTMP_Connect1, handshake failed: Authentication failed": "auth",
+            b"/vids/test.mp4: No such file or directory": "input",
+            b"Error while opening encoder for output stream #0:0": "encoder",
+            b"I am a failure!": "error",
+        }
+        for line, kind in lines.items():
+            detector = monitor.FailureDetector()
+            detector.feed(b"frame= 10 bitrate= 918.3kbits/s\n" + line + b"\n")
+            self.assertEqual(detector.failure.kind, kind)
+            self.assertEqual(detector.failure.line, line.decode())
+
+    def test_splitChunks(self):
+        detector = monitor.FailureDetector()
+        detector.feed(b"frame= 10\rConnection ref")
+        self.assertIsNone(detector.failure)
+        detector.feed(b"used\r")
+        self.assertEqual(detector.failure.kind, "connection")
+
+    def test_customPatterns(self):
+        detector = monitor.FailureDetector({"drop": rb"drop=[1-9]"})
+        detector.feed(b"error drop=0\ndrop=12\n")
+        self.assertEqual(detector.failure, monitor.Failure("drop", "drop=12"))
+
+    def test_checkSince(self):
+        # only output since the last check is requested
+        calls = []
+
+        class sinceContainer(testlib.mockContainer):
+            def logs(self, **kwargs):
+                calls.append(kwargs)
+                return b"" if "since" in kwargs else b"frame= 10\n"
+
+        detector = monitor.FailureDetector()
+        container = sinceContainer()
+        self.assertIsNone(detector.check(container))
+        detector.check(container)
+        # messages are read from stderr, progress goes to stdout
+        self.assertEqual(calls[0], {"stdout": False, "stderr": True})
+        self.assertIn("since", calls[1])
+
+
+class TestEventQueue(unittest.TestCase):
+    def setUp(self):
+        self.start = datetime.datetime(2025, 6, 21, 12)
+        self.queue = EventQueue()
+        for hour in [5, 1, 3, 0, 4, 2]:
+            self.queue.push(self.start + datetime.timedelta(hours=hour), f"{hour}.mp4")
+
+    def test_order(self):
+        self.assertEqual(self.queue.peek().file, "0.mp4")
+        self.assertEqual(
+            [event.file for event in self.queue.upcoming(3)],
+            ["0.mp4", "1.mp4", "2.mp4"],
+        )
+        self.assertEqual(self.queue.pop().file, "0.mp4")
+        self.assertEqual(len(self.queue), 5)
+
+    def test_prunePast(self):
+        pruned = self.queue.prunePast(self.start + datetime.timedelta(hours=2))
+        self.assertEqual([event.file for event in pruned], ["0.mp4", "1.mp4", "2.mp4"])
+        self.assertEqual(self.queue.peek().file, "3.mp4")
+
+    def test_delayUntilNext(self):
+        now = self.start - datetime.timedelta(seconds=1.5)
+        self.assertEqual(self.queue.delayUntilNext(now), 1.5)
+        self.assertIsNone(EventQueue().delayUntilNext(now))
+
+    def test_remove(self):
+        events = [event for event in self.queue if event.file in ("0.mp4", "3.mp4")]
+        self.queue.remove(events)
+        self.assertEqual(
+            [event.file for event in self.queue], ["1.mp4", "2.mp4", "4.mp4", "5.mp4"]
+        )
+        self.assertEqual(self.queue.pop().file, "1.mp4")
+
+
+class TestValidation(unittest.TestCase):
+    def setUp(self):
+        self.schedule = pd.DataFrame(
+            {
+                "File": [
+                    "test_files/vids/test.mp4",
+                    "test_files/vids/test2.mp4",
+                    "test_files/vids/missing.mp4",
+                    "test_files/vids2/test4.mp4",
+                    5,
+                ],
+                "Date": [datetime.datetime(2025, 6, 21 + i) for i in range(5)],
+                "Time": [
+                    datetime.time(12),
+                    "noon",
+                    datetime.time(14, 30),
+                    datetime.time(15),
+                    datetime.time(16),
+                ],
+            }
+        )
+
+    def test_reportAllRows(self):
+        report = validation.validateSchedule(self.schedule)
+        self.assertFalse(report.ok)
+        self.assertEqual(report.badRows(), [1, 2, 3, 4])
+        self.assertIn(
+            validation.RowError(1, "Time", validation.BAD_DTYPE), report.errors
+        )
+        self.assertIn(
+            validation.RowError(2, "File", validation.MISSING_FILE), report.errors
+        )
+        self.assertIn(
+            validation.RowError(3, "File", validation.BAD_DIRECTORY), report.errors
+        )
+        self.assertIn(
+            validation.RowError(4, "File", validation.BAD_DTYPE), report.errors
+        )
+        self.assertTrue(validation.validateSchedule(self.schedule.iloc[:1]).ok)
+
+    def test_missingColumn(self):
+        report = validation.validateSchedule(self.schedule.drop(columns="Time"))
+        self.assertEqual(report.messages(), [validation.MISSING_COLUMN])
+
+    def test_normalizeSchedule(self):
+        schedule = self.schedule.iloc[[2, 0]]
+        normalized = validation.normalizeSchedule(schedule)
+        self.assertEqual(list(normalized.columns), ["File", "Date/Time"])
+        expected = [
+            pd.Timestamp.combine(row["Date"], row["Time"])
+            for _, row in schedule.iloc[::-1].iterrows()
+        ]
+        self.assertEqual(list(normalized["Date/Time"]), expected)
+
+
+class TestSupervisor(unittest.TestCase):
+    def setUp(self):
+        self.mockframe = testlib.mockFrame()
+        self.mockframe.supervisor = StreamSupervisor(maxStreams=2)
+        self.mockframe.nowDT = datetime.datetime(2025, 6, 21, 12)
+        self.mockframe.after = lambda *args: None
+        self.mockframe.channelCredentials = {"a": "credsA", "b": "credsB", "c": "credsC"}
+        self.schedule = pd.DataFrame(
+            {
+                "File": ["a.mp4", "b.mp4", "c.mp4", "a2.mp4"],
+                "Date/Time": [
+                    pd.Timestamp("2025-06-21 12:00:00"),
+                    pd.Timestamp("2025-06-21 12:00:00"),
+                    pd.Timestamp("2025-06-21 12:00:00"),
+                    pd.Timestamp("2025-06-21 12:10:00"),
+                ],
+                "Channel": ["a", "b", "c", "a"],
+            }
+        )
+        # monkeypatch draw config and dispatch
+        self.oldDrawConfig = lib.draw_config
+        lib.draw_config = lambda x, y: None
+        self.oldDispatch = lib.dispatch_stream
+        self.dispatched = []
+        lib.dispatch_stream = lambda video, credentials, pathmap, labels=None: (
+            self.dispatched.append(credentials) or testlib.mockContainer()
+        )
+
+    def tearDown(self):
+        lib.draw_config = self.oldDrawConfig
+        lib.dispatch_stream = self.oldDispatch
+
+    def test_concurrentChannels(self):
+        self.mockframe.queue = EventQueue.fromSchedule(self.schedule)
+        lib.checkRightTime(self.mockframe)
+        # two channels run at the same time, the third exceeds the cap
+        self.assertEqual(self.dispatched, ["credsA", "credsB"])
+        self.assertTrue(self.mockframe.supervisor.isActive("a"))
+        self.assertTrue(self.mockframe.supervisor.isActive("b"))
+        self.assertFalse(self.mockframe.supervisor.isActive("c"))
+        # next stream on busy channel is skipped
+        self.mockframe.nowDT = datetime.datetime(2025, 6, 21, 12, 10)
+        lib.checkPastStream(self.mockframe)
+        self.assertEqual(len(self.mockframe.queue), 0)
+        self.assertEqual(len(self.dispatched), 2)
+
+    def test_checkStream_rates(self):
+        lib.createStatusWidget(self.mockframe)
+        for channel, rate in [("a", b"918.3"), ("b", b"920.3")]:
+            container = testlib.mockContainer(
+                status="running", log=b"bitrate= " + rate + b"kbits/s"
+            )
+            self.mockframe.supervisor.attach(channel, container)
+        lib.checkStream(self.mockframe, engine=testlib.mockEngine())
+        self.assertEqual(
+            self.mockframe.streamSpeed.get(), "a: 918.3kbits/s | b: 920.3kbits/s"
+        )
+
+    def test_timingPerChannel(self):
+        lib.showerror = testlib.raiseAssertion
+        # close streams on different channels are fine
+        lib.check_config_timing(self.schedule.iloc[:3])
+        # close streams on the same channel are not
+        badCall = partial(lib.check_config_timing, self.schedule)
+        self.assertRaises(AssertionError, badCall)
+
+    def test_parseCredentials(self):
+        credentials = pd.DataFrame(
+            {
+                "Channel": ["a", "b"],
+                "User": [1, 2],
+                "Password": [3, 4],
+                "rtmp-URL": ["rtmp://a", "rtmp://b"],
+                "playpath": ["pa", "pb"],
+            }
+        )
+        parsed = lib.parseCredentials(credentials)
+        self.assertEqual(list(parsed), ["a", "b"])
+        self.assertEqual(
+            parsed["b"],
+            {"User": 2, "Password": 4, "rtmp-URL": "rtmp://b", "playpath": "pb"},
+        )
+        lib.showerror = testlib.raiseAssertion
+        badCall = partial(lib.check_config_channels, self.schedule, parsed)
+        self.assertRaises(AssertionError, badCall)
+
+
+class TestScheduleCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = schedulecache.ScheduleCache(self.directory.name)
+        self.filename = "./test_files/test_schedule_1_mock_good.xlsx"
+        lib.showerror = testlib.raiseAssertion
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_readWorkbook(self):
+        schedule, credentials = schedulecache.readWorkbook(self.filename)
+        self.assertEqual(sorted(schedule.columns), ["Date", "File", "Time"])
+        self.assertEqual(list(credentials.columns)[0], "User")
+
+    def test_cacheHit(self):
+        schedule, credentials = lib.read_config(self.filename, self.cache)
+        # second read does not open the workbook
+        oldReadWorkbook = core.readWorkbook
+        core.readWorkbook = testlib.raiseAssertion
+        cachedSchedule, cachedCredentials = lib.read_config(self.filename, self.cache)
+        core.readWorkbook = oldReadWorkbook
+        assert_frame_equal(schedule, cachedSchedule)
+        assert_frame_equal(credentials, cachedCredentials)
+
+    def test_cacheKey(self):
+        key = self.cache.key(self.filename)
+        self.assertTrue(key.endswith(f"-v{schedulecache.SCHEMA_VERSION}"))
+        otherKey = self.cache.key("./test_files/test_schedule_1_mock_badTiming.xlsx")
+        self.assertNotEqual(key, otherKey)
+
+    def test_badEntries(self):
+        # invalid schedules are not cached
+        badCall = partial(
+            lib.read_config,
+            "./test_files/test_schedule_1_mock_badfiles.xlsx",
+            self.cache,
+        )
+        self.assertRaises(AssertionError, badCall)
+        self.assertEqual(list(Path(self.directory.name).glob("*.pkl")), [])
+        # unreadable entries are dropped
+        key = self.cache.key(self.filename)
+        self.cache.path(key).write_bytes(b"garbage")
+        self.assertIsNone(self.cache.load(key))
+        self.assertFalse(self.cache.path(key).exists())
+
+    def test_evict(self):
+        cache = schedulecache.ScheduleCache(self.directory.name, maxEntries=2)
+        for key in ["a", "b", "c"]:
+            cache.store(key, pd.DataFrame(), None)
+            time.sleep(0.01)
+        self.assertIsNone(cache.load("a"))
+        self.assertIsNotNone(cache.load("c"))
+
+    def test_privateDirectory(self):
+        # entries others could have planted are not unpickled
+        self.cache.store("a", pd.DataFrame(), None)
+        self.assertIsNotNone(self.cache.load("a"))
+        os.chmod(self.directory.name, 0o777)
+        self.assertIsNone(self.cache.load("a"))
+        self.cache.store("b", pd.DataFrame(), None)
+        self.assertFalse(self.cache.path("b").exists())
+        # a new cache directory is private
+        directory = Path(self.directory.name) / "new"
+        schedulecache.ScheduleCache(directory).store("a", pd.DataFrame(), None)
+        self.assertEqual(directory.stat().st_mode & 0o777, 0o700)
 
 
 class TestStream(unittest.TestCase):
@@ -563,5 +1401,1160 @@ class TestStream(unittest.TestCase):
         self.assertEqual(len(self.engine.containers), 1)
 
 
+
+class TestProcessEngine(unittest.TestCase):
+    """The scenarios of TestStream and TestCheckStream
+    with streams as processes instead of containers"""
+
+    def setUp(self):
+        self.credentials = {
+            "User": 12345,
+            "Password": 678910,
+            "rtmp-URL": "rtmp://i.amagood.server",
+            "playpath": "dclive_0_1@2345",
+        }
+        self.directory = tempfile.TemporaryDirectory()
+        self.engine = testlib.fakeFfmpeg(self.directory.name)
+        self.oldOnUpdate = lib.onUpdate
+        lib.onUpdate = lambda x: 1
+
+    def tearDown(self):
+        lib.onUpdate = self.oldOnUpdate
+        self.engine.close()
+        self.directory.cleanup()
+
+    def dispatch(self, videofile):
+        pathmap = {self.directory.name: {"bind": "/vids"}}
+        return lib.dispatch_stream(
+            videofile, self.credentials, pathmap, engine=self.engine
+        )
+
+    def waitForProgress(self, container):
+        for _ in range(100):
+            if b"progress=" in container.logs(stderr=False):
+                return
+            time.sleep(0.05)
+        self.fail("no progress output")
+
+    def checkStream(self, container):
+        mockframe = testlib.mockFrame()
+        mockframe.supervisor.attach(DEFAULT_CHANNEL, container)
+        lib.createStatusWidget(mockframe)
+        lib.checkStream(mockframe, engine=self.engine)
+        return mockframe
+
+    def test_dispatch_test_stream(self):
+        container = lib.dispatch_test_stream(self.credentials, self.engine)
+        self.assertEqual(len(self.engine.containers.list(all=True)), 1)
+        self.assertEqual(container.wait(10), {"StatusCode": 0})
+
+    def test_dispatch_Stream(self):
+        container = lib.dispatch_stream(
+            "mockfile", credentials=self.credentials, pathmap="dummy", engine=self.engine
+        )
+        self.assertEqual(len(self.engine.containers.list(all=True)), 1)
+        self.assertIn("mockfile", container.args)
+
+    def test_paths(self):
+        container = self.dispatch("/vids/test.mp4")
+        self.assertIn(f"{self.directory.name}/test.mp4", container.args)
+        self.assertEqual(container.args[:2], self.engine.executables["ffmpeg"])
+        rtmp = [arg for arg in container.args if arg.startswith("rtmp://")]
+        self.assertEqual(len(rtmp), 1)
+
+    def test_missingExecutable(self):
+        self.engine.executables["ffmpeg"] = ["/nonexistent/ffmpeg"]
+        self.assertIsNone(self.dispatch("/vids/test.mp4"))
+        self.assertEqual(self.engine.containers.list(all=True), [])
+        self.assertRaises(FileNotFoundError, self.engine.version)
+        self.assertEqual(len(core.checkFfmpeg(self.engine)), 1)
+
+    def test_backend(self):
+        self.assertEqual(core.checkFfmpeg(self.engine), [])
+        self.assertEqual(daemon.parseArgs([]).backend, "docker")
+        self.assertEqual(daemon.parseArgs(["--backend", "process"]).backend, "process")
+        with open(os.devnull, "w") as devnull:
+            stderr, sys.stderr = sys.stderr, devnull
+            try:
+                self.assertRaises(
+                    SystemExit,
+                    daemon.parseArgs,
+                    ["--backend", "process", "--hosts", "hosts.ini"],
+                )
+            finally:
+                sys.stderr = stderr
+
+    def test_containerRunning(self):
+        container = self.dispatch("/vids/endless.mp4")
+        self.waitForProgress(container)
+        mockframe = self.checkStream(container)
+        self.assertEqual(mockframe.status.get(), "green")
+        self.assertTrue(mockframe.supervisor.isActive())
+        self.assertEqual(mockframe.lbl_StreamSpeed["text"], "918.3kbits/s")
+        container.stop()
+        self.assertNotEqual(container.wait(10)["StatusCode"], 0)
+
+    def test_containerFinished(self):
+        container = self.dispatch("/vids/test.mp4")
+        container.wait(10)
+        mockframe = self.checkStream(container)
+        self.assertEqual(mockframe.status.get(), "yellow")
+        self.assertFalse(mockframe.supervisor.isActive())
+        self.assertEqual(mockframe.lbl_StreamSpeed["text"], "Inactive")
+        self.assertEqual(self.engine.containers.list(), [])
+
+    def test_containerCrashed(self):
+        container = self.dispatch("/vids/crash.mp4")
+        self.assertEqual(container.wait(10), {"StatusCode": 1})
+        oldShowerror = lib.showerror
+        lib.showerror = testlib.raiseAssertion
+        try:
+            self.assertRaises(AssertionError, self.checkStream, container)
+        finally:
+            lib.showerror = oldShowerror
+        self.assertIn(b"No such file or directory", container.logs(stdout=False))
+
+    def test_logs(self):
+        container = self.dispatch("/vids/test.mp4")
+        container.wait(10)
+        output = container.logs(stderr=False)
+        self.assertEqual(output.count(b"progress=continue"), 3)
+        self.assertEqual(container.logs(tail=1), b"progress=continue\n")
+        chunks = container.logs(stderr=False, stream=True, follow=True)
+        self.assertEqual(b"".join(chunks), output)
+        self.assertEqual(container.logs(since=time.time() + 1), b"")
+
+    def test_followStops(self):
+        container = self.dispatch("/vids/endless.mp4")
+        stream = container.logs(stderr=False, stream=True, follow=True)
+        chunks = queue.Queue()
+        reader = threading.Thread(target=lambda: [chunks.put(c) for c in stream])
+        reader.start()
+        chunks.get(timeout=10)
+        stream.close()
+        reader.join(10)
+        self.assertFalse(reader.is_alive())
+        self.assertEqual(container.state(), "running")
+        container.stop()
+
+    def test_events(self):
+        events = self.engine.events(
+            decode=True, filters={"event": ["start", "die"], "label": ["role=stream"]}
+        )
+        self.engine.containers.run(
+            core.IMAGE_NAME, "ffmpeg -i /vids/test.mp4", detach=True
+        )
+        container = self.engine.containers.run(
+            core.IMAGE_NAME,
+            "ffmpeg -i /vids/crash.mp4",
+            detach=True,
+            labels={"role": "stream"},
+        )
+        stream = iter(events)
+        start, die = next(stream), next(stream)
+        self.assertEqual((start["Action"], start["id"]), ("start", container.id))
+        self.assertEqual((die["Action"], die["id"]), ("die", container.id))
+        self.assertEqual(die["Actor"]["Attributes"]["exitCode"], "1")
+        events.close()
+        self.assertEqual(list(stream), [])
+
+    def test_runToCompletion(self):
+        output = self.engine.containers.run(
+            core.IMAGE_NAME, ["ffmpeg", "-i", "/vids/test.mp4"], remove=True
+        )
+        self.assertEqual(output.count(b"progress=continue"), 3)
+        self.assertRaises(
+            subprocess.CalledProcessError,
+            self.engine.containers.run,
+            core.IMAGE_NAME,
+            "ffmpeg -i crash",
+        )
+
+    def test_playlistItems(self):
+        state = core.SchedulerState()
+        state.pathMap = {"/videos": {"bind": "/vids"}}
+        oldEngine = core.getEngine()
+        setEngine(self.engine)
+        try:
+            self.assertEqual(
+                core.itemInput(state, "/somewhere/test.mp4"), ("/videos/test.mp4", {})
+            )
+        finally:
+            setEngine(oldEngine)
+        self.assertEqual(
+            core.itemInput(state, "/somewhere/test.mp4"), ("/vids/test.mp4", {})
+        )
+
+    def test_dispatchDue(self):
+        start = datetime.datetime.now() + datetime.timedelta(hours=1)
+        schedule = pd.DataFrame(
+            {"File": [f"{self.directory.name}/test.mp4"], "Date/Time": [start]}
+        )
+        credentials = pd.DataFrame(
+            {key: [value] for key, value in self.credentials.items()}
+        )
+        state = core.SchedulerState(StreamSupervisor(1))
+        core.loadSchedule(state, schedule, credentials)
+        oldEngine = core.getEngine()
+        setEngine(self.engine)
+        try:
+            notices = core.dispatchDue(state, start)
+        finally:
+            setEngine(oldEngine)
+        self.assertEqual(notices[0].kind, "started")
+        container = state.supervisor.container()
+        self.assertIn(f"{self.directory.name}/test.mp4", container.args)
+
+
+class TestDaemon(unittest.TestCase):
+    def setUp(self):
+        self.credentials = pd.DataFrame(
+            {
+                "User": [12345],
+                "Password": [678910],
+                "rtmp-URL": ["rtmp://i.amagood.server"],
+                "playpath": ["dclive_0_1@2345"],
+            }
+        )
+        self.state = core.SchedulerState(StreamSupervisor(1))
+        self.oldDispatch = core.dispatch_stream
+        self.oldPrepare = core.prepare_stream
+
+    def tearDown(self):
+        core.dispatch_stream = self.oldDispatch
+        core.prepare_stream = self.oldPrepare
+
+    def makeSchedule(self, *times):
+        return pd.DataFrame(
+            {"File": ["/vids/test.mp4"] * len(times), "Date/Time": list(times)}
+        )
+
+    def test_loadScheduleWhilePrewarmed(self):
+        start = datetime.datetime.now() + datetime.timedelta(hours=1)
+        lead = datetime.timedelta(seconds=30)
+        core.loadSchedule(self.state, self.makeSchedule(start), self.credentials)
+        prepared = testlib.mockContainer(b"", status="created")
+        core.prewarmDue(self.state, start - lead, lambda *args, **kwargs: prepared)
+        self.assertIs(self.state.supervisor.warm[DEFAULT_CHANNEL].container, prepared)
+        # the container of the old workbook is removed
+        later = start + datetime.timedelta(minutes=10)
+        core.loadSchedule(self.state, self.makeSchedule(later), self.credentials)
+        self.assertEqual(prepared.status, "removed")
+        self.assertEqual(self.state.supervisor.warm, {})
+        self.assertEqual(self.state.supervisor.prepared, set())
+        # the event of the new workbook with the same seq is prepared
+        second = testlib.mockContainer(b"", status="created")
+        core.prewarmDue(self.state, later - lead, lambda *args, **kwargs: second)
+        self.assertIs(self.state.supervisor.warm[DEFAULT_CHANNEL].container, second)
+        self.assertEqual(core.nextDelay(self.state, later - lead), 30)
+
+    def test_loadSchedule(self):
+        start = datetime.datetime.now() + datetime.timedelta(hours=1)
+        notices = core.loadSchedule(
+            self.state, self.makeSchedule(start), self.credentials
+        )
+        self.assertEqual([notice.kind for notice in notices], ["schedule"])
+        self.assertEqual(len(self.state.queue), 1)
+        # errors are reported as notices instead of dialogs
+        notices = core.loadSchedule(self.state, self.makeSchedule(start), None)
+        self.assertEqual(notices[0].kind, "error")
+
+    def test_dispatchDue(self):
+        now = datetime.datetime.now()
+        core.loadSchedule(
+            self.state,
+            self.makeSchedule(now + datetime.timedelta(seconds=1)),
+            self.credentials,
+        )
+        container = testlib.mockContainer(status="running")
+        notices = core.dispatchDue(
+            self.state,
+            now + datetime.timedelta(seconds=1),
+            lambda video, credentials, pathmap, labels=None: container,
+        )
+        self.assertEqual(
+            [notice.kind for notice in notices], ["started", "schedule"]
+        )
+        # the running stream stays in the schedule of the front ends
+        self.assertEqual([row.status for row in notices[1].data], ["running"])
+        self.assertIs(self.state.supervisor.container(), container)
+        self.assertEqual(len(self.state.queue), 0)
+
+    def test_exactWakeup(self):
+        container = testlib.mockContainer(b"", status="created")
+        # the container is prepared ahead and only started on time
+        core.dispatch_stream = testlib.raiseAssertion
+        core.prepare_stream = lambda video, credentials, pathmap, labels=None: container
+        engine = testlib.mockEngine(containers=[container])
+        scheduler = daemon.AsyncScheduler(self.state, engine, pollInterval=0.05)
+        notices = queue.Queue()
+        scheduler.subscribe(notices.put)
+        scheduler.startThread()
+        start = datetime.datetime.now() + datetime.timedelta(seconds=0.3)
+        # schedules are loaded on the scheduler thread
+        scheduler.submit(
+            core.loadSchedule, self.makeSchedule(start), self.credentials
+        ).result(timeout=2)
+        while True:
+            notice = notices.get(timeout=2)
+            if notice.kind == "started":
+                break
+        latency = (datetime.datetime.now() - start).total_seconds()
+        scheduler.stop()
+        scheduler.thread.join(timeout=2)
+        self.assertGreaterEqual(latency, 0)
+        self.assertLess(latency, 0.2)
+        self.assertEqual(container.status, "running")
+        self.assertFalse(scheduler.thread.is_alive())
+
+    def test_lazyImports(self):
+        # the headless path does not load the gui toolkit, pandas or docker
+        script = (
+            "import sys, daemon\n"
+            "print(*[m for m in ('tkinter', 'pandas', 'docker') if m in sys.modules])"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", script], capture_output=True, text=True, check=True
+        )
+        self.assertEqual(output.stdout.strip(), "")
+
+    def test_reloadSchedule(self):
+        start = datetime.datetime.now() + datetime.timedelta(hours=1)
+        hour = datetime.timedelta(hours=1)
+
+        def schedule(*rows):
+            return pd.DataFrame(
+                {
+                    "File": [f"/vids/{name}.mp4" for name, _ in rows],
+                    "Date/Time": [start + offset * hour for _, offset in rows],
+                }
+            )
+
+        self.state.supervisor = StreamSupervisor(2)
+        core.loadSchedule(
+            self.state, schedule(("a", 0), ("b", 1), ("c", 2)), self.credentials
+        )
+        running = testlib.mockContainer(status="running")
+        self.state.supervisor.attach("other", running)
+        prepared = testlib.mockContainer()
+        eventB = [event for event in self.state.queue if "b" in event.file][0]
+        self.state.supervisor.prepare(DEFAULT_CHANNEL, prepared, eventB)
+        # b is removed, c moves, d is new
+        notices = core.reloadSchedule(
+            self.state, schedule(("a", 0), ("c", 3), ("d", 4)), None
+        )
+        self.assertEqual([notice.kind for notice in notices], ["reloaded", "schedule"])
+        self.assertEqual(notices[0].data, {"added": 1, "removed": 1, "moved": 1})
+        self.assertEqual(
+            [(Path(event.file).stem, event.time) for event in self.state.queue],
+            [("a", start), ("c", start + 3 * hour), ("d", start + 4 * hour)],
+        )
+        # the dropped stream loses its container, the running one stays
+        self.assertEqual(prepared.status, "removed")
+        self.assertEqual(self.state.supervisor.warm, {})
+        self.assertIs(self.state.supervisor.container("other"), running)
+        self.assertEqual(running.status, "running")
+        # unchanged schedules do not redraw
+        notices = core.reloadSchedule(
+            self.state, schedule(("a", 0), ("c", 3), ("d", 4)), None
+        )
+        self.assertEqual([notice.kind for notice in notices], ["reloaded"])
+        # invalid workbooks keep the queue
+        notices = core.reloadSchedule(self.state, None, None, "File missing")
+        self.assertEqual(notices[0].kind, "error")
+        self.assertEqual(len(self.state.queue), 3)
+
+    def test_mainWithoutDocker(self):
+        oldWhich = core.shutil.which
+        core.shutil.which = lambda x: None
+        with tempfile.TemporaryDirectory() as directory:
+            argv = ["schedule.xlsx", "--journal", f"{directory}/journal.sqlite"]
+            self.assertEqual(daemon.main(argv), 1)
+        core.shutil.which = oldWhich
+
+
+class TestDockerEvents(unittest.TestCase):
+    def setUp(self):
+        self.engine = testlib.mockEngine()
+        self.exits = queue.Queue()
+        self.events = dockerevents.ContainerEvents(
+            self.engine, "instance", lambda *args: self.exits.put(args)
+        ).start()
+        self.assertTrue(self.events.connected.wait(2))
+
+    def tearDown(self):
+        self.events.stop()
+        self.engine.eventStream.close()
+        self.events.thread.join(timeout=2)
+
+    def test_table(self):
+        container = testlib.mockContainer()
+        self.assertIn(
+            f"{core.INSTANCE_LABEL}=instance", self.engine.eventFilters["label"]
+        )
+        self.engine.eventStream.publish("start", container)
+        self.engine.eventStream.publish("oom", container)
+        self.engine.eventStream.publish("die", container, exitCode=137)
+        identifier, state = self.exits.get(timeout=2)
+        self.assertEqual(identifier, container.id)
+        self.assertEqual((state.status, state.exitCode, state.oom), ("die", 137, True))
+        self.assertTrue(self.events.exited(container.id))
+
+    def test_pollWithoutList(self):
+        state = core.SchedulerState(StreamSupervisor(1))
+        state.containerEvents = self.events
+        container = testlib.mockContainer(status="created")
+        state.supervisor.attach(DEFAULT_CHANNEL, container)
+        self.engine.containers.containerList.append(container)
+        # the first poll lists once, the events know the rest
+        self.assertFalse(self.events.live())
+        core.pollStreams(state, self.engine)
+        self.assertTrue(self.events.live())
+        self.engine.containers.list = testlib.raiseAssertion
+        notices = core.pollStreams(state, self.engine)
+        self.assertEqual([notice.kind for notice in notices], ["status"])
+        self.engine.eventStream.publish("die", container, exitCode=1)
+        self.exits.get(timeout=2)
+        notices = core.pollStreams(state, self.engine)
+        self.assertEqual(notices[0].kind, "failed")
+        self.assertEqual(notices[0].data["exitCode"], 1)
+        self.assertEqual(notices[0].data["failure"].kind, "exit")
+        self.assertIsNone(self.events.state(container.id))
+
+    def test_wakeOnExit(self):
+        state = core.SchedulerState(StreamSupervisor(1))
+        container = testlib.mockContainer(status="created")
+        state.supervisor.attach(DEFAULT_CHANNEL, container)
+        self.engine.containers.containerList.append(container)
+        scheduler = daemon.AsyncScheduler(state, self.engine, pollInterval=30)
+        notices = queue.Queue()
+        scheduler.subscribe(notices.put)
+        self.events.onExit = scheduler.containerExited
+        state.containerEvents = self.events
+        scheduler.startThread()
+        try:
+            # the first poll lists the containers
+            scheduler.submit(core.pollStreams, self.engine).result(timeout=2)
+            self.engine.containers.containerList.clear()
+            exited = time.monotonic()
+            self.engine.eventStream.publish("die", container)
+            while True:
+                notice = notices.get(timeout=2)
+                if notice.kind == "ended":
+                    break
+            self.assertLess(time.monotonic() - exited, 1)
+        finally:
+            scheduler.stop()
+            scheduler.thread.join(timeout=2)
+
+
+class TestJournal(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name) / "journal.sqlite"
+        self.credentials = pd.DataFrame(
+            {
+                "User": [12345],
+                "Password": [678910],
+                "rtmp-URL": ["rtmp://i.amagood.server"],
+                "playpath": ["dclive_0_1@2345"],
+            }
+        )
+        self.start = datetime.datetime.now() + datetime.timedelta(hours=1)
+        self.schedule = pd.DataFrame(
+            {
+                "File": ["/vids/test.mp4"] * 3,
+                "Date/Time": [
+                    self.start + datetime.timedelta(hours=hour) for hour in range(3)
+                ],
+            }
+        )
+        self.journals = []
+
+    def tearDown(self):
+        for entry in self.journals:
+            entry.close()
+        self.directory.cleanup()
+
+    def makeState(self):
+        state = core.SchedulerState(StreamSupervisor(1))
+        state.journal = journal.Journal(self.path)
+        state.instance = state.journal.instance()
+        self.journals.append(state.journal)
+        return state
+
+    def test_batched(self):
+        state = self.makeState()
+        core.loadSchedule(state, self.schedule, self.credentials)
+        reader = self.makeState().journal
+        # nothing is written before the step is committed
+        self.assertEqual(reader.pendingItems(datetime.datetime.now()), [])
+        core.flushJournal(state)
+        self.assertEqual(len(reader.pendingItems(datetime.datetime.now())), 3)
+        self.assertEqual(state.journal.pending, [])
+
+    def test_recover(self):
+        state = self.makeState()
+        core.loadSchedule(state, self.schedule, self.credentials)
+        container = testlib.mockContainer(status="running")
+        core.dispatchDue(state, self.start, lambda *args, **kwargs: container)
+        core.flushJournal(state)
+        # the scheduler crashes and starts again
+        state.supervisor.get().follower.stop()
+        restarted = self.makeState()
+        self.assertEqual(core.adoptableContainers(restarted), {container.id})
+        engine = testlib.mockEngine(containers=[container])
+        notices = core.adoptStreams(restarted, engine)
+        self.assertEqual([notice.kind for notice in notices], ["adopted", "schedule"])
+        slot = restarted.supervisor.get()
+        self.assertIs(slot.container, container)
+        self.assertTrue(slot.adopted)
+        # the adopted stream is not queued again
+        notices = core.restoreSchedule(restarted, self.schedule, self.credentials)
+        self.assertEqual(notices[0].data, {"added": 0, "removed": 0, "moved": 0})
+        self.assertEqual(
+            [event.time for event in restarted.queue],
+            [self.start + datetime.timedelta(hours=hour) for hour in (1, 2)],
+        )
+        # the adopted stream is monitored until it ends
+        engine.containers.containerList.clear()
+        notices = core.pollStreams(restarted, engine)
+        self.assertEqual([notice.kind for notice in notices], ["ended"])
+        core.flushJournal(restarted)
+        self.assertEqual(core.adoptableContainers(restarted), set())
+
+    def test_duplicates(self):
+        # duplicate entries are journaled and restored separately
+        schedule = self.schedule.iloc[[0, 0, 1]].reset_index(drop=True)
+        state = self.makeState()
+        core.loadSchedule(state, schedule, self.credentials)
+        core.flushJournal(state)
+        restarted = self.makeState()
+        notices = core.restoreSchedule(restarted, schedule, self.credentials)
+        reloaded = [notice for notice in notices if notice.kind == "reloaded"]
+        self.assertEqual(reloaded[0].data, {"added": 0, "removed": 0, "moved": 0})
+        self.assertEqual(len(restarted.queue), 3)
+        first, second = list(state.queue)[:2]
+        state.journal.dispatched(first, "a")
+        state.journal.finished(first, "a", journal.FAILED)
+        # a restart replaces the container of the failed item
+        state.journal.dispatched(first, "b", restart=True)
+        core.flushJournal(state)
+        self.assertEqual(core.adoptableContainers(state), {"b"})
+        pending = state.journal.pendingItems(datetime.datetime.now())
+        later = self.start + datetime.timedelta(hours=1)
+        self.assertEqual([event.time for event in pending], [second.time, later])
+        # the duplicate runs and ends on its own
+        state.journal.dispatched(second, "c")
+        state.journal.finished(second, "b", journal.ENDED)
+        core.flushJournal(state)
+        self.assertEqual(core.adoptableContainers(state), {"c"})
+        self.assertEqual(len(state.journal.pendingItems(datetime.datetime.now())), 1)
+
+    def test_migrate(self):
+        # journals of version 1 keep their items
+        connection = sqlite3.connect(str(self.path))
+        connection.executescript(
+            "CREATE TABLE items (time TEXT NOT NULL, file TEXT NOT NULL,"
+            " channel TEXT NOT NULL, status TEXT NOT NULL, container TEXT,"
+            " updated TEXT NOT NULL, PRIMARY KEY (time, file, channel));"
+            "CREATE INDEX itemStatus ON items (status);"
+        )
+        row = (self.start.isoformat(), "/vids/test.mp4", DEFAULT_CHANNEL, "queued")
+        connection.execute("INSERT INTO items VALUES (?, ?, ?, ?, NULL, '')", row)
+        connection.commit()
+        connection.close()
+        state = self.makeState()
+        self.assertEqual(len(state.journal.pendingItems(datetime.datetime.now())), 1)
+        event = state.journal.pendingItems(datetime.datetime.now())[0]
+        state.journal.queued([event])
+        core.flushJournal(state)
+        self.assertEqual(len(state.journal.pendingItems(datetime.datetime.now())), 2)
+
+    def test_lost(self):
+        state = self.makeState()
+        core.loadSchedule(state, self.schedule, self.credentials)
+        container = testlib.mockContainer(status="running")
+        core.dispatchDue(state, self.start, lambda *args, **kwargs: container)
+        state.supervisor.get().follower.stop()
+        core.flushJournal(state)
+        restarted = self.makeState()
+        notices = core.adoptStreams(restarted, testlib.mockEngine())
+        self.assertEqual(notices, [])
+        self.assertFalse(restarted.supervisor.isActive())
+        self.assertEqual(restarted.journal.history(1)[0][1], journal.LOST)
+
+    def test_adoptByLabels(self):
+        state = self.makeState()
+        core.loadSchedule(state, self.schedule, self.credentials)
+        engine = testlib.mockEngine()
+        dispatch = partial(core.dispatch_stream, engine=engine)
+        core.dispatchDue(state, self.start, dispatch)
+        state.supervisor.get().follower.stop()
+        # the scheduler crashes before the step is committed
+        state.journal.pending.clear()
+        restarted = self.makeState()
+        self.assertEqual(restarted.instance, state.instance)
+        notices = core.adoptStreams(restarted, engine)
+        self.assertEqual(notices[0].kind, "adopted")
+        self.assertEqual(notices[0].data.time, self.start)
+        restarted.supervisor.get().follower.stop()
+        self.assertEqual(
+            core.adoptableContainers(restarted), {state.supervisor.container().id}
+        )
+
+
+
+def progressOutput(seconds):
+    """ffmpeg progress blocks of the first seconds of a stream"""
+    return "".join(
+        testlib.PROGRESS_TEMPLATE.format(
+            frame=second * 25,
+            fps=25,
+            bitrate=918.3,
+            size=second * 114788,
+            outTime=second * 1000000,
+            speed=1.0,
+        )
+        for second in range(1, seconds + 1)
+    ).encode()
+
+
+class TestRecovery(unittest.TestCase):
+    def setUp(self):
+        self.state = core.SchedulerState(StreamSupervisor(1))
+        self.event = EventQueue().push(
+            datetime.datetime.now() - datetime.timedelta(minutes=5), "/vids/test.mp4"
+        )
+        self.seeks = []
+        self.restarted = testlib.mockContainer(stream=[progressOutput(1)])
+
+    def dispatch(self, video, credentials, pathmap, labels=None, seek=None):
+        self.seeks.append(seek)
+        return self.restarted
+
+    def fail(self, log=b"[rtmp @ 0x5581] Connection reset by peer", seconds=12):
+        """Runs a stream that fails after seconds of output
+        and returns the notices of the poll that sees it"""
+        container = testlib.mockContainer(log, stream=[progressOutput(seconds)])
+        slot = self.state.supervisor.attach(DEFAULT_CHANNEL, container, self.event)
+        slot.follower = monitor.LogFollower(container).start()
+        return core.pollStreams(self.state, testlib.mockEngine())
+
+    def test_backoff(self):
+        recovery = StreamRecovery(delay=2, maxDelay=10)
+        self.assertEqual([recovery.backoff(n) for n in range(5)], [2, 4, 8, 10, 10])
+
+    def test_seek(self):
+        credentials = {
+            "User": 12345,
+            "Password": 678910,
+            "rtmp-URL": "rtmp://i.amagood.server",
+            "playpath": "dclive_0_1@2345",
+        }
+        command = " ".join(core.streamCommand("/vids/a.mp4", credentials, 12.5).split())
+        self.assertIn("-re -ss 12.500 -i /vids/a.mp4", command)
+        self.assertNotIn("-ss", core.streamCommand("/vids/a.mp4", credentials))
+
+    def test_resume(self):
+        notices = self.fail()
+        self.assertEqual([notice.kind for notice in notices], ["interrupted"])
+        retry = notices[0].data["retry"]
+        self.assertEqual(retry.position, 12.0)
+        self.assertEqual(retry.failures, ["connection"])
+        now = datetime.datetime.now()
+        self.assertAlmostEqual(
+            core.nextDelay(self.state, now), RETRY_DELAY, delta=0.5
+        )
+        # nothing restarts before the backoff is over
+        self.assertEqual(core.retryDue(self.state, now, self.dispatch), [])
+        later = now + datetime.timedelta(seconds=RETRY_DELAY)
+        notices = core.retryDue(self.state, later, self.dispatch)
+        self.assertEqual([notice.kind for notice in notices], ["resumed"])
+        self.assertEqual(self.seeks, [12.0])
+        slot = self.state.supervisor.get()
+        self.assertEqual(slot.offset, 12.0)
+        slot.follower._thread.join(1)
+        # progress of the restart counts from where it seeked to
+        self.assertEqual(core.position(slot, slot.follower.latest()), 13.0)
+        engine = testlib.mockEngine(containers=[self.restarted])
+        notices = core.pollStreams(self.state, engine)
+        self.assertEqual([notice.kind for notice in notices], ["recovered", "status"])
+        self.assertEqual(retry.outcome, "recovered")
+        self.assertGreaterEqual(retry.gap, 0)
+        self.assertEqual([attempt.position for attempt in retry.attempts], [12.0])
+        self.assertEqual(self.state.supervisor.recovery.history, [retry])
+        self.assertEqual(self.state.supervisor.latencies, [])
+
+    def test_permanent(self):
+        notices = self.fail(b"Authentication failed")
+        self.assertEqual([notice.kind for notice in notices], ["failed"])
+        self.assertEqual(self.state.supervisor.recovery.pending, {})
+
+    def test_giveUp(self):
+        retry = self.fail()[0].data["retry"]
+        later = datetime.datetime.now() + datetime.timedelta(seconds=RETRY_DELAY)
+        notices = core.retryDue(self.state, later, lambda *args, **kwargs: None)
+        self.assertEqual([notice.kind for notice in notices], ["interrupted"])
+        # the second restart backs off twice as long
+        self.assertAlmostEqual(
+            retry.dueAt - time.time(), 2 * RETRY_DELAY, delta=0.5
+        )
+        retry.deadline = time.time()
+        notices = core.retryDue(self.state, later, lambda *args, **kwargs: None)
+        self.assertEqual([notice.kind for notice in notices], [])
+        retry.dueAt = time.time()
+        notices = core.retryDue(self.state, later, lambda *args, **kwargs: None)
+        self.assertEqual([notice.kind for notice in notices], ["failed"])
+        self.assertEqual(retry.outcome, "gaveUp")
+        self.assertEqual(len(retry.attempts), 2)
+        self.assertIsNone(core.nextDelay(self.state, datetime.datetime.now()))
+
+    def test_superseded(self):
+        retry = self.fail()[0].data["retry"]
+        self.state.supervisor.attach(DEFAULT_CHANNEL, testlib.mockContainer())
+        later = datetime.datetime.now() + datetime.timedelta(seconds=RETRY_DELAY)
+        notices = core.retryDue(self.state, later, self.dispatch)
+        self.assertEqual([notice.kind for notice in notices], ["failed"])
+        self.assertEqual((retry.outcome, self.seeks), ("superseded", []))
+
+
+class TestScheduleWatch(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name) / "schedule.xlsx"
+        self.path.write_bytes(b"first")
+        self.changes = queue.Queue()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, content, mtime):
+        self.path.write_bytes(content)
+        os.utime(self.path, ns=(mtime, mtime))
+
+    def test_check(self):
+        watcher = schedulewatch.ScheduleWatcher(self.path, self.changes.put, settle=0)
+        self.assertFalse(watcher.check())
+        # saved without changes
+        self.write(b"first", 10**18)
+        self.assertFalse(watcher.check())
+        self.write(b"second", 2 * 10**18)
+        self.assertTrue(watcher.check())
+        self.assertEqual(self.changes.get_nowait(), self.path.resolve())
+        self.assertFalse(watcher.check())
+        # the file is replaced by the editor
+        self.path.unlink()
+        self.assertFalse(watcher.check())
+        self.write(b"third", 3 * 10**18)
+        self.assertTrue(watcher.check())
+
+    def test_thread(self):
+        watcher = schedulewatch.ScheduleWatcher(
+            self.path, self.changes.put, interval=0.02, settle=0.01
+        ).start()
+        try:
+            self.write(b"second", 10**18)
+            self.assertEqual(self.changes.get(timeout=2), self.path.resolve())
+        finally:
+            watcher.stop()
+        watcher.thread.join(timeout=2)
+        self.assertFalse(watcher.thread.is_alive())
+
+
+class finishedPool:
+    """Executor whose futures are done when submit returns"""
+
+    def submit(self, function, *args):
+        future = concurrent.futures.Future()
+        future.set_result(function(*args))
+        return future
+
+    def shutdown(self, wait=True):
+        pass
+
+
+class transcodingContainers(testlib.mockContainers):
+    """Writes the output file of a transcode like ffmpeg would"""
+
+    def run(self, image, command, volumes=None, labels=None, **kwargs):
+        self.commands.append(command)
+        self.labels = labels
+        output = command.split()[-1]
+        for hostDir, mount in volumes.items():
+            if output.startswith(mount["bind"] + "/"):
+                (Path(hostDir) / output.split("/")[-1]).write_bytes(b"x" * 10)
+
+
+class TestTranscode(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.source = Path(self.directory.name) / "test.mp4"
+        self.source.write_bytes(b"video")
+        self.engine = testlib.mockEngine()
+        self.engine.containers = transcodingContainers()
+        self.engine.containers.commands = []
+        self.cache = transcode.RenditionCache(f"{self.directory.name}/cache", 25)
+        self.transcoder = transcode.Transcoder(self.cache, engine=self.engine)
+
+    def tearDown(self):
+        self.transcoder.close()
+        self.directory.cleanup()
+
+    def test_contentAddressed(self):
+        key = self.cache.key(self.source)
+        copy = Path(self.directory.name) / "copy.mp4"
+        copy.write_bytes(b"video")
+        self.assertEqual(self.cache.key(copy), key)
+        # other encoding parameters are another rendition
+        other = transcode.RenditionCache(self.cache.directory, profile="-c:v copy")
+        self.assertNotEqual(other.key(self.source), key)
+
+    def test_transcodeOnce(self):
+        self.assertIsNone(self.transcoder.rendition(self.source))
+        rendition = self.transcoder.submit(self.source).result(timeout=2)
+        self.assertEqual(self.transcoder.rendition(self.source), rendition)
+        self.assertEqual(rendition.read_bytes(), b"x" * 10)
+        # existing renditions are not transcoded again
+        self.transcoder.submit(self.source).result(timeout=2)
+        self.assertEqual(len(self.engine.containers.commands), 1)
+        self.assertIn(transcode.PROFILE, self.engine.containers.commands[0])
+        self.assertEqual(self.engine.containers.labels, {core.LABEL: "transcode"})
+
+    def test_privateDirectory(self):
+        rendition = self.transcoder.submit(self.source).result(timeout=2)
+        self.assertEqual(self.cache.directory.stat().st_mode & 0o777, 0o700)
+        # renditions others could have planted are not streamed
+        os.chmod(self.cache.directory, 0o777)
+        self.assertIsNone(self.cache.lookup(rendition.stem))
+        self.assertIsNone(self.transcoder.rendition(self.source))
+
+    def test_evictLeastRecentlyUsed(self):
+        renditions = []
+        for i in range(3):
+            source = Path(self.directory.name) / f"{i}.mp4"
+            source.write_bytes(f"video {i}".encode())
+            renditions.append(self.transcoder.submit(source).result(timeout=2))
+            os.utime(renditions[-1], (i, i))
+        self.cache.evict()
+        # 25 bytes hold two renditions
+        self.assertEqual([path.exists() for path in renditions], [False, True, True])
+
+    def test_finishedBeforeCallback(self):
+        # the done callback of a finished future runs in submit
+        self.transcoder._pool = finishedPool()
+        other = Path(self.directory.name) / "other.mp4"
+        other.write_bytes(b"other video")
+        thread = threading.Thread(
+            target=self.transcoder.submitAll,
+            args=([self.source, other],),
+            daemon=True,
+        )
+        thread.start()
+        thread.join(timeout=2)
+        self.assertFalse(thread.is_alive())
+        self.assertIsNotNone(self.transcoder.rendition(other))
+        self.assertEqual(self.transcoder._pending, {})
+
+    def test_streamCopy(self):
+        state = core.SchedulerState()
+        state.pathMap = {"/videos": {"bind": "/vids"}}
+        self.assertEqual(core.fileInput(state, self.source)[0], "/vids/test.mp4")
+        state.transcoder = self.transcoder
+        self.transcoder.submit(self.source).result(timeout=2)
+        video, volumes = core.fileInput(state, self.source)
+        self.assertTrue(video.startswith(core.RENDITION_MOUNT + "/"))
+        self.assertEqual(len(volumes), 1)
+        credentials = {"rtmp-URL": "a", "User": "b", "Password": "c", "playpath": "d"}
+        self.assertIn("-c copy", core.streamCommand(video, credentials))
+        self.assertIn("libx264", core.streamCommand("/vids/test.mp4", credentials))
+
+
+
+class TestMediaIndex(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.files = []
+        for i in range(3):
+            path = Path(self.directory.name) / f"{i}.mp4"
+            path.write_bytes(b"video")
+            self.files.append(str(path))
+        self.probed = []
+        self.indexFile = Path(self.directory.name) / "index.json"
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def probe(self, fileName):
+        self.probed.append(fileName)
+        return mediaindex.MediaInfo(600.0, "h264", "aac", 1280, 720, 1600000)
+
+    def test_parseProbe(self):
+        output = (
+            b'{"streams": [{"codec_type": "video", "codec_name": "h264",'
+            b' "width": 1920, "height": 1080}, {"codec_type": "audio",'
+            b' "codec_name": "aac"}], "format": {"duration": "61.5",'
+            b' "bit_rate": "2000000"}}'
+        )
+        self.assertEqual(
+            mediaindex.parseProbe(output),
+            mediaindex.MediaInfo(61.5, "h264", "aac", 1920, 1080, 2000000),
+        )
+
+    def test_probeOnce(self):
+        index = mediaindex.MediaIndex(self.indexFile, self.probe)
+        durations = index.durations(self.files + self.files)
+        self.assertEqual(durations, {fileName: 600.0 for fileName in self.files})
+        index.lookup(self.files)
+        self.assertEqual(sorted(self.probed), self.files)
+        # the index is persisted
+        reloaded = mediaindex.MediaIndex(self.indexFile, self.probe)
+        self.assertEqual(reloaded.lookup(self.files[:1])[self.files[0]].width, 1280)
+        self.assertEqual(len(self.probed), 3)
+        # changed files are probed again
+        Path(self.files[0]).write_bytes(b"longer video")
+        reloaded.lookup(self.files)
+        self.assertEqual(len(self.probed), 4)
+
+    def test_privateDirectory(self):
+        indexFile = Path(self.directory.name) / "media" / "index.json"
+        index = mediaindex.MediaIndex(indexFile, self.probe)
+        index.lookup(self.files[:1])
+        self.assertEqual(indexFile.parent.stat().st_mode & 0o777, 0o700)
+        # an index others could have planted is not read
+        os.chmod(indexFile.parent, 0o777)
+        reloaded = mediaindex.MediaIndex(indexFile, self.probe)
+        self.assertEqual(reloaded.entries, {})
+
+    def test_failedProbe(self):
+        def probe(fileName):
+            self.probed.append(fileName)
+            raise ValueError("no duration")
+
+        index = mediaindex.MediaIndex(None, probe)
+        self.assertEqual(index.durations(self.files[:1]), {self.files[0]: None})
+        # the failure is remembered for the version of the file
+        index.durations(self.files[:1])
+        self.assertEqual(self.probed, self.files[:1])
+        index.failed[mediaindex.fileId(self.files[0])] -= index.retryFailed
+        index.durations(self.files[:1])
+        self.assertEqual(self.probed, self.files[:1] * 2)
+
+    def test_missingFile(self):
+        index = mediaindex.MediaIndex(None, self.probe)
+        missing = "/does/not/exist.mp4"
+        self.assertEqual(index.durations([missing]), {missing: None})
+
+    def test_overlaps(self):
+        start = datetime.datetime(2030, 1, 1, 12)
+        schedule = pd.DataFrame(
+            {
+                "File": [
+                    "long.mp4",
+                    "short.mp4",
+                    "long.mp4",
+                    "unknown.mp4",
+                    "short.mp4",
+                ],
+                "Date/Time": [
+                    start,
+                    start + datetime.timedelta(minutes=90),
+                    start + datetime.timedelta(minutes=10),
+                    start + datetime.timedelta(minutes=100),
+                    start + datetime.timedelta(minutes=20),
+                ],
+                "Channel": ["a", "a", "b", "a", "a"],
+            }
+        )
+        durations = {"long.mp4": 7200.0, "short.mp4": 60.0, "unknown.mp4": None}
+        report = validation.validateOverlaps(
+            schedule, durations, datetime.timedelta(minutes=30)
+        )
+        # both later streams of channel a start while the long one runs
+        self.assertEqual(report.badRows(), [1, 3, 4])
+        durations["long.mp4"] = 600.0
+        report = validation.validateOverlaps(
+            schedule, durations, datetime.timedelta(minutes=30)
+        )
+        self.assertTrue(report.ok)
+
+    def test_loadSchedule(self):
+        state = core.SchedulerState()
+        state.mediaIndex = mediaindex.MediaIndex(None, self.probe)
+        start = datetime.datetime.now() + datetime.timedelta(hours=1)
+        schedule = pd.DataFrame(
+            {
+                "File": self.files[:2],
+                "Date/Time": [start, start + datetime.timedelta(minutes=5)],
+            }
+        )
+        credentials = pd.DataFrame({"User": [1], "Password": [2]})
+        notices = core.loadSchedule(state, schedule, credentials)
+        self.assertEqual(notices[0].kind, "error")
+        self.assertIn(validation.OVERLAP, notices[0].message)
+
+
+class TestPlayout(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.oldDir = playout.PlayoutSession.__init__.__defaults__
+        playout.PlayoutSession.__init__.__defaults__ = (self.directory.name,)
+        self.start = datetime.datetime(2030, 1, 1, 12)
+        self.state = core.SchedulerState(StreamSupervisor(2))
+        self.state.credentials = pd.DataFrame(
+            {
+                "User": [12345],
+                "Password": [678910],
+                "rtmp-URL": ["rtmp://i.amagood.server"],
+                "playpath": ["dclive_0_1@2345"],
+            }
+        )
+        self.state.mediaIndex = testlib.mockMediaIndex(
+            {"/vids/a.mp4": 600.0, "/vids/b.mp4": 300.0}
+        )
+        self.state.queue = EventQueue()
+        self.state.queue.push(self.start, "/vids/a.mp4")
+        # starts 2 seconds after a ended
+        self.state.queue.push(self.at(602), "/vids/b.mp4")
+        self.state.queue.push(self.at(3600), "/vids/a.mp4")
+        self.dispatched = []
+        self.engine = testlib.mockEngine()
+
+    def tearDown(self):
+        playout.PlayoutSession.__init__.__defaults__ = self.oldDir
+        self.directory.cleanup()
+
+    def at(self, seconds):
+        return self.start + datetime.timedelta(seconds=seconds)
+
+    def dispatch(self, video, credentials, pathmap, labels=None):
+        self.dispatched.append((video, pathmap))
+        return self.engine.containers.run(labels=labels)
+
+    def test_chain(self):
+        first = self.state.queue.peek()
+        duration = lambda event: self.state.mediaIndex.durations([event.file])[
+            event.file
+        ]
+        following = playout.chain(self.state.queue.walk(), first, duration)
+        self.assertEqual([event.file for event in following], ["/vids/b.mp4"])
+        # overlapping streams and streams of unknown length end the chain
+        self.state.mediaIndex.known["/vids/a.mp4"] = 700.0
+        self.assertEqual(playout.chain(self.state.queue.walk(), first, duration), [])
+        self.state.mediaIndex.known["/vids/a.mp4"] = None
+        self.assertEqual(playout.chain(self.state.queue.walk(), first, duration), [])
+
+    def test_session(self):
+        session = playout.PlayoutSession(DEFAULT_CHANNEL)
+        events = list(self.state.queue)
+        session.add(events[0], "/vids/a.mp4", 600.0)
+        session.add(events[1], "/vids/b.mp4", 300.0)
+        links = sorted(path.name for path in session.directory.iterdir())
+        self.assertEqual(links, ["link0.ffconcat", "link1.ffconcat"])
+        link0 = (session.directory / "link0.ffconcat").read_text()
+        self.assertEqual(
+            link0,
+            "ffconcat version 1.0\n"
+            "file '/vids/a.mp4'\n"
+            "file 'link1.ffconcat'\n"
+            "option safe 0\n",
+        )
+        link1 = (session.directory / "link1.ffconcat").read_text()
+        self.assertEqual(link1, "ffconcat version 1.0\nfile '/vids/b.mp4'\n")
+        self.assertIn(events[1], session)
+        self.assertNotIn(events[2], session)
+        self.assertEqual(session.position(650.0), (1, 50.0))
+        self.assertEqual(session.itemDuration(1), 300.0)
+        # items can be appended until the last one plays
+        self.assertTrue(session.canExtend(599.0))
+        self.assertFalse(session.canExtend(600.0))
+        session.cleanup()
+        self.assertFalse(session.directory.exists())
+
+    def test_privateDirectory(self):
+        session = playout.PlayoutSession(DEFAULT_CHANNEL)
+        self.assertEqual(session.directory.stat().st_mode & 0o777, 0o700)
+        session.cleanup()
+        # playlists are not written where others could swap them
+        os.chmod(self.directory.name, 0o777)
+        self.assertRaises(PermissionError, playout.PlayoutSession, DEFAULT_CHANNEL)
+        notices = core.dispatchDue(self.state, self.start, self.dispatch)
+        self.assertEqual(notices[0].kind, "started")
+        self.assertEqual(self.dispatched[0][0], "/vids/a.mp4")
+
+    def test_backToBack(self):
+        notices = core.dispatchDue(self.state, self.start, self.dispatch)
+        self.assertEqual(notices[0].kind, "started")
+        video, pathmap = self.dispatched[0]
+        self.assertEqual(video, f"{playout.PLAYLIST_MOUNT}/link0.ffconcat")
+        self.assertIn(
+            playout.PLAYLIST_MOUNT, [mount["bind"] for mount in pathmap.values()]
+        )
+        self.assertIn("-f concat", core.streamCommand(video, self.state.credentials))
+        slot = self.state.supervisor.get()
+        self.assertEqual(len(slot.session), 2)
+        # the second stream continues the running session
+        core.prewarmDue(self.state, self.at(600), self.dispatch)
+        notices = core.dispatchDue(self.state, self.at(602), testlib.raiseAssertion)
+        self.assertEqual(notices[0].kind, "started")
+        self.assertEqual(len(self.dispatched), 1)
+        self.assertIs(self.state.supervisor.get(), slot)
+        # streams scheduled later on are appended to the running session
+        self.state.queue.push(self.at(902), "/vids/b.mp4")
+        core.extendSession(self.state, slot)
+        self.assertEqual(len(slot.session), 3)
+        self.assertTrue((slot.session.directory / "link2.ffconcat").exists())
+        directory = slot.session.directory
+        core.stopStreams(self.state)
+        self.assertFalse(directory.exists())
+
+
+class TestSimulation(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.ERROR)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def test_simContainer(self):
+        clock = testlib.VirtualClock(simulate.START)
+        container = testlib.simContainer(clock, 10, startDelay=2, failAfter=5)
+        engine = testlib.simEngine(clock, lambda video: {})
+        self.assertFalse(container.isRunning())
+        container.start()
+        clock.set(simulate.START + datetime.timedelta(seconds=4))
+        self.assertTrue(container.isRunning())
+        samples = monitor.ProgressParser().feed(container.pump())
+        self.assertEqual([sample.outTime for sample in samples], [1.0, 2.0])
+        self.assertEqual(container.pump(), b"")
+        self.assertIsNone(core.parseFailure(container))
+        clock.set(simulate.START + datetime.timedelta(seconds=5))
+        self.assertFalse(container.isRunning())
+        self.assertEqual(core.parseFailure(container).kind, "connection")
+        self.assertEqual(engine.containers.list(), [])
+
+    def test_run(self):
+        queue, durations = simulate.makeSchedule(0.25, 2)
+        profile = testlib.simProfile(durations, failure=0.5, seed=1)
+        simulation = simulate.Simulation(
+            queue, durations, 2, pollInterval=5, profile=profile, trackMemory=False
+        )
+        report = simulation.run()
+        self.assertEqual(report.notices["started"], report.events)
+        self.assertEqual(
+            report.notices.get("ended", 0) + report.notices.get("failed", 0),
+            report.events,
+        )
+        # failed streams are restarted where they stopped
+        self.assertGreater(report.notices["interrupted"], 0)
+        self.assertEqual(report.notices["resumed"], report.notices["interrupted"])
+        # streams start on the instant they are scheduled
+        self.assertEqual(report.dispatchError[100], 0)
+        self.assertEqual(report.busyWakeups, 0)
+        self.assertEqual(report.ticks, len(simulation.tickLatencies))
+        self.assertEqual(set(report.phaseCPU), set(simulate.PHASES))
+        self.assertIn("tick latency", simulate.formatReport(report))
+
+
 if __name__ == "__main__":
     res = unittest.main(verbosity=3, exit=False)
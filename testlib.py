@@ -1,8 +1,17 @@
 """Classes for mock testing"""
 import tkinter
 import datetime
+import time
+import queue
+import random
+import itertools
 import pandas as pd
+import sys
+from pathlib import Path
 import docker
+from supervisor import StreamSupervisor
+import hostpool
+import processengine
 
 
 # exceptions
@@ -22,14 +31,22 @@ class mockFrame(tkinter.Frame):
         self.grid = None
         self.schedule = pd.DataFrame()
         self.credentials = None
-        self.container = None
+        self.channelCredentials = {}
+        self.supervisor = StreamSupervisor()
         self.status = tkinter.StringVar()
         self.lbl_StreamSpeed = tkinter.Label(self)
         self.streamSpeed = tkinter.StringVar()
         self.nowDT = datetime.datetime(year=1900, month=12, day=5)
-        self.streamActive = False
         self.imageName = "asdf"
         self.pathMap = None
+        self.queue = None
+        self.scheduler = None
+        self.watcher = None
+        self.journal = None
+        self.instance = "test"
+        self.containerEvents = None
+        self.transcoder = None
+        self.mediaIndex = None
 
     def after(*args):
         """Override after method to avoid repeated calling"""
@@ -44,20 +61,52 @@ class mockRoot:
 # mock docker
 
 
+CONTAINER_IDS = itertools.count()
+
+
 class mockContainer:
-    def __init__(self, log=None, status="created", name="asdf"):
-        self.log = log
+    def __init__(self, log=None, status="created", name="asdf", stream=None):
+        self.id = f"container{next(CONTAINER_IDS)}"
+        self.labels = {}
+        self.log = b"" if log is None else log
+        self.stream = [] if stream is None else stream
         self.index = None
         self.engine = None
         self.status = status
         self.image = name
 
-    def logs(self, tail=1):
+    def logs(self, tail=1, stream=False, follow=False, **kwargs):
+        if stream:
+            return iter(self.stream)
         return self.log
 
     def stop(self):
         self.engine.containers.containerList.pop(self.index)
 
+    def start(self):
+        self.status = "running"
+
+    def remove(self, force=False):
+        self.status = "removed"
+
+
+def matchFilters(container, filters):
+    """Applies the id, ancestor and label filters of docker"""
+    for key, values in (filters or {}).items():
+        values = values if isinstance(values, list) else [values]
+        if key == "id" and container.id not in values:
+            return False
+        if key == "ancestor" and container.image not in values:
+            return False
+        if key == "label":
+            for value in values:
+                name, _, expected = value.partition("=")
+                if name not in container.labels:
+                    return False
+                if expected and container.labels[name] != expected:
+                    return False
+    return True
+
 
 class mockContainers:
     def __init__(self, name="asdf"):
@@ -65,10 +114,10 @@ class mockContainers:
         self.engine = None
         self.image = name
 
-    def list(self):
-        return self.containerList
+    def list(self, all=False, filters=None):
+        return [cont for cont in self.containerList if matchFilters(cont, filters)]
 
-    def run(self, *args, **kwargs):
+    def run(self, *args, labels=None, **kwargs):
         newCont = mockContainer(
             b"\rframe 918.3kbits/s 38.8image 25 fps \frame 920.3kbits/s"
             b"\rframe 918.3kbits/s 38.8image 25 fps \frame 920.3kbits/s"
@@ -78,8 +127,14 @@ class mockContainers:
         self.containerList.append(newCont)
         newCont.index = self.containerList.index(newCont)
         newCont.engine = self.engine
+        newCont.labels = labels or {}
         return newCont
 
+    def create(self, *args, labels=None, **kwargs):
+        container = mockContainer(b"", status="created")
+        container.labels = labels or {}
+        return container
+
     def __len__(self):
         return len(self.containerList)
 
@@ -96,6 +151,38 @@ class mockImages:
             return self.imageList
 
 
+class mockEvents:
+    """Event stream of a mock docker daemon"""
+
+    def __init__(self):
+        self.queue = queue.Queue()
+
+    def __iter__(self):
+        while True:
+            event = self.queue.get()
+            if event is None:
+                return
+            yield event
+
+    def publish(self, action, container, exitCode=0):
+        """Sends an event like docker does for the container"""
+        self.queue.put(
+            {
+                "Type": "container",
+                "Action": action,
+                "id": container.id,
+                "Actor": {
+                    "ID": container.id,
+                    "Attributes": {"exitCode": str(exitCode)},
+                },
+                "time": int(time.time()),
+            }
+        )
+
+    def close(self):
+        self.queue.put(None)
+
+
 class mockEngine:
     def __init__(self, images="Good", version="Good", containers=None) -> None:
         self.containers = mockContainers()
@@ -104,17 +191,339 @@ class mockEngine:
         self.containers.engine = self
         self.imagesInst = images
         self.versionInt = version
+        self.eventStream = mockEvents()
+        self.eventFilters = None
+
+    def events(self, decode=False, filters=None, since=None):
+        self.eventFilters = filters
+        return self.eventStream
 
     def version(self):
         """Dummy call for version"""
         if self.versionInt != "Good":
             raise AssertionError
 
+    def ping(self):
+        """Dummy call for ping"""
+        self.version()
+        return True
+
+    def close(self):
+        pass
+
     @property
     def images(self):
         return self.imagesInst
 
 
+# docker host pool
+
+
+class hostContainer(mockContainer):
+    """Container of a mock host, unreachable while the host is down"""
+
+    def logs(self, *args, **kwargs):
+        if self.engine.down:
+            raise ConnectionError(f"{self.engine.name} is down")
+        return mockContainer.logs(self, *args, **kwargs)
+
+
+class hostContainers(mockContainers):
+    def check(self):
+        if self.engine.down:
+            raise ConnectionError(f"{self.engine.name} is down")
+
+    def list(self, all=False, filters=None):
+        self.check()
+        return mockContainers.list(self, all, filters)
+
+    def run(self, *args, labels=None, **kwargs):
+        # like docker the container object keeps the status it was created with
+        return self.create(*args, labels=labels, **kwargs)
+
+    def create(self, *args, labels=None, **kwargs):
+        self.check()
+        container = hostContainer(b"", status="created")
+        container.labels = labels or {}
+        container.engine = self.engine
+        self.containerList.append(container)
+        return container
+
+
+class mockHostEngine(mockEngine):
+    """Docker host of a pool with cpus cores. While down is
+    set, every call fails like an unreachable daemon."""
+
+    def __init__(self, name="host", cpus=4):
+        mockEngine.__init__(self)
+        self.name = name
+        self.cpus = cpus
+        self.down = False
+        self.containers = hostContainers()
+        self.containers.engine = self
+
+    def version(self):
+        if self.down:
+            raise ConnectionError(f"{self.name} is down")
+
+    def info(self):
+        self.version()
+        return {"NCPU": self.cpus}
+
+    def events(self, decode=False, filters=None, since=None):
+        self.version()
+        return mockEngine.events(self, decode, filters, since)
+
+
+def mockPool(*cpus, slots=None):
+    """HostPool of mock hosts with the given cores"""
+    return hostpool.HostPool(
+        [
+            hostpool.Host(f"host{index}", mockHostEngine(f"host{index}", count), slots)
+            for index, count in enumerate(cpus)
+        ]
+    )
+
+
+# simulated docker
+
+
+class VirtualClock:
+    """Time of a simulation, only moves when it is set"""
+
+    def __init__(self, start):
+        self.current = start
+
+    def now(self):
+        return self.current
+
+    def time(self):
+        return self.current.timestamp()
+
+    def set(self, moment):
+        self.current = moment
+
+
+PROGRESS_TEMPLATE = (
+    "frame={frame}\nfps={fps:.2f}\nbitrate={bitrate:.1f}kbits/s\n"
+    "total_size={size}\nout_time_us={outTime}\ndup_frames=0\n"
+    "drop_frames=0\nspeed={speed:.3f}x\nprogress=continue\n"
+)
+
+
+class simContainer(mockContainer):
+    """Container running ffmpeg on a virtual clock.
+    It writes a progress block per second of video after startDelay
+    and exits after duration or, with failAfter, fails with failLine.
+    Like a docker container object its status is not refreshed."""
+
+    def __init__(
+        self,
+        clock,
+        duration,
+        startDelay=0.0,
+        speed=1.0,
+        failAfter=None,
+        failLine=b"[rtmp @ 0x5581] Connection reset by peer",
+        status="created",
+    ):
+        mockContainer.__init__(self, status=status)
+        self.clock = clock
+        self.duration = duration
+        self.startDelay = startDelay
+        self.speed = speed
+        self.failAfter = failAfter
+        self.failLine = failLine
+        self.startedAt = None
+        self.emitted = 0  # progress blocks handed out by pump()
+
+    def start(self):
+        if self.startedAt is None:
+            self.startedAt = self.clock.time()
+
+    def runtime(self):
+        """Seconds the container runs until it exits"""
+        if self.failAfter is not None:
+            return self.failAfter
+        return self.startDelay + self.duration / self.speed
+
+    def exited(self):
+        return self.status == "removed" or (
+            self.startedAt is not None
+            and self.clock.time() >= self.startedAt + self.runtime()
+        )
+
+    def isRunning(self):
+        return self.startedAt is not None and not self.exited()
+
+    def failed(self, since=None):
+        if self.failAfter is None or self.startedAt is None:
+            return False
+        failedAt = self.startedAt + self.failAfter
+        return failedAt <= self.clock.time() and (since is None or since <= failedAt)
+
+    def pump(self):
+        """Returns the progress written since the last pump"""
+        if self.startedAt is None:
+            return b""
+        elapsed = min(self.clock.time(), self.startedAt + self.runtime())
+        blocks = int((elapsed - self.startedAt - self.startDelay) * self.speed)
+        blocks = min(blocks, int(self.duration))
+        output = []
+        for second in range(self.emitted + 1, blocks + 1):
+            output.append(
+                PROGRESS_TEMPLATE.format(
+                    frame=second * 25,
+                    fps=25 * self.speed,
+                    bitrate=918.3,
+                    size=second * 114788,
+                    outTime=second * 1000000,
+                    speed=self.speed,
+                )
+            )
+        self.emitted = max(self.emitted, blocks)
+        return "".join(output).encode()
+
+    def logs(self, stdout=True, stderr=True, stream=False, since=None, **kwargs):
+        if stream:
+            # the simulation pumps the output into the followers
+            return iter(())
+        if stderr and self.failed(since):
+            return self.failLine + b"\n"
+        return b""
+
+    def stop(self):
+        self.status = "removed"
+
+    def remove(self, force=False):
+        self.status = "removed"
+
+
+class simContainers(mockContainers):
+    """Containers of a simulated engine, profile(videoInput) returns
+    the keyword arguments of the simContainer of a stream."""
+
+    def __init__(self, clock, profile):
+        mockContainers.__init__(self)
+        self.clock = clock
+        self.profile = profile
+        self.started = 0
+        self.created = 0
+
+    def list(self, all=False, filters=None):
+        # exited containers are removed like with run(remove=True)
+        self.containerList = [c for c in self.containerList if not c.exited()]
+        return [
+            c
+            for c in self.containerList
+            if c.isRunning() and matchFilters(c, filters)
+        ]
+
+    def create(self, videoInput, *args, labels=None, **kwargs):
+        container = simContainer(self.clock, **self.profile(videoInput))
+        container.labels = labels or {}
+        self.containerList.append(container)
+        self.created += 1
+        return container
+
+    def run(self, videoInput, *args, labels=None, **kwargs):
+        container = self.create(videoInput, labels=labels)
+        container.start()
+        self.started += 1
+        return container
+
+
+class simEngine(mockEngine):
+    """Engine whose containers run on a virtual clock"""
+
+    def __init__(self, clock, profile):
+        mockEngine.__init__(self)
+        self.containers = simContainers(clock, profile)
+        self.containers.engine = self
+
+    def dispatch(self, videoInput, credentials, pathMap, labels=None, seek=None):
+        """Stands in for core.dispatch_stream"""
+        container = self.containers.run(videoInput, labels=labels)
+        if seek:
+            container.duration = max(container.duration - seek, 0.0)
+        return container
+
+    def prepare(self, videoInput, credentials, pathMap, labels=None):
+        """Stands in for core.prepare_stream"""
+        return self.containers.create(videoInput, labels=labels)
+
+
+class simProfile:
+    """Draws how the container of a stream behaves. durations maps
+    the video name to seconds, a share of streams start slowly,
+    run below realtime or fail part way through."""
+
+    def __init__(
+        self,
+        durations,
+        slowStart=0.05,
+        slow=0.02,
+        failure=0.02,
+        seed=0,
+    ):
+        self.durations = durations
+        self.slowStart = slowStart
+        self.slow = slow
+        self.failure = failure
+        self.random = random.Random(seed)
+
+    def __call__(self, videoInput):
+        duration = self.durations[videoInput.rsplit("/", 1)[-1]]
+        draw = self.random.random
+        return {
+            "duration": duration,
+            "startDelay": draw() * 20 if draw() < self.slowStart else draw(),
+            "speed": 0.8 if draw() < self.slow else 1.0,
+            "failAfter": draw() * duration if draw() < self.failure else None,
+        }
+
+
+# mock media index
+
+
+class mockMediaIndex:
+    def __init__(self, durations=None, default=None):
+        self.known = {} if durations is None else durations
+        self.default = default
+
+    def durations(self, fileNames):
+        return {name: self.known.get(name, self.default) for name in fileNames}
+
+
+# mock ffmpeg of the process engine
+
+# writes a progress block per tick, inputs named endless run until
+# they are stopped, inputs named crash fail like a missing file
+FAKE_FFMPEG = """import sys, time
+args = sys.argv[1:]
+source = args[args.index("-i") + 1]
+if "crash" in source:
+    sys.stderr.write(source + ": No such file or directory\\n")
+    sys.exit(1)
+ticks = 0
+while ticks < 3 or "endless" in source:
+    ticks += 1
+    sys.stdout.write({progress!r}.format(frame=ticks * 25, outTime=ticks * 1000000))
+    sys.stdout.flush()
+    time.sleep(0.05)
+"""
+
+
+def fakeFfmpeg(directory):
+    """ProcessEngine that runs FAKE_FFMPEG from directory instead of ffmpeg"""
+    script = Path(directory) / "ffmpeg.py"
+    progress = PROGRESS_TEMPLATE.format(
+        frame="{frame}", fps=25, bitrate=918.3, size=0, outTime="{outTime}", speed=1.0
+    )
+    script.write_text(FAKE_FFMPEG.format(progress=progress))
+    return processengine.ProcessEngine({"ffmpeg": [sys.executable, str(script)]})
+
+
 # misc functions
 
 
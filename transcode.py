@@ -0,0 +1,178 @@
+"""Offline transcoding of scheduled videos into the stream profile.
+
+Renditions are stored in a content addressed cache. Streams of
+files with a rendition only remux it instead of encoding live."""
+import os
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import core
+from engine import getEngine
+from schedulecache import CACHE_HOME, fileHash, privateDirectory
+
+
+# define global variables
+
+# encoding parameters of the stream profile, part of the cache key
+PROFILE = (
+    "-c:v libx264 -b:v 1600k -preset veryfast -c:a libfdk_aac -b:a 128k"
+    " -s 1280x720 -x264opts keyint=50 -g 25 -pix_fmt yuv420p"
+)
+FFMPEG_TRANSCODE = "ffmpeg -nostats -y -i {} {} -movflags +faststart -f mp4 {}"
+# renditions are broadcast, so they are kept where only the user can write
+CACHE_DIR = CACHE_HOME / "streamscheduler" / "renditions"
+MAX_BYTES = 20 * 1024**3  # disk space of the rendition cache
+WORKERS = 1  # concurrent transcodes, they compete with live streams
+SOURCE_MOUNT = "/source"
+
+logger = logging.getLogger("transcode")
+
+
+class RenditionCache:
+    """Renditions on disk keyed by the hash of the source
+    file and the encoding parameters. The least recently used
+    renditions are evicted once the cache exceeds maxBytes."""
+
+    def __init__(self, directory=CACHE_DIR, maxBytes=MAX_BYTES, profile=PROFILE):
+        self.directory = Path(directory)
+        self.maxBytes = maxBytes
+        self.profile = profile
+        self._keys = {}  # (path, size, mtime) -> key, files are hashed once
+
+    def key(self, fileName):
+        """Hashes the source file, unchanged files are not hashed again"""
+        stat = os.stat(fileName)
+        fileId = (str(fileName), stat.st_size, stat.st_mtime_ns)
+        key = self._keys.get(fileId)
+        if key is None:
+            digest = hashlib.sha256(fileHash(fileName).encode())
+            digest.update(self.profile.encode())
+            key = digest.hexdigest()
+            self._keys[fileId] = key
+        return key
+
+    def knownKey(self, fileName):
+        """Returns the key of an already hashed file or None"""
+        try:
+            stat = os.stat(fileName)
+        except OSError:
+            return None
+        return self._keys.get((str(fileName), stat.st_size, stat.st_mtime_ns))
+
+    def path(self, key):
+        return self.directory / f"{key}.mp4"
+
+    def lookup(self, key):
+        """Returns the rendition of key or None and marks it as used"""
+        renditionPath = self.path(key)
+        try:
+            os.utime(renditionPath)
+        except OSError:
+            return None
+        try:
+            privateDirectory(self.directory)
+        except OSError as error:
+            logger.warning(f"Not using the rendition cache: {error}")
+            return None
+        return renditionPath
+
+    def evict(self):
+        """Removes the least recently used renditions"""
+        entries = sorted(
+            (entry.stat().st_mtime, entry.stat().st_size, entry)
+            for entry in self.directory.glob("*.mp4")
+        )
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if total <= self.maxBytes:
+                break
+            try:
+                entry.unlink()
+            except OSError as error:  # streamed right now
+                logger.warning(f"Could not evict {entry.name}: {error}")
+                continue
+            total -= size
+            logger.info(f"Evicted rendition {entry.name}")
+
+
+class Transcoder:
+    """Transcodes files into the cache with a bounded pool of workers.
+    Every file is only transcoded once at a time."""
+
+    def __init__(self, cache=None, workers=WORKERS, engine=None):
+        self.cache = RenditionCache() if cache is None else cache
+        self.engine = engine
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix="Transcoder")
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fileName):
+        """Transcodes fileName in the background unless a rendition exists.
+        Returns a Future of the rendition path."""
+        with self._lock:
+            future = self._pending.get(fileName)
+            if future is not None:
+                return future
+            future = self._pool.submit(self._transcode, fileName)
+            self._pending[fileName] = future
+        # runs at once if the transcode already finished, so not under the lock
+        future.add_done_callback(lambda _: self._done(fileName, future))
+        return future
+
+    def submitAll(self, fileNames):
+        return [self.submit(fileName) for fileName in fileNames]
+
+    def _done(self, fileName, future):
+        with self._lock:
+            if self._pending.get(fileName) is future:
+                del self._pending[fileName]
+
+    def rendition(self, fileName):
+        """Returns the rendition of fileName or None.
+        Never hashes, so it is cheap enough for dispatching."""
+        key = self.cache.knownKey(fileName)
+        return None if key is None else self.cache.lookup(key)
+
+    def _transcode(self, fileName):
+        key = self.cache.key(fileName)
+        existing = self.cache.lookup(key)
+        if existing is not None:
+            return existing
+        privateDirectory(self.cache.directory)
+        target = self.cache.path(key)
+        partial = target.with_suffix(".part")
+        source = Path(fileName)
+        command = FFMPEG_TRANSCODE.format(
+            f"{SOURCE_MOUNT}/{source.name}",
+            self.cache.profile,
+            f"{core.RENDITION_MOUNT}/{partial.name}",
+        )
+        volumes = {
+            str(source.parent): {"bind": SOURCE_MOUNT, "mode": "ro"},
+            str(self.cache.directory): {"bind": core.RENDITION_MOUNT},
+        }
+        client = getEngine() if self.engine is None else self.engine
+        logger.info(f"Transcoding {source.name}")
+        try:
+            client.containers.run(
+                core.IMAGE_NAME,
+                command,
+                volumes=volumes,
+                remove=True,
+                labels={core.LABEL: "transcode"},
+            )
+            # only complete renditions get their final name
+            os.replace(partial, target)
+        except Exception as error:
+            logger.error(f"Transcoding {source.name} failed: {error}")
+            if partial.exists():
+                partial.unlink()
+            raise
+        logger.info(f"Transcoded {source.name} to {target.name}")
+        self.cache.evict()
+        return target
+
+    def close(self):
+        self._pool.shutdown(wait=False)
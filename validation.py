@@ -0,0 +1,143 @@
+"""Vectorized validation and normalization of schedules"""
+import datetime
+import collections
+from pathlib import Path
+import pandas as pd
+
+
+# define global variables
+
+REQUIRED_COLUMNS = ["File", "Date", "Time"]
+COLUMN_TYPES = {"Date": datetime.datetime, "Time": datetime.time, "File": str}
+MAX_REPORT = 10  # number of bad rows shown to the user
+
+MISSING_COLUMN = "Schedule is missing a column!"
+BAD_DTYPE = "Schedule does not have the right format/datatypes!"
+BAD_DIRECTORY = "Video files are not all in the same directory!"
+MISSING_FILE = "Video files do not exist!"
+OVERLAP = "Stream starts before the previous stream of its channel ended!"
+
+RowError = collections.namedtuple("RowError", ["row", "column", "message"])
+
+
+class ValidationReport:
+    """Collects every bad row of a schedule"""
+
+    def __init__(self):
+        self.errors = []
+
+    def add(self, rows, column, message):
+        for row in rows:
+            self.errors.append(RowError(row, column, message))
+
+    @property
+    def ok(self):
+        return len(self.errors) == 0
+
+    def badRows(self):
+        return sorted({error.row for error in self.errors if error.row is not None})
+
+    def messages(self):
+        """Returns the distinct error messages in the order they occurred"""
+        return list(dict.fromkeys(error.message for error in self.errors))
+
+    def __str__(self):
+        lines = self.messages()
+        for error in self.errors[:MAX_REPORT]:
+            # spreadsheet line numbers start at 1 below the header
+            where = "" if error.row is None else f"Line {error.row + 2}, "
+            lines.append(f"{where}{error.column}: {error.message}")
+        if len(self.errors) > MAX_REPORT:
+            lines.append(f"... and {len(self.errors) - MAX_REPORT} more")
+        return "\n".join(lines)
+
+
+def badTypes(column, expected):
+    """Returns a mask of entries that are not instances of expected.
+    Only the distinct types of the column are checked."""
+    types = column.map(type)
+    allowed = [kind for kind in types.unique() if issubclass(kind, expected)]
+    return ~types.isin(allowed)
+
+
+def validateSchedule(df):
+    """Checks all rows of a schedule at once.
+    Returns a ValidationReport."""
+    report = ValidationReport()
+    missing = [column for column in REQUIRED_COLUMNS if column not in df.columns]
+    if missing:
+        report.add([None], ", ".join(missing), MISSING_COLUMN)
+        return report
+    # check datatypes
+    for column, expected in COLUMN_TYPES.items():
+        if expected is datetime.datetime and pd.api.types.is_datetime64_any_dtype(
+            df[column]
+        ):
+            bad = df[column].isna()
+        else:
+            bad = badTypes(df[column], expected)
+        report.add(df.index[bad], column, BAD_DTYPE)
+    # check directories and files
+    return validateFiles(df.loc[~badTypes(df["File"], str), "File"], report)
+
+
+def validateFiles(files, report=None):
+    """Checks that all files exist and share one directory.
+    Every distinct file is only looked at once."""
+    if report is None:
+        report = ValidationReport()
+    if len(files) == 0:
+        return report
+    uniqueFiles = files.unique()
+    baseDir = Path(files.iloc[0]).parent
+    sameDir = pd.Series(
+        [Path(fileP).parent == baseDir for fileP in uniqueFiles], index=uniqueFiles
+    )
+    exists = pd.Series(
+        [Path(fileP).exists() for fileP in uniqueFiles], index=uniqueFiles
+    )
+    report.add(files.index[~files.map(sameDir).astype(bool)], "File", BAD_DIRECTORY)
+    report.add(files.index[~files.map(exists).astype(bool)], "File", MISSING_FILE)
+    return report
+
+
+def normalizeSchedule(df):
+    """Combines Date and Time into Date/Time column-wise
+    and sorts the schedule by it."""
+    dates = pd.to_datetime(df["Date"]).dt.normalize()
+    # convert each distinct time of day only once
+    uniqueTimes = pd.unique(df["Time"])
+    offsets = pd.Series(
+        pd.to_timedelta([str(time) for time in uniqueTimes]), index=uniqueTimes
+    )
+    times = df["Time"].map(offsets)
+    schedule = df.drop(columns=["Date", "Time"])
+    schedule["Date/Time"] = dates + times
+    return schedule.sort_values(by="Date/Time")
+
+
+def validateOverlaps(schedule, durations, default, report=None):
+    """Checks that no stream starts before an earlier stream of the
+    same channel ended. Streams of unknown duration last default.
+    Sorts once and sweeps the latest end per channel, O(n log n)."""
+    if report is None:
+        report = ValidationReport()
+    lengths = pd.to_timedelta(
+        schedule["File"].map(durations).astype(float), unit="s"
+    ).fillna(default)
+    if "Channel" in schedule.columns:
+        channels = schedule["Channel"].astype(str)
+    else:
+        channels = pd.Series("", index=schedule.index)
+    streams = pd.DataFrame(
+        {
+            "channel": channels,
+            "start": schedule["Date/Time"],
+            "end": schedule["Date/Time"] + lengths,
+        }
+    ).sort_values(["channel", "start"], kind="mergesort")
+    # latest end of all earlier streams of the channel
+    latestEnd = streams.groupby("channel")["end"].cummax()
+    previousEnd = latestEnd.groupby(streams["channel"]).shift()
+    report.add(streams.index[streams["start"] < previousEnd], "Date/Time", OVERLAP)
+    return report